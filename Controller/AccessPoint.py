@@ -1,22 +1,67 @@
-from flask import Flask, jsonify, request, send_file
+from flask import Flask, Response, g, jsonify, request, send_file, stream_with_context
 import os
 import io
+import math
+import time
 import base64
 from datetime import datetime
 from dotenv import load_dotenv
+from werkzeug.datastructures import FileStorage
 
-from Service.arrangeFiles import create_deque
-from Service.quicksort import quickSort
+from Service import metrics, profiler
 from Service.history_db import HistoryManager
 from Service.image_tools import ImageCompressor
+from Service.huffman_tools import HuffmanCompressor, OutputTooLarge
+from Service.job_queue import JobQueue
+from Service.result_cache import ResultCache
+from Service.upload_executor import UploadExecutor
+from Service.scheduler import longest_first
+from Service.uploads import SpooledRequest
+from Service.response_streams import MULTIPART_MIMETYPE, ZIP_MIMETYPE, multipart_stream, new_boundary, zip_stream
 from Service.merge_sort import merge_sort_by_date, merge_sort_by_size, merge_sort_by_compression_ratio
 
 # Load environment variables
 load_dotenv()
 
 app = Flask(__name__)
+app.request_class = SpooledRequest
+app.wsgi_app = profiler.RequestProfiler(app.wsgi_app)
 history_manager = HistoryManager()
 image_compressor = ImageCompressor()
+huffman_compressor = HuffmanCompressor()
+result_cache = ResultCache()
+upload_executor = UploadExecutor(cache=result_cache)
+
+http_requests = metrics.REGISTRY.counter(
+    'http_requests_total', 'Requests by method, route and status code', ('method', 'endpoint', 'status'))
+http_request_seconds = metrics.REGISTRY.histogram(
+    'http_request_duration_seconds', 'Seconds from request start until the response body was sent', ('endpoint',))
+http_requests_in_flight = metrics.REGISTRY.gauge('http_requests_in_flight', 'Requests being handled or streamed')
+metrics.REGISTRY.gauge('image_compressor_upload_queue_depth', 'Upload files submitted to the executor pool and not yet finished',
+                       function=lambda: upload_executor.queue_depth())
+
+def _endpoint():
+    # The route pattern rather than the path, so labels stay bounded
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+@app.before_request
+def _start_request_metrics():
+    g.request_started = time.perf_counter()
+    http_requests_in_flight.inc()
+
+@app.after_request
+def _count_request(response):
+    endpoint = _endpoint()
+    started = g.pop('request_started', None)
+    http_requests.inc(method=request.method, endpoint=endpoint, status=str(response.status_code))
+    
+    def finish():
+        # Called once the body has been sent, so streamed responses are timed to their end
+        if started is not None:
+            http_request_seconds.observe(time.perf_counter() - started, endpoint=endpoint)
+            http_requests_in_flight.dec()
+    response.call_on_close(finish)
+    return response
 
 @app.route('/')
 def home():
@@ -35,65 +80,233 @@ def upload_images(quality,maxSize,resize):
     if not image_files:
         return jsonify({'error' : 'No images selected for upload'}), 400
     
-    uploaded_fileSize = []
-    for file in image_files:
-        size = len(file.read())
-        file.seek(0)  # reset pointer
-        uploaded_fileSize.append(size)
-        
-    uploaded_files = []
-    for fileAll in image_files:
-          uploaded_files.append(fileAll)
-    
-    quickSort(uploaded_files,uploaded_fileSize,0,len(uploaded_fileSize) - 1)  
-    created_dequeue = create_deque(uploaded_files)   
-    fileNameDequeue = create_deque(uploaded_fileSize) 
-    # return jsonify({
-    #     'message ': uploaded_fileSize,
-    #     'quality ': quality,
-    #     'max ': maxSize
-    #     }),200
-    
-    # Process each image with compression and history tracking
+    # Start the costliest files first, estimated from their image headers
+    order = longest_first(image_files)
+    uploaded_files = list(image_files)
+    
+    response_mode = _response_mode()
+    if response_mode != 'json':
+        uploaded_files = _detach_uploads(uploaded_files)
+    # Streamed parts go out as files finish and carry their upload index
+    results = _process_uploads(uploaded_files, order, quality, resize, in_upload_order=response_mode == 'json')
+    
+    if response_mode == 'zip':
+        return Response(stream_with_context(zip_stream(results)), mimetype=ZIP_MIMETYPE,
+                        headers={'Content-Disposition': 'attachment; filename="compressed_images.zip"'})
+    if response_mode == 'multipart':
+        boundary = new_boundary()
+        return Response(stream_with_context(multipart_stream(results, boundary)),
+                        content_type=f'{MULTIPART_MIMETYPE}; boundary={boundary}')
+    
     processed_files = []
-    for i, file in enumerate(uploaded_files):
-        try:
-            # Compress image with specified quality and aspect ratio
-            compressed_bytes, metadata = image_compressor.compress_image(
-                file, quality=quality, aspect_ratio=resize
-            )
-            
-            # Add to history
+    for metadata, compressed_bytes in results:
+        if compressed_bytes is not None:
+            with metrics.STAGE_SECONDS.time(stage='base64'):
+                metadata['compressed_data'] = base64.b64encode(compressed_bytes).decode('utf-8')
+        processed_files.append(metadata)
+    
+    return jsonify({
+        "message": "Images processed successfully",
+        "processed_files": processed_files,
+        "total_files": len(processed_files)
+    }), 200
+
+def _response_mode():
+    """
+    Pick how upload results are returned: ?response=json|zip|multipart,
+    otherwise the best match of the Accept header (JSON by default)
+    """
+    requested = request.args.get('response', '').lower()
+    if requested in ('json', 'zip', 'multipart'):
+        return requested
+    best = request.accept_mimetypes.best_match(['application/json', ZIP_MIMETYPE, MULTIPART_MIMETYPE])
+    return {ZIP_MIMETYPE: 'zip', MULTIPART_MIMETYPE: 'multipart'}.get(best, 'json')
+
+def _detach_uploads(files):
+    """
+    Move upload streams to new FileStorage objects so they outlive the view:
+    Flask closes request.files when the view returns, before a streamed
+    response has been generated. _process_uploads closes them instead.
+    """
+    detached = []
+    for file in files:
+        detached.append(FileStorage(file.stream, file.filename, file.name, file.content_type,
+                                    file.content_length, file.headers))
+        file.stream = io.BytesIO()
+    return detached
+
+def _process_uploads(uploaded_files, order, quality, resize, in_upload_order=True):
+    """
+    Compress the uploads on upload_executor in the given order of indices
+    and record each in history, yielding (metadata, compressed_bytes).
+    metadata['index'] is the file's position in the upload; compressed_bytes
+    is None and metadata holds the error if it failed. History is written
+    from this one thread, as results are yielded.
+
+    With in_upload_order, results are held in a reorder buffer until every
+    earlier upload is done, so a file is yielded as soon as it and the files
+    before it have finished. Otherwise each file is yielded as it finishes,
+    which streamed responses use so one slow file does not hold back the rest.
+    """
+    def indexed_record(index, result):
+        compressed_bytes, metadata = result
+        record, compressed_bytes = _record_upload(uploaded_files[index].filename, compressed_bytes,
+                                                  metadata, quality, resize)
+        record['index'] = index
+        return record, compressed_bytes
+
+    try:
+        scheduled = [uploaded_files[index] for index in order]
+        compressions = upload_executor.compress_all(scheduled, quality, resize)
+        finished = {}
+        next_index = 0
+        for position, result in compressions:
+            if not in_upload_order:
+                yield indexed_record(order[position], result)
+                continue
+            finished[order[position]] = result
+            while next_index in finished:
+                yield indexed_record(next_index, finished.pop(next_index))
+                next_index += 1
+    finally:
+        for file in uploaded_files:
+            file.close()
+
+def _record_upload(filename, compressed_bytes, metadata, quality, resize):
+    """Add a compressed upload to history; metadata is the error message if compression failed"""
+    try:
+        if compressed_bytes is None:
+            raise ValueError(metadata)
+        
+        # Add to history
+        with metrics.STAGE_SECONDS.time(stage='history'):
             history_record = history_manager.add_compression_record(
-                filename=file.filename,
+                filename=filename,
                 original_size=metadata['original_size'],
                 compressed_size=metadata['compressed_size'],
                 quality=quality,
                 aspect_ratio=resize
             )
-            
-            # Prepare response data
-            processed_files.append({
-                'filename': file.filename,
-                'original_size': metadata['original_size'],
-                'compressed_size': metadata['compressed_size'],
-                'compression_ratio': metadata['compression_ratio'],
-                'original_dimensions': metadata['original_dimensions'],
-                'final_dimensions': metadata['final_dimensions'],
-                'compressed_data': base64.b64encode(compressed_bytes).decode('utf-8')
-            })
-            
-        except Exception as e:
-            processed_files.append({
-                'filename': file.filename,
-                'error': f'Processing failed: {str(e)}'
-            })
+        
+        return {
+            'filename': filename,
+            'original_size': metadata['original_size'],
+            'compressed_size': metadata['compressed_size'],
+            'compression_ratio': metadata['compression_ratio'],
+            'original_dimensions': metadata['original_dimensions'],
+            'final_dimensions': metadata['final_dimensions'],
+        }, compressed_bytes
+        
+    except Exception as e:
+        if compressed_bytes is not None:
+            # Compression failures are counted by the upload executor
+            metrics.ERRORS.inc(stage='history', type=type(e).__name__)
+        return {
+            'filename': filename,
+            'error': f'Processing failed: {str(e)}'
+        }, None
+
+def _process_job_file(input_path, filename, options):
+    """Compress one saved job upload through the result cache and record it in history"""
+    with open(input_path, 'rb') as f:
+        compressed_bytes, metadata = upload_executor.compress(f, options['quality'], options['resize'])
+    return _record_upload(filename, compressed_bytes, metadata, options['quality'], options['resize'])
+
+job_queue = JobQueue(_process_job_file)
+metrics.REGISTRY.gauge('image_compressor_job_queue_depth', 'Background job files queued or being compressed',
+                       function=lambda: job_queue.pending_files())
+
+@app.route('/jobs/<quality>/<maxSize>/<resize>', methods=['POST'])
+def submit_job(quality, maxSize, resize):
+    """Queue an upload batch for background compression and return its job ID at once"""
+    image_files = request.files.getlist('images')
+    if not image_files:
+        return jsonify({'error': 'No images selected for upload'}), 400
     
-    return jsonify({
-        "message": "Images processed successfully",
-        "processed_files": processed_files,
-        "total_files": len(processed_files)
-    }), 200
+    try:
+        job = job_queue.submit(image_files, {'quality': quality, 'resize': resize},
+                               order=longest_first(image_files))
+    except Exception as e:
+        return jsonify({'error': f'Failed to queue job: {str(e)}'}), 500
+    
+    job['status_url'] = f"/jobs/{job['job_id']}"
+    return jsonify(job), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Progress and per-file results of a queued batch"""
+    job = job_queue.status(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    
+    for result in job['results']:
+        if result is not None and 'error' not in result:
+            result['output_url'] = f"/jobs/{job_id}/files/{result['index']}"
+    return jsonify(job), 200
+
+@app.route('/jobs/<job_id>/files/<int:index>', methods=['GET'])
+def get_job_file(job_id, index):
+    """Download one compressed output of a job"""
+    output = job_queue.output(job_id, index)
+    if output is None:
+        return jsonify({'error': 'Output not available (unknown job, failed or unfinished file, or expired)'}), 404
+    
+    output_path, filename = output
+    download_name = f"{os.path.splitext(os.path.basename(filename))[0] or 'image'}.jpg"
+    return send_file(output_path, mimetype='image/jpeg', as_attachment=True, download_name=download_name)
+
+def _single_upload():
+    """
+    Return the one file uploaded in the 'image' or 'images' field, or None.
+    Raises ValueError when several files are sent, rather than silently
+    handling only the first.
+    """
+    files = [file for field in ('image', 'images') for file in request.files.getlist(field)]
+    if len(files) > 1:
+        raise ValueError(f'Expected one file but received {len(files)}; send each file in its own request')
+    return files[0] if files else None
+
+@app.route('/compress-huffman', methods=['POST'])
+def compress_huffman():
+    """Compress one uploaded file into a .huff container streamed back in chunks"""
+    try:
+        file = _single_upload()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if file is None or not file.filename:
+        return jsonify({'error': 'No image uploaded (use the "image" or "images" field)'}), 400
+    
+    try:
+        result, stats = huffman_compressor.compress_stream(file.stream)
+    except Exception as e:
+        return jsonify({'error': f'Huffman compression failed: {str(e)}'}), 500
+    
+    headers = huffman_compressor.stats_headers(stats)
+    headers['Content-Disposition'] = f'attachment; filename="{os.path.splitext(file.filename)[0]}.huff"'
+    return Response(huffman_compressor.iter_chunks(result), mimetype='application/octet-stream', headers=headers)
+
+@app.route('/decompress-huffman', methods=['POST'])
+def decompress_huffman():
+    """Restore an uploaded .huff container, streaming the original bytes back in chunks"""
+    try:
+        file = _single_upload()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if file is None or not file.filename:
+        return jsonify({'error': 'No .huff file uploaded (use the "image" or "images" field)'}), 400
+    
+    try:
+        result, stats = huffman_compressor.decompress_stream(file.stream)
+    except OutputTooLarge as e:
+        return jsonify({'error': f'.huff file is too large to restore: {str(e)}'}), 413
+    except ValueError as e:
+        return jsonify({'error': f'Invalid .huff file: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'error': f'Huffman decompression failed: {str(e)}'}), 500
+    
+    headers = huffman_compressor.stats_headers(stats)
+    headers['Content-Disposition'] = f'attachment; filename="{os.path.splitext(file.filename)[0]}"'
+    return Response(huffman_compressor.iter_chunks(result), mimetype='application/octet-stream', headers=headers)
 
 @app.route('/history', methods=['GET'])
 def get_history():
@@ -142,6 +355,36 @@ def clear_history():
     except Exception as e:
         return jsonify({"error": f"Failed to clear history: {str(e)}"}), 500
 
+@app.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Get result cache hit, miss and eviction counters"""
+    return jsonify(result_cache.stats()), 200
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Counters, gauges and per-stage latency histograms in the Prometheus text format"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/debug/profile', methods=['GET'])
+def debug_profile():
+    """Sample every thread for ?seconds=N (default 10) and return collapsed stacks for a flame graph"""
+    if not profiler.PROFILER_TOKEN:
+        return jsonify({'error': 'Profiling is disabled'}), 404
+    if not profiler.authorized(request.headers.get('X-Profile-Token')):
+        return jsonify({'error': 'Invalid profiling token'}), 403
+    try:
+        seconds = float(request.args.get('seconds', 10))
+    except ValueError:
+        return jsonify({'error': 'seconds must be a number'}), 400
+    if not math.isfinite(seconds):
+        return jsonify({'error': 'seconds must be a finite number'}), 400
+    
+    sampler = profiler.sample_for(seconds)
+    if sampler is None:
+        return jsonify({'error': 'Another profile is already running'}), 409
+    return Response(sampler.collapsed(), content_type=profiler.COLLAPSED_MIMETYPE,
+                    headers={'X-Profile-Samples': str(sampler.samples)})
+
 @app.route('/quality-options', methods=['GET'])
 def get_quality_options():
     """Get available quality options"""
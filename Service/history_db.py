@@ -1,5 +1,6 @@
 import json
 import os
+import threading
 from datetime import datetime
 from pymongo import MongoClient
 from typing import List, Dict, Any
@@ -21,6 +22,8 @@ class HistoryManager:
         self.client = None
         self.db = None
         self.collection = None
+        # Serializes JSON file updates from concurrent request and job threads
+        self._json_lock = threading.Lock()
         
         # Ensure data directory exists
         os.makedirs(os.path.dirname(self.json_file_path), exist_ok=True)
@@ -79,12 +82,13 @@ class HistoryManager:
     def _add_to_json(self, record: Dict[str, Any]):
         """Add record to JSON file as fallback"""
         try:
-            history = self._load_json_history()
-            record['_id'] = len(history) + 1
-            history.append(record)
-            
-            with open(self.json_file_path, 'w') as f:
-                json.dump(history, f, indent=2, default=str)
+            with self._json_lock:
+                history = self._load_json_history()
+                record['_id'] = len(history) + 1
+                history.append(record)
+                
+                with open(self.json_file_path, 'w') as f:
+                    json.dump(history, f, indent=2, default=str)
             logger.info(f"Record added to JSON: {record['filename']}")
         except Exception as e:
             logger.error(f"Failed to add record to JSON: {e}")
@@ -135,7 +139,7 @@ class HistoryManager:
         
         # Also clear JSON file
         try:
-            with open(self.json_file_path, 'w') as f:
+            with self._json_lock, open(self.json_file_path, 'w') as f:
                 json.dump([], f)
             logger.info("JSON history cleared")
         except Exception as e:
@@ -0,0 +1,156 @@
+import io
+import os
+import sys
+import tempfile
+from typing import BinaryIO, Iterator, Tuple
+from dotenv import load_dotenv
+
+# The Huffman codec modules import each other as top-level modules
+HUFFMAN_DIR = os.path.join(os.path.dirname(__file__), '..', 'compressor', 'HuffmanImageCompressor')
+if HUFFMAN_DIR not in sys.path:
+    sys.path.insert(0, HUFFMAN_DIR)
+
+import huff_container
+import huffman_codec
+import predictive_filters
+
+# Load environment variables
+load_dotenv()
+
+class OutputTooLarge(ValueError):
+    """A container would restore to more than HuffmanCompressor.MAX_OUTPUT_SIZE bytes"""
+
+class _LimitedWriter:
+    """File object wrapper that raises OutputTooLarge once more than limit bytes are written"""
+
+    def __init__(self, destination: BinaryIO, limit: int):
+        self.destination = destination
+        self.limit = limit
+        self.written = 0
+
+    def write(self, data) -> int:
+        self.written += len(data)
+        if self.written > self.limit:
+            raise OutputTooLarge(f"Restored data exceeds the {self.limit} byte limit")
+        return self.destination.write(data)
+
+class HuffmanCompressor:
+    """Compress and restore uploads with the block Huffman codec without holding results in memory"""
+
+    # Bytes per chunk yielded to the response
+    CHUNK_SIZE = 64 * 1024
+
+    # Results larger than this are spooled to a temporary file instead of memory
+    SPOOL_MAX_SIZE = int(os.getenv('HUFFMAN_SPOOL_MAX_SIZE', 4 * 1024 * 1024))
+
+    # Largest restored output accepted from an upload; containers claiming more are refused
+    MAX_OUTPUT_SIZE = int(os.getenv('HUFFMAN_MAX_OUTPUT_SIZE', 256 * 1024 * 1024))
+
+    def __init__(self, backend: str = None):
+        self.backend = backend
+
+    def compress_stream(self, source: BinaryIO) -> Tuple[BinaryIO, dict]:
+        """
+        Compress a seekable upload stream into a .huff container
+
+        Args:
+            source: Binary file object positioned at the start of the data
+
+        Returns:
+            Tuple of (spooled_container_file rewound to 0, stats_dict)
+        """
+        destination = tempfile.SpooledTemporaryFile(max_size=self.SPOOL_MAX_SIZE)
+        block_stats = {}
+        try:
+            original_size, compressed_size = huffman_codec.compress_fileobj(
+                source, destination, backend=self.backend, stats=block_stats
+            )
+        except Exception:
+            destination.close()
+            raise
+        destination.seek(0)
+
+        stats = {
+            'original_size': original_size,
+            'compressed_size': compressed_size,
+            'compression_ratio': round((1 - compressed_size / original_size) * 100, 2) if original_size > 0 else 0,
+            'blocks': block_stats.get('blocks', 0),
+            'stored_blocks': block_stats.get('stored_blocks', 0),
+        }
+        return destination, stats
+
+    def decompress_stream(self, source: BinaryIO) -> Tuple[BinaryIO, dict]:
+        """
+        Restore the original bytes of a .huff container upload. Pixel
+        containers are restored as a PNG image. The service holds no shared
+        codebooks, so containers written with a shared .hcb codebook (see
+        shared_codebooks) are rejected with a ValueError; restore those with
+        image_compressor or decompress_file. Declared sizes are checked
+        against MAX_OUTPUT_SIZE before decoding, and the decoders reject
+        lengths the payload cannot hold, so forged headers cannot make the
+        server allocate more than a bounded multiple of the upload.
+
+        Args:
+            source: Binary file object positioned at the start of the container
+
+        Returns:
+            Tuple of (spooled_output_file rewound to 0, stats_dict)
+
+        Raises:
+            OutputTooLarge: The restored data would exceed MAX_OUTPUT_SIZE
+            ValueError: The upload is not a valid .huff container
+        """
+        start = source.tell()
+        compressed_size = source.seek(0, os.SEEK_END) - start
+        source.seek(start)
+        version = huff_container.peek_version(source.read(huff_container.STREAM_HEADER.size))
+        source.seek(start)
+
+        destination = tempfile.SpooledTemporaryFile(max_size=self.SPOOL_MAX_SIZE)
+        try:
+            if version == huff_container.STREAM_VERSION:
+                # Block streams decode one block at a time; the limit stops them after the block that crosses it
+                huffman_codec.decompress_stream(source, _LimitedWriter(destination, self.MAX_OUTPUT_SIZE))
+            elif version == huff_container.PIXEL_VERSION:
+                container = source.read()
+                header = huff_container.read_pixel_header(io.BytesIO(container))
+                self._check_output_size(header['width'] * header['height'] * header['channels'])
+                pixels, mode = predictive_filters.decompress_pixels(container)
+                height, width = pixels.shape[:2]
+                predictive_filters.Image.frombytes(mode, (width, height), pixels.tobytes()).save(destination, 'PNG')
+            else:
+                container = source.read()
+                self._check_output_size(huff_container.decode_header(container)['original_length'])
+                destination.write(huffman_codec.decompress(container))
+        except Exception:
+            destination.close()
+            raise
+
+        original_size = destination.tell()
+        destination.seek(0)
+        return destination, {
+            'original_size': original_size,
+            'compressed_size': compressed_size,
+            'container_version': version,
+        }
+
+    def _check_output_size(self, declared_size: int):
+        if declared_size > self.MAX_OUTPUT_SIZE:
+            raise OutputTooLarge(f"Container declares {declared_size} bytes, above the {self.MAX_OUTPUT_SIZE} byte limit")
+
+    def iter_chunks(self, result: BinaryIO) -> Iterator[bytes]:
+        """Yield a spooled result in CHUNK_SIZE pieces and close it afterwards"""
+        try:
+            while True:
+                chunk = result.read(self.CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            result.close()
+
+    @staticmethod
+    def stats_headers(stats: dict) -> dict:
+        """Response headers carrying compression stats, e.g. X-Original-Size"""
+        return {'X-' + '-'.join(word.capitalize() for word in key.split('_')): str(value)
+                for key, value in stats.items()}
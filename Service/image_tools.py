@@ -1,6 +1,7 @@
 from PIL import Image, ImageOps
 import io
 import os
+import time
 from typing import Tuple, Optional
 from dotenv import load_dotenv
 
@@ -25,11 +26,14 @@ class ImageCompressor:
         'original': None
     }
     
+    # Format of every compressed output
+    OUTPUT_FORMAT = 'JPEG'
+    
     def __init__(self):
         pass
     
     def compress_image(self, image_file, quality: str = 'medium', aspect_ratio: str = 'original', 
-                      max_size: Optional[int] = None) -> Tuple[bytes, dict]:
+                      max_size: Optional[int] = None, timings: Optional[dict] = None) -> Tuple[bytes, dict]:
         """
         Compress an image with specified quality and aspect ratio
         
@@ -38,19 +42,27 @@ class ImageCompressor:
             quality: Quality level ('high', 'medium', 'low')
             aspect_ratio: Aspect ratio ('4:3', '16:9', '1:1', 'original')
             max_size: Maximum file size in bytes (optional)
+            timings: Optional dict that receives the seconds spent in each stage
+                (decode, flatten, crop, encode, reencode) that ran
         
         Returns:
             Tuple of (compressed_image_bytes, metadata_dict)
         """
+        timings = timings if timings is not None else {}
+        start = time.perf_counter()
+        
         # Open and process the image
         if hasattr(image_file, 'read'):
+            # Size from seek/tell; Pillow reads the stream itself, so it is never copied
+            original_size = image_file.seek(0, os.SEEK_END)
             image_file.seek(0)
             img = Image.open(image_file)
-            original_size = len(image_file.read())
-            image_file.seek(0)
         else:
             img = Image.open(image_file)
             original_size = os.path.getsize(image_file)
+        # Decode now rather than lazily inside the first transform, so it is timed on its own
+        img.load()
+        start = self._lap(timings, 'decode', start)
         
         # Convert to RGB if necessary (for JPEG compatibility)
         if img.mode in ('RGBA', 'LA', 'P'):
@@ -59,18 +71,20 @@ class ImageCompressor:
                 img = img.convert('RGBA')
             background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
             img = background
+            start = self._lap(timings, 'flatten', start)
         
         original_dimensions = img.size
         
         # Apply aspect ratio transformation if specified
         if aspect_ratio != 'original' and aspect_ratio in self.ASPECT_RATIOS:
             img = self._apply_aspect_ratio(img, aspect_ratio)
+            start = self._lap(timings, 'crop', start)
         
         # Get quality setting
         jpeg_quality = self.QUALITY_SETTINGS.get(quality, 65)
         
         # Compress image
-        compressed_bytes = self._compress_to_bytes(img, jpeg_quality, max_size)
+        compressed_bytes = self._compress_to_bytes(img, jpeg_quality, max_size, timings)
         
         # Prepare metadata
         metadata = {
@@ -86,6 +100,13 @@ class ImageCompressor:
         
         return compressed_bytes, metadata
     
+    @staticmethod
+    def _lap(timings: dict, stage: str, start: float) -> float:
+        """Record the seconds since start under stage and return the current time"""
+        now = time.perf_counter()
+        timings[stage] = timings.get(stage, 0.0) + now - start
+        return now
+    
     def _apply_aspect_ratio(self, img: Image.Image, aspect_ratio: str) -> Image.Image:
         """Apply specified aspect ratio to image"""
         target_width, target_height = self.ASPECT_RATIOS[aspect_ratio]
@@ -117,12 +138,17 @@ class ImageCompressor:
         
         return cropped_img
     
-    def _compress_to_bytes(self, img: Image.Image, quality: int, max_size: Optional[int] = None) -> bytes:
+    def _compress_to_bytes(self, img: Image.Image, quality: int, max_size: Optional[int] = None,
+                           timings: Optional[dict] = None) -> bytes:
         """Compress image to bytes with specified quality"""
+        timings = timings if timings is not None else {}
+        start = time.perf_counter()
+        
         # Initial compression
         img_bytes_io = io.BytesIO()
-        img.save(img_bytes_io, format='JPEG', quality=quality, optimize=True)
+        img.save(img_bytes_io, format=self.OUTPUT_FORMAT, quality=quality, optimize=True)
         compressed_bytes = img_bytes_io.getvalue()
+        start = self._lap(timings, 'encode', start)
         
         # If max_size is specified and exceeded, reduce quality iteratively
         if max_size and len(compressed_bytes) > max_size:
@@ -130,8 +156,9 @@ class ImageCompressor:
             while len(compressed_bytes) > max_size and current_quality > 10:
                 current_quality -= 5
                 img_bytes_io = io.BytesIO()
-                img.save(img_bytes_io, format='JPEG', quality=current_quality, optimize=True)
+                img.save(img_bytes_io, format=self.OUTPUT_FORMAT, quality=current_quality, optimize=True)
                 compressed_bytes = img_bytes_io.getvalue()
+            self._lap(timings, 'reencode', start)
         
         return compressed_bytes
     
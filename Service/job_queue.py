@@ -0,0 +1,176 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+class JobQueue:
+    """In-process queue that compresses uploaded batches in background worker threads"""
+
+    def __init__(self, process_file: Callable[[str, str, dict], Tuple[dict, Optional[bytes]]],
+                 workers: Optional[int] = None, ttl_seconds: Optional[float] = None,
+                 work_dir: Optional[str] = None):
+        """
+        Args:
+            process_file: Called as process_file(input_path, filename, options) and
+                returns (metadata_dict, output_bytes or None on failure)
+            workers: Worker threads shared by all jobs (JOB_WORKERS, default CPU count)
+            ttl_seconds: How long finished jobs and their outputs are kept (JOB_TTL_SECONDS, default 1 hour)
+            work_dir: Directory for uploaded inputs and outputs (default: a new temp directory)
+        """
+        self.process_file = process_file
+        self.workers = workers or int(os.getenv('JOB_WORKERS', os.cpu_count() or 2))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv('JOB_TTL_SECONDS', 3600))
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix='compression-jobs-')
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='compression-job')
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+    def submit(self, uploads: list, options: dict, order: Optional[List[int]] = None) -> Dict[str, Any]:
+        """
+        Save the uploads to the job directory and queue one task per file
+
+        Args:
+            uploads: File objects with .filename and .save(path), e.g. werkzeug FileStorage
+            options: Passed unchanged to process_file
+            order: Indices of uploads in the order their tasks are queued (default: upload order);
+                results are always reported by upload index
+
+        Returns:
+            Status dict of the new job
+        """
+        self.cleanup_expired()
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.work_dir, job_id)
+        os.makedirs(job_dir)
+
+        # The request closes its uploads when it returns, so keep our own copies
+        input_paths = []
+        for index, upload in enumerate(uploads):
+            input_path = os.path.join(job_dir, f"input-{index}")
+            upload.save(input_path)
+            input_paths.append(input_path)
+
+        job = {
+            'job_id': job_id,
+            'status': 'queued',
+            'directory': job_dir,
+            'filenames': [upload.filename for upload in uploads],
+            'results': [None] * len(uploads),
+            'outputs': [None] * len(uploads),
+            'completed_files': 0,
+            'failed_files': 0,
+            'created_at': time.time(),
+            'finished_at': None,
+        }
+        if not uploads:
+            job['status'] = 'completed'
+            job['finished_at'] = job['created_at']
+        with self.lock:
+            self.jobs[job_id] = job
+        for index in (order if order is not None else range(len(input_paths))):
+            self.executor.submit(self._run_file, job, index, input_paths[index], options)
+        return self.status(job_id)
+
+    def _run_file(self, job: Dict[str, Any], index: int, input_path: str, options: dict):
+        filename = job['filenames'][index]
+        with self.lock:
+            job['status'] = 'running'
+        # Whatever fails, the file is recorded so the job can finish and expire
+        try:
+            metadata, output = self.process_file(input_path, filename, options)
+            output_path = None
+            if output is not None:
+                output_path = os.path.join(job['directory'], f"output-{index}")
+                with open(output_path, 'wb') as f:
+                    f.write(output)
+        except Exception as e:
+            metadata, output, output_path = {'filename': filename, 'error': f'Processing failed: {str(e)}'}, None, None
+        try:
+            os.remove(input_path)
+        except OSError:
+            # The job directory, input included, is removed when the job expires
+            pass
+
+        with self.lock:
+            job['results'][index] = metadata
+            job['outputs'][index] = output_path
+            job['completed_files'] += 1
+            job['failed_files'] += output is None
+            if job['completed_files'] == len(job['filenames']):
+                job['status'] = 'completed'
+                job['finished_at'] = time.time()
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Progress and per-file results of a job
+
+        Returns:
+            Status dict, or None if the job is unknown or has expired
+        """
+        self.cleanup_expired()
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            total = len(job['filenames'])
+            return {
+                'job_id': job_id,
+                'status': job['status'],
+                'total_files': total,
+                'completed_files': job['completed_files'],
+                'failed_files': job['failed_files'],
+                'progress': round(job['completed_files'] / total, 4) if total else 1.0,
+                'created_at': self._timestamp(job['created_at']),
+                'finished_at': self._timestamp(job['finished_at']),
+                'expires_at': self._timestamp(job['finished_at'] and job['finished_at'] + self.ttl_seconds),
+                'results': [dict(result, index=index) if result is not None else None
+                            for index, result in enumerate(job['results'])],
+            }
+
+    def output(self, job_id: str, index: int) -> Optional[Tuple[str, str]]:
+        """
+        Returns:
+            Tuple of (output_path, original_filename) for a finished file,
+            or None if the job, file or output does not exist (yet)
+        """
+        self.cleanup_expired()
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or not 0 <= index < len(job['outputs']) or job['outputs'][index] is None:
+                return None
+            return job['outputs'][index], job['filenames'][index]
+
+    def pending_files(self) -> int:
+        """Files queued or being compressed, across all jobs"""
+        with self.lock:
+            return sum(len(job['filenames']) - job['completed_files'] for job in self.jobs.values())
+
+    def cleanup_expired(self, now: Optional[float] = None) -> int:
+        """
+        Remove finished jobs older than the TTL together with their files
+
+        Returns:
+            Number of jobs removed
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            expired = [job for job in self.jobs.values()
+                       if job['finished_at'] is not None and job['finished_at'] + self.ttl_seconds <= now]
+            for job in expired:
+                del self.jobs[job['job_id']]
+        for job in expired:
+            shutil.rmtree(job['directory'], ignore_errors=True)
+        return len(expired)
+
+    @staticmethod
+    def _timestamp(seconds: Optional[float]) -> Optional[str]:
+        return datetime.fromtimestamp(seconds).isoformat() if seconds else None
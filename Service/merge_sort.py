@@ -202,4 +202,73 @@ def merge_by_compression_ratio(left, right, ascending):
         merged.append(right[right_index])
         right_index += 1
     
-    return merged
\ No newline at end of file
+    return merged
+
+def merge_sort_by_cost(jobs, ascending=False):
+    """
+    Sort upload jobs by estimated compression cost using merge sort algorithm.
+    Stable, so jobs of equal cost keep their upload order.
+    
+    Args:
+        jobs: List of job records with 'cost' field
+        ascending: Boolean to determine sort order (False for most expensive first)
+    
+    Returns:
+        Sorted list of job records
+    """
+    if len(jobs) <= 1:
+        return jobs
+    
+    # Divide
+    mid = len(jobs) // 2
+    left_half = jobs[:mid]
+    right_half = jobs[mid:]
+    
+    # Recursively sort both halves
+    left_sorted = merge_sort_by_cost(left_half, ascending)
+    right_sorted = merge_sort_by_cost(right_half, ascending)
+    
+    # Merge the sorted halves
+    return merge_by_cost(left_sorted, right_sorted, ascending)
+
+
+def merge_by_cost(left, right, ascending):
+    """
+    Merge two sorted lists by estimated cost
+    
+    Args:
+        left: Left sorted list
+        right: Right sorted list
+        ascending: Sort order
+        
+    Returns:
+        Merged sorted list
+    """
+    merged = []
+    left_index = 0
+    right_index = 0
+    
+    # Merge elements while both lists have elements
+    while left_index < len(left) and right_index < len(right):
+        left_cost = left[left_index]['cost']
+        right_cost = right[right_index]['cost']
+        
+        # Compare costs based on sort order; ties take the left element to stay stable
+        if (ascending and left_cost <= right_cost) or (not ascending and left_cost >= right_cost):
+            merged.append(left[left_index])
+            left_index += 1
+        else:
+            merged.append(right[right_index])
+            right_index += 1
+    
+    # Add remaining elements from left list
+    while left_index < len(left):
+        merged.append(left[left_index])
+        left_index += 1
+    
+    # Add remaining elements from right list
+    while right_index < len(right):
+        merged.append(right[right_index])
+        right_index += 1
+    
+    return merged
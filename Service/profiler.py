@@ -0,0 +1,189 @@
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Optional
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Profiling is disabled unless a token is configured; clients send it in X-Profile-Token
+PROFILER_TOKEN = os.getenv('PROFILER_TOKEN', '')
+PROFILER_MAX_SECONDS = float(os.getenv('PROFILER_MAX_SECONDS', 60))
+PROFILER_INTERVAL_MS = float(os.getenv('PROFILER_INTERVAL_MS', 5))
+
+# X-Profile header values accepted by RequestProfiler
+PROFILE_MODES = ('collapsed', 'pstats', 'text')
+
+COLLAPSED_MIMETYPE = 'text/plain; charset=utf-8'
+PSTATS_MIMETYPE = 'application/octet-stream'
+
+# Only one sampler runs at a time; each one already sees every thread
+_sampling = threading.Lock()
+
+def authorized(token: Optional[str]) -> bool:
+    """True if profiling is enabled and token matches PROFILER_TOKEN"""
+    return bool(PROFILER_TOKEN) and hmac.compare_digest((token or '').encode(), PROFILER_TOKEN.encode())
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class StackSampler:
+    """
+    Sample the Python stacks of every thread at a fixed interval from a
+    background thread, counting identical stacks. Costs one stack walk per
+    thread per interval and nothing when not running, so it is safe on live
+    instances, including work done on the upload executor's pool threads.
+    """
+
+    def __init__(self, interval: Optional[float] = None):
+        """
+        Args:
+            interval: Seconds between samples (PROFILER_INTERVAL_MS, default 5 ms)
+        """
+        self.interval = interval if interval is not None else PROFILER_INTERVAL_MS / 1000
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        """Record the current stack of every thread except the sampler's own"""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, f'thread-{ident}'))
+            self.stacks[';'.join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='profiler-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        """Stacks in the collapsed format read by flamegraph.pl and speedscope: 'root;...;leaf count' per line"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+def sample_for(seconds: float, interval: Optional[float] = None) -> Optional[StackSampler]:
+    """
+    Sample all threads for seconds (capped at PROFILER_MAX_SECONDS)
+
+    Returns:
+        The finished StackSampler, or None if another profile is already running
+    """
+    if not _sampling.acquire(blocking=False):
+        return None
+    try:
+        sampler = StackSampler(interval)
+        sampler.start()
+        time.sleep(min(max(seconds, 0), PROFILER_MAX_SECONDS))
+        sampler.stop()
+        return sampler
+    finally:
+        _sampling.release()
+
+class RequestProfiler:
+    """
+    WSGI middleware that profiles single requests sent with an X-Profile
+    header and a valid X-Profile-Token. The response body, streamed or not,
+    is generated inside the profile and replaced by the profile output:
+
+        collapsed: sampled stacks of all threads while the request ran
+        pstats:    cProfile dump of the request thread, for snakeviz or flameprof
+        text:      the same cProfile data as a table sorted by cumulative time
+    """
+
+    def __init__(self, app, limit: int = 60):
+        """
+        Args:
+            app: The wrapped WSGI application
+            limit: Rows in the 'text' table
+        """
+        self.app = app
+        self.limit = limit
+
+    def __call__(self, environ, start_response):
+        mode = environ.get('HTTP_X_PROFILE', '').lower()
+        if mode not in PROFILE_MODES or not authorized(environ.get('HTTP_X_PROFILE_TOKEN')):
+            return self.app(environ, start_response)
+
+        captured = {}
+        def capture_response(status, headers, exc_info=None):
+            captured['status'] = status
+            return lambda data: None
+
+        if mode == 'collapsed':
+            if not _sampling.acquire(blocking=False):
+                start_response('409 CONFLICT', [('Content-Type', COLLAPSED_MIMETYPE)])
+                return [b'Another profile is already running\n']
+            try:
+                sampler = StackSampler()
+                sampler.start()
+                try:
+                    self._consume(environ, capture_response)
+                finally:
+                    sampler.stop()
+            finally:
+                _sampling.release()
+            body, content_type = sampler.collapsed().encode('utf-8'), COLLAPSED_MIMETYPE
+        else:
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                self._consume(environ, capture_response)
+            finally:
+                profile.disable()
+            body, content_type = self._pstats(profile, mode), (
+                PSTATS_MIMETYPE if mode == 'pstats' else COLLAPSED_MIMETYPE)
+
+        start_response('200 OK', [('Content-Type', content_type),
+                                  ('Content-Length', str(len(body))),
+                                  ('X-Profile-Original-Status', captured.get('status', ''))])
+        return [body]
+
+    def _consume(self, environ, start_response):
+        # Generate the whole body, so streamed responses do their work inside the profile
+        iterable = self.app(environ, start_response)
+        try:
+            for _ in iterable:
+                pass
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
+
+    def _pstats(self, profile: cProfile.Profile, mode: str) -> bytes:
+        if mode == 'text':
+            output = io.StringIO()
+            pstats.Stats(profile, stream=output).sort_stats('cumulative').print_stats(self.limit)
+            return output.getvalue().encode('utf-8')
+        # pstats only writes its marshal format to a file
+        fd, path = tempfile.mkstemp(suffix='.prof')
+        os.close(fd)
+        try:
+            profile.dump_stats(path)
+            with open(path, 'rb') as f:
+                return f.read()
+        finally:
+            os.remove(path)
@@ -0,0 +1,113 @@
+import json
+import time
+import uuid
+import zipfile
+from typing import Iterable, Iterator, Optional, Tuple
+
+from werkzeug.utils import secure_filename
+
+# Streamed response modes for batch results, besides the default JSON body
+ZIP_MIMETYPE = 'application/zip'
+MULTIPART_MIMETYPE = 'multipart/mixed'
+
+class _ChunkBuffer:
+    """Write-only file object that hands back what was written since the last drain"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, *args):
+        # zipfile falls back to data descriptors when the output cannot seek
+        raise OSError("streamed output is not seekable")
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def output_filename(filename: str, extension: str, used_names: set) -> str:
+    """Safe, unique archive name for a result, e.g. 'photo.jpg' or 'photo (2).jpg'"""
+    stem = secure_filename(filename.rsplit('.', 1)[0]) or 'image'
+    name = f"{stem}{extension}"
+    counter = 2
+    while name in used_names:
+        name = f"{stem} ({counter}){extension}"
+        counter += 1
+    used_names.add(name)
+    return name
+
+def zip_stream(results: Iterable[Tuple[dict, Optional[bytes]]], extension: str = '.jpg') -> Iterator[bytes]:
+    """
+    Stream results as a ZIP archive, one stored entry per compressed file
+    written as soon as it arrives, followed by manifest.json holding the
+    metadata (or error) of every file
+
+    Args:
+        results: Iterable of (metadata_dict, compressed_bytes or None on failure)
+        extension: Extension given to the compressed entries
+
+    Yields:
+        Chunks of the archive
+    """
+    buffer = _ChunkBuffer()
+    manifest = []
+    used_names = set()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for metadata, compressed_bytes in results:
+            entry = dict(metadata)
+            if compressed_bytes is not None:
+                entry['archive_name'] = output_filename(metadata['filename'], extension, used_names)
+                info = zipfile.ZipInfo(entry['archive_name'], time.localtime()[:6])
+                archive.writestr(info, compressed_bytes)
+            manifest.append(entry)
+            chunk = buffer.drain()
+            if chunk:
+                yield chunk
+        archive.writestr(zipfile.ZipInfo('manifest.json', time.localtime()[:6]),
+                         json.dumps({'processed_files': manifest, 'total_files': len(manifest)}, indent=2))
+    yield buffer.drain()
+
+def multipart_stream(results: Iterable[Tuple[dict, Optional[bytes]]], boundary: str,
+                     content_type: str = 'image/jpeg', extension: str = '.jpg') -> Iterator[bytes]:
+    """
+    Stream results as a multipart/mixed body with one part per file. The
+    file's metadata travels as JSON in the part's X-Metadata header; a file
+    that failed gets an application/json part holding its error.
+
+    Args:
+        results: Iterable of (metadata_dict, compressed_bytes or None on failure)
+        boundary: Multipart boundary, also sent in the response Content-Type
+
+    Yields:
+        One chunk per part, then the closing boundary
+    """
+    used_names = set()
+    for metadata, compressed_bytes in results:
+        if compressed_bytes is None:
+            part_type, body = 'application/json', json.dumps(metadata).encode('utf-8')
+            name = output_filename(metadata['filename'], '.json', used_names)
+        else:
+            part_type, body = content_type, compressed_bytes
+            name = output_filename(metadata['filename'], extension, used_names)
+        headers = (f"--{boundary}\r\n"
+                   f"Content-Type: {part_type}\r\n"
+                   f"Content-Disposition: attachment; filename=\"{name}\"\r\n"
+                   f"Content-Length: {len(body)}\r\n"
+                   f"X-Metadata: {json.dumps(metadata)}\r\n\r\n")
+        yield headers.encode('utf-8') + body + b"\r\n"
+    yield f"--{boundary}--\r\n".encode('utf-8')
+
+def new_boundary() -> str:
+    return f"batch-{uuid.uuid4().hex}"
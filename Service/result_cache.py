@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Disk entries are: metadata length u32 | metadata JSON | compressed bytes
+_DISK_HEADER = struct.Struct('>I')
+_DISK_SUFFIX = '.entry'
+
+# Bytes hashed per read when hashing a stream
+_HASH_CHUNK_SIZE = 256 * 1024
+
+def content_digest(source) -> bytes:
+    """
+    SHA-256 of bytes-like data, or of a seekable stream read in chunks from
+    its start (the stream is rewound afterwards), so large spooled uploads
+    are hashed without loading them into memory
+    """
+    digest = hashlib.sha256()
+    if hasattr(source, 'read'):
+        source.seek(0)
+        for chunk in iter(lambda: source.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+        source.seek(0)
+    else:
+        digest.update(source)
+    return digest.digest()
+
+class ResultCache:
+    """
+    Content-addressed cache of compression results: an in-memory LRU tier
+    capped in bytes and an optional on-disk tier that every process on the
+    host can share
+    """
+
+    def __init__(self, memory_bytes: Optional[int] = None, disk_dir: Optional[str] = None,
+                 disk_bytes: Optional[int] = None):
+        """
+        Args:
+            memory_bytes: Byte cap of the memory tier, 0 to disable it
+                (RESULT_CACHE_MEMORY_BYTES, default 64 MB)
+            disk_dir: Directory of the disk tier, None to disable it (RESULT_CACHE_DIR)
+            disk_bytes: Byte cap of the disk tier (RESULT_CACHE_DISK_BYTES, default 1 GB)
+        """
+        self.memory_bytes = memory_bytes if memory_bytes is not None else int(
+            os.getenv('RESULT_CACHE_MEMORY_BYTES', 64 * 1024 * 1024))
+        self.disk_dir = disk_dir if disk_dir is not None else os.getenv('RESULT_CACHE_DIR') or None
+        self.disk_bytes = disk_bytes if disk_bytes is not None else int(
+            os.getenv('RESULT_CACHE_DISK_BYTES', 1024 * 1024 * 1024))
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+        self._entries = OrderedDict()
+        self._entry_bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'memory_evictions': 0,
+            'disk_evictions': 0,
+        }
+
+    @staticmethod
+    def make_key(source, quality: str, aspect_ratio: str, max_size: Optional[int], output_format: str) -> str:
+        """Hash of the input (bytes or seekable stream) and every setting that changes the output"""
+        settings = json.dumps([quality, aspect_ratio, max_size, output_format]).encode('utf-8')
+        return hashlib.sha256(content_digest(source) + settings).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[bytes, dict]]:
+        """
+        Returns:
+            Tuple of (compressed_bytes, metadata_dict), or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.counters['memory_hits'] += 1
+                return entry[0], dict(entry[1])
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                self.counters['misses'] += 1
+                return None
+            self.counters['disk_hits'] += 1
+            self._remember(key, entry)
+        return entry[0], dict(entry[1])
+
+    def put(self, key: str, compressed_bytes: bytes, metadata: dict):
+        entry = (bytes(compressed_bytes), dict(metadata))
+        with self._lock:
+            self.counters['stores'] += 1
+            self._remember(key, entry)
+        self._write_disk(key, entry)
+
+    def _remember(self, key: str, entry: Tuple[bytes, dict]):
+        # Caller holds the lock
+        if len(entry[0]) > self.memory_bytes:
+            return
+        if key in self._entries:
+            self._entry_bytes -= len(self._entries.pop(key)[0])
+        self._entries[key] = entry
+        self._entry_bytes += len(entry[0])
+        while self._entry_bytes > self.memory_bytes:
+            _, (evicted_bytes, _) = self._entries.popitem(last=False)
+            self._entry_bytes -= len(evicted_bytes)
+            self.counters['memory_evictions'] += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key + _DISK_SUFFIX)
+
+    def _read_disk(self, key: str) -> Optional[Tuple[bytes, dict]]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                (metadata_length,) = _DISK_HEADER.unpack(f.read(_DISK_HEADER.size))
+                metadata = json.loads(f.read(metadata_length))
+                compressed_bytes = f.read()
+            # Touch the entry so eviction removes the least recently used files first
+            os.utime(path)
+        except (OSError, ValueError, struct.error):
+            # Missing, evicted by another process or half-written by a crashed one
+            return None
+        return compressed_bytes, metadata
+
+    def _write_disk(self, key: str, entry: Tuple[bytes, dict]):
+        if not self.disk_dir:
+            return
+        compressed_bytes, metadata = entry
+        metadata_json = json.dumps(metadata).encode('utf-8')
+        try:
+            # Write then rename, so other processes never read a partial entry
+            fd, temp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_DISK_HEADER.pack(len(metadata_json)))
+                f.write(metadata_json)
+                f.write(compressed_bytes)
+            os.replace(temp_path, self._disk_path(key))
+        except OSError:
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        """Delete the least recently used disk entries until the tier fits its byte cap"""
+        files = []
+        total = 0
+        with os.scandir(self.disk_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(_DISK_SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        for _, size, path in sorted(files):
+            if total <= self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.counters['disk_evictions'] += 1
+
+    def stats(self) -> dict:
+        """Hit, miss, store and eviction counters plus current memory tier usage"""
+        with self._lock:
+            lookups = self.counters['memory_hits'] + self.counters['disk_hits'] + self.counters['misses']
+            return dict(
+                self.counters,
+                hit_rate=round((lookups - self.counters['misses']) / lookups, 4) if lookups else 0,
+                memory_entries=len(self._entries),
+                memory_bytes=self._entry_bytes,
+                memory_limit_bytes=self.memory_bytes,
+                disk_enabled=bool(self.disk_dir),
+                disk_limit_bytes=self.disk_bytes if self.disk_dir else 0,
+            )
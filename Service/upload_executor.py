@@ -0,0 +1,186 @@
+import io
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Iterable, Iterator, Optional, Tuple, Union
+from dotenv import load_dotenv
+
+from Service import metrics
+from Service.image_tools import ImageCompressor
+from Service.result_cache import ResultCache
+
+# Load environment variables
+load_dotenv()
+
+# 'thread' suits Pillow, which releases the GIL while decoding and encoding;
+# 'process' also parallelizes the Python-level work at the cost of copying
+# each upload to a worker; 'serial' compresses in the request thread
+EXECUTOR_KINDS = ('thread', 'process', 'serial')
+
+_image_compressor = ImageCompressor()
+
+def compress_upload(source: Union[bytes, object], quality: str, aspect_ratio: str) -> Tuple[Optional[bytes], Union[dict, str]]:
+    """
+    Compress one upload without raising, so one bad file cannot abort a batch.
+    Defined at module level so process pools can pickle it.
+
+    Args:
+        source: File object, file path or the upload's bytes
+        quality: Quality level ('high', 'medium', 'low')
+        aspect_ratio: Aspect ratio ('4:3', '16:9', '1:1', 'original')
+
+    Returns:
+        Tuple of (compressed_image_bytes, metadata_dict), or (None, error_message) on failure
+    """
+    return compress_upload_profiled(source, quality, aspect_ratio)[0]
+
+def compress_upload_profiled(source: Union[bytes, object], quality: str, aspect_ratio: str):
+    """
+    compress_upload that also returns a profile of the work: seconds per
+    stage, and the exception type on failure. Pools return the profile
+    with the result, so metrics are recorded in the process serving
+    /metrics whichever executor ran the file.
+
+    Returns:
+        Tuple of (compress_upload result, {'stages': dict, 'error': type name or None})
+    """
+    profile = {'stages': {}, 'error': None}
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    try:
+        result = _image_compressor.compress_image(source, quality=quality, aspect_ratio=aspect_ratio,
+                                                  timings=profile['stages'])
+    except Exception as e:
+        profile['error'] = type(e).__name__
+        result = None, str(e)
+    return result, profile
+
+def _record_metrics(result: Tuple[Optional[bytes], Union[dict, str]], profile: Optional[dict]):
+    """Count a finished file; profile is None for cache hits"""
+    compressed_bytes, metadata = result
+    if compressed_bytes is None:
+        metrics.FILES.inc(result='failed')
+        metrics.ERRORS.inc(stage='compress', type=profile['error'] if profile else 'unknown')
+    else:
+        metrics.FILES.inc(result='cached' if profile is None else 'compressed')
+        metrics.BYTES_IN.inc(metadata['original_size'])
+        metrics.BYTES_OUT.inc(len(compressed_bytes))
+    if profile:
+        metrics.record_stages(profile['stages'])
+
+class UploadExecutor:
+    """
+    Compress the files of one request concurrently, returning results as
+    they finish, tagged with their input position. With a ResultCache, uploads already compressed with the
+    same settings are served from it; lookups and stores happen in the
+    calling process, so its counters cover every executor kind.
+    """
+
+    def __init__(self, kind: Optional[str] = None, workers: Optional[int] = None,
+                 cache: Optional[ResultCache] = None):
+        """
+        Args:
+            kind: 'thread', 'process' or 'serial' (UPLOAD_EXECUTOR, default 'thread')
+            workers: Pool size shared by all requests (UPLOAD_WORKERS, default CPU count)
+            cache: Optional ResultCache consulted before compressing
+        """
+        self.kind = (kind or os.getenv('UPLOAD_EXECUTOR', 'thread')).lower()
+        if self.kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown upload executor: {self.kind} (use one of {', '.join(EXECUTOR_KINDS)})")
+        self.workers = workers or int(os.getenv('UPLOAD_WORKERS', os.cpu_count() or 1))
+        self.cache = cache
+        self._executor = None
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+
+    def _pool(self):
+        # Created on first use and kept for later requests
+        if self._executor is None:
+            pool_class = ProcessPoolExecutor if self.kind == 'process' else ThreadPoolExecutor
+            self._executor = pool_class(max_workers=self.workers)
+        return self._executor
+
+    def _cache_key(self, source, quality: str, aspect_ratio: str) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return self.cache.make_key(source, quality, aspect_ratio, None, ImageCompressor.OUTPUT_FORMAT)
+
+    def _cached(self, key: Optional[str]):
+        cached = self.cache.get(key) if key is not None else None
+        if cached:
+            _record_metrics(cached, None)
+        return cached
+
+    def _store(self, key: Optional[str], profiled):
+        result, profile = profiled
+        _record_metrics(result, profile)
+        compressed_bytes, metadata = result
+        if key is not None and compressed_bytes is not None:
+            self.cache.put(key, compressed_bytes, metadata)
+        return result
+
+    def _track(self, amount: int):
+        with self._in_flight_lock:
+            self._in_flight += amount
+
+    def queue_depth(self) -> int:
+        """Files submitted to the pool and not yet finished, across all requests"""
+        return self._in_flight
+
+    def compress(self, source, quality: str, aspect_ratio: str) -> Tuple[Optional[bytes], Union[dict, str]]:
+        """compress_upload of a seekable stream or bytes in the calling thread, through the cache"""
+        key = self._cache_key(source, quality, aspect_ratio)
+        return self._cached(key) or self._store(key, compress_upload_profiled(source, quality, aspect_ratio))
+
+    def compress_all(self, files: Iterable, quality: str,
+                     aspect_ratio: str) -> Iterator[Tuple[int, Tuple[Optional[bytes], Union[dict, str]]]]:
+        """
+        Yield (position in files, compress_upload result) as each file
+        finishes; cache hits skip the pool. Serial and thread executors
+        hand the upload streams to Pillow as they are, so spooled uploads
+        are never copied into memory. Upload streams cannot be pickled, so
+        the process executor reads each one into bytes; at most 2 * workers
+        files are in flight, which bounds how many are held at once.
+        """
+        if self.kind == 'serial':
+            for position, file in enumerate(files):
+                yield position, self.compress(file.stream, quality, aspect_ratio)
+            return
+
+        pool = self._pool()
+        in_flight = []
+        for position, file in enumerate(files):
+            source = file.read() if self.kind == 'process' else file.stream
+            key = self._cache_key(source, quality, aspect_ratio)
+            cached = self._cached(key)
+            if cached:
+                in_flight.append((position, key, cached))
+            else:
+                self._track(1)
+                future = pool.submit(compress_upload_profiled, source, quality, aspect_ratio)
+                future.add_done_callback(lambda _: self._track(-1))
+                in_flight.append((position, key, future))
+            if len(in_flight) >= 2 * self.workers:
+                yield self._collect_first(in_flight)
+        while in_flight:
+            yield self._collect_first(in_flight)
+
+    def _collect_first(self, in_flight: list):
+        """Remove the earliest finished entry of in_flight, waiting for one if none has, and collect it"""
+        finished = [entry for entry in in_flight if isinstance(entry[2], tuple) or entry[2].done()]
+        if not finished:
+            wait([future for _, _, future in in_flight], return_when=FIRST_COMPLETED)
+            finished = [entry for entry in in_flight if entry[2].done()]
+        position, key, pending = finished[0]
+        in_flight.remove(finished[0])
+        return position, self._collect(key, pending)
+
+    def _collect(self, key: Optional[str], pending):
+        if isinstance(pending, tuple):
+            return pending
+        return self._store(key, pending.result())
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -0,0 +1,25 @@
+import os
+import tempfile
+from typing import IO, Optional
+from dotenv import load_dotenv
+from flask import Request
+
+# Load environment variables
+load_dotenv()
+
+# Uploads larger than this are spooled to a temporary file instead of memory
+UPLOAD_SPOOL_BYTES = int(os.getenv('UPLOAD_SPOOL_BYTES', 1024 * 1024))
+
+class SpooledRequest(Request):
+    """Request that keeps each uploaded file in memory only up to UPLOAD_SPOOL_BYTES"""
+
+    def _get_file_stream(self, total_content_length: Optional[int], content_type: Optional[str],
+                         filename: Optional[str] = None, content_length: Optional[int] = None) -> IO[bytes]:
+        return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES, mode='rb+')
+
+def stream_size(stream: IO[bytes]) -> int:
+    """Size of a seekable stream from seek/tell, without reading it; the position is kept"""
+    position = stream.tell()
+    size = stream.seek(0, os.SEEK_END)
+    stream.seek(position)
+    return size
@@ -1,32 +1,66 @@
-import file_handling
-import huffman_coding
+import huffman_codec
+import predictive_filters
 import os
+import sys
 import glob
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
 from pathlib import Path
 
-def compress_single_image(image_path, output_dir):
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+def get_peak_rss_mb():
+    """
+    Peak resident set size of this process or its largest finished child in MB,
+    or None if unavailable
+    """
+    if resource is None:
+        return None
+    # Include finished child processes such as pool workers
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def estimate_coding_seconds_per_byte(backend=None, sample_size=1 << 18):
+    """
+    Time a Huffman encode of high-entropy bytes, the work the stored path
+    skips, to turn stored bytes into an estimate of CPU time saved
+    """
+    sample = os.urandom(sample_size)
+    start_time = time.perf_counter()
+    huffman_codec.compress_bytes(sample, backend=backend)
+    return (time.perf_counter() - start_time) / sample_size
+
+def compress_single_image(image_path, output_dir, backend=None, predictive=False, codebook=None):
     """
-    Compress a single image using Huffman coding
+    Compress a single image using Huffman coding.
+    predictive=True codes the decoded pixels through prediction filters instead
+    of the raw file bytes. codebook is an optional shared HuffmanCodec used
+    for small files when it beats their own table. High-entropy files and
+    blocks are stored raw; the result counts them.
     """
     try:
         print(f"Processing: {os.path.basename(image_path)}")
         
-        # Read image as bit string
-        image_bit_string = file_handling.read_image_bit_string(image_path)
-        original_size = len(image_bit_string)
-        
-        # Compress using Huffman coding
-        compressed_image_bit_string = huffman_coding.compress(image_bit_string)
-        compressed_size = len(compressed_image_bit_string)
-        
-        # Save compressed file
+        # Compress into a self-describing .huff container
         input_filename = os.path.splitext(os.path.basename(image_path))[0]
-        output_path = os.path.join(output_dir, f"{input_filename}_compressed.bin")
-        file_handling.write_image(compressed_image_bit_string, output_path)
-        
-        # Save Huffman codes for this image
-        codes_path = os.path.join(output_dir, f"{input_filename}_huffman_codes.txt")
-        file_handling.write_dictionary_file(huffman_coding.huffman_codes, codes_path)
+        output_path = os.path.join(output_dir, f"{input_filename}.huff")
+        start_time = time.perf_counter()
+        stats = {}
+        if predictive:
+            original_size, compressed_size = predictive_filters.compress_image_file(image_path, output_path, backend=backend)
+        else:
+            original_size, compressed_size = huffman_codec.compress_file(
+                image_path, output_path, backend=backend, codebook=codebook, stats=stats
+            )
+        elapsed = time.perf_counter() - start_time
         
         compression_ratio = original_size / compressed_size
         space_saved = original_size - compressed_size
@@ -37,40 +71,135 @@ def compress_single_image(image_path, output_dir):
             'compressed_size': compressed_size,
             'compression_ratio': compression_ratio,
             'space_saved': space_saved,
-            'output_file': output_path,
-            'codes_file': codes_path
+            'elapsed_seconds': elapsed,
+            'blocks': stats.get('blocks', 0),
+            'stored_blocks': stats.get('stored_blocks', 0),
+            'stored_bytes': stats.get('stored_bytes', 0),
+            'output_file': output_path
         }
         
     except Exception as e:
         print(f"Error compressing {image_path}: {e}")
         return None
 
-def batch_compress_images(input_paths, output_dir="IO/Outputs"):
+def _compress_in_pool(input_paths, output_dir, backend, workers, predictive, codebook):
+    """
+    Yield (index, result) pairs as files finish in a process pool.
+    At most 2 * workers files are in flight. A worker that dies breaks the
+    whole pool and fails every file in flight with it, so the pool is
+    replaced and those files are retried one at a time: the others still
+    compress, and only a file whose worker dies again is reported as a
+    failure. The batch is never aborted.
+    """
+    pending = iter(enumerate(input_paths))
+    options = (output_dir, backend, predictive, codebook)
+    executor = ProcessPoolExecutor(max_workers=workers)
+    in_flight = {}
+    suspects = deque()
+
+    def run_alone(index):
+        nonlocal executor
+        try:
+            return executor.submit(compress_single_image, input_paths[index], *options).result()
+        except BrokenProcessPool:
+            print(f"Error compressing {input_paths[index]}: worker process died")
+            executor.shutdown(wait=True)
+            executor = ProcessPoolExecutor(max_workers=workers)
+        except Exception as e:
+            print(f"Error compressing {input_paths[index]}: {e}")
+        return None
+
+    try:
+        while True:
+            if suspects:
+                index = suspects.popleft()
+                yield index, run_alone(index)
+                continue
+
+            broken = False
+            for index, image_path in islice(pending, 2 * workers - len(in_flight)):
+                try:
+                    in_flight[executor.submit(compress_single_image, image_path, *options)] = index
+                except BrokenProcessPool:
+                    suspects.append(index)
+                    broken = True
+                    break
+            if not in_flight and not broken:
+                return
+
+            if not broken:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if isinstance(future.exception(), BrokenProcessPool):
+                        broken = True
+                        continue
+                    index = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"Error compressing {input_paths[index]}: {e}")
+                        result = None
+                    yield index, result
+
+            if broken:
+                # Keep results that finished before the pool broke; retry the rest alone
+                wait(in_flight)
+                for future, index in sorted(in_flight.items(), key=lambda item: item[1]):
+                    if future.exception() is None:
+                        yield index, future.result()
+                    else:
+                        suspects.append(index)
+                in_flight.clear()
+                executor.shutdown(wait=True)
+                executor = ProcessPoolExecutor(max_workers=workers)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def batch_compress_images(input_paths, output_dir="IO/Outputs", backend=None, workers=1, predictive=False,
+                          codebook=None):
     """
-    Compress multiple images using Huffman coding
+    Compress multiple images using Huffman coding.
+    backend picks the encode path ('numpy' or 'python'); None selects
+    NumPy automatically when it is installed. workers > 1 compresses files
+    in a process pool and reports each one as it finishes. predictive=True
+    losslessly codes pixels through prediction filters (best for BMP/TIFF).
+    codebook is an optional shared HuffmanCodec for small files.
+    
+    Returns:
+        List of per-file result dicts in input order
     """
+    backend = backend or huffman_codec.BACKEND
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
-    results = []
     total_original_size = 0
     total_compressed_size = 0
     
     print(f"Starting batch compression of {len(input_paths)} images...")
     print("=" * 50)
+    batch_start = time.perf_counter()
     
-    for i, image_path in enumerate(input_paths, 1):
-        print(f"\n[{i}/{len(input_paths)}] Compressing: {os.path.basename(image_path)}")
-        
-        result = compress_single_image(image_path, output_dir)
+    if workers > 1:
+        print(f"Using {workers} worker processes")
+        completed = _compress_in_pool(input_paths, output_dir, backend, workers, predictive, codebook)
+    else:
+        completed = ((index, compress_single_image(image_path, output_dir, backend, predictive, codebook))
+                     for index, image_path in enumerate(input_paths))
+    
+    indexed_results = []
+    for i, (index, result) in enumerate(completed, 1):
+        print(f"\n[{i}/{len(input_paths)}] Finished: {os.path.basename(input_paths[index])}")
         if result:
-            results.append(result)
+            indexed_results.append((index, result))
             total_original_size += result['original_size']
             total_compressed_size += result['compressed_size']
             print(f"  + Compressed: {result['compression_ratio']:.2f}x ratio")
         else:
             print(f"  - Failed to compress")
     
+    total_elapsed = time.perf_counter() - batch_start
+    results = [result for _, result in sorted(indexed_results, key=lambda item: item[0])]
+    
     # Print summary
     if results:
         print("\n" + "=" * 50)
@@ -96,12 +225,31 @@ def batch_compress_images(input_paths, output_dir="IO/Outputs"):
         print(f"Overall compression ratio: {overall_ratio:.2f}x")
         print(f"Total space saved: {total_space_saved:,} bits")
         print(f"Average compression per image: {overall_ratio:.2f}x")
+        print(f"Encode backend: {backend}")
+        if predictive:
+            print("Mode: predictive pixel filters")
+        if total_elapsed > 0:
+            print(f"Throughput: {total_original_size / 8 / (1024 * 1024) / total_elapsed:.2f} MB/s")
+        if workers > 1:
+            print(f"Worker processes: {workers}")
+        stored_files = sum(1 for result in results if result['blocks'] and result['stored_blocks'] == result['blocks'])
+        stored_blocks = sum(result['stored_blocks'] for result in results)
+        stored_bytes = sum(result['stored_bytes'] for result in results)
+        if stored_blocks:
+            total_blocks = sum(result['blocks'] for result in results)
+            print(f"Stored raw (incompressible): {stored_files} files, {stored_blocks}/{total_blocks} blocks")
+            print(f"Estimated CPU time saved: {stored_bytes * estimate_coding_seconds_per_byte(backend):.2f} s")
+        peak_rss = get_peak_rss_mb()
+        if peak_rss is not None:
+            print(f"Peak RSS: {peak_rss:.1f} MB")
         
         print(f"\nAll compressed files saved in: {output_dir}")
         print("Note: These are binary files, not viewable images.")
         
     else:
         print("No images were successfully compressed.")
+    
+    return results
 
 def get_image_files_from_directory(directory):
     """
@@ -118,6 +266,8 @@ def get_image_files_from_directory(directory):
 
 # Main execution
 if __name__ == "__main__":
+    import shared_codebooks  # imports this module, so load it lazily
+    
     print("Huffman Batch Image Compressor")
     print("Compresses multiple images at once using Huffman coding")
     print()
@@ -128,6 +278,11 @@ if __name__ == "__main__":
     print("3. Use default test images")
     
     choice = input("Enter choice (1, 2, or 3): ")
+    workers_input = input(f"Worker processes (Enter for 1, up to {os.cpu_count() or 1} cores): ").strip()
+    workers = int(workers_input) if workers_input.isdigit() and int(workers_input) > 0 else 1
+    predictive = input("Use lossless pixel prediction filters? (y/N): ").strip().lower() == "y"
+    codebook_path = input("Shared codebook (.hcb) for small files (Enter to skip): ").strip()
+    codebook = shared_codebooks.load_codebook(codebook_path) if codebook_path else None
     
     if choice == "1":
         # Individual file paths
@@ -143,7 +298,7 @@ if __name__ == "__main__":
                 print(f"File not found: {path}")
         
         if image_paths:
-            batch_compress_images(image_paths)
+            batch_compress_images(image_paths, workers=workers, predictive=predictive, codebook=codebook)
         else:
             print("No valid files provided.")
             
@@ -157,7 +312,7 @@ if __name__ == "__main__":
                 for path in image_paths:
                     print(f"  - {os.path.basename(path)}")
                 print()
-                batch_compress_images(image_paths)
+                batch_compress_images(image_paths, workers=workers, predictive=predictive, codebook=codebook)
             else:
                 print("No image files found in directory.")
         else:
@@ -173,7 +328,7 @@ if __name__ == "__main__":
                 for path in image_paths:
                     print(f"  - {os.path.basename(path)}")
                 print()
-                batch_compress_images(image_paths)
+                batch_compress_images(image_paths, workers=workers, predictive=predictive, codebook=codebook)
             else:
                 print("No test images found in IO/Inputs")
         else:
@@ -0,0 +1,280 @@
+import argparse
+import heapq
+import os
+import random
+import tempfile
+import time
+
+import huffman_codec
+
+
+def make_sample(size, seed=1234):
+    """
+    Deterministic skewed byte data resembling a low-entropy image
+    """
+    rng = random.Random(seed)
+    weights = [1.0 / (symbol + 1) ** 1.5 for symbol in range(256)]
+    return bytes(rng.choices(range(256), weights=weights, k=size))
+
+
+def time_call(func, *args, repeat=3):
+    """
+    Best wall-clock time of `repeat` calls, plus the last result
+    """
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def megabytes_per_second(size, seconds):
+    return size / (1024 * 1024) / seconds if seconds > 0 else float('inf')
+
+
+def benchmark_encode(size=1024 * 1024):
+    """
+    Frequency counting plus encode throughput for every available backend
+    """
+    data = make_sample(size)
+    results = {}
+    for backend in huffman_codec.BACKENDS:
+        seconds, (packed, bit_length, codes, lengths) = time_call(
+            huffman_codec.compress_bytes, data, huffman_codec.MAX_CODE_LENGTH, backend
+        )
+        results[backend] = megabytes_per_second(len(data), seconds)
+    return results
+
+
+def write_synthetic_file(path, size, block_size=1024 * 1024):
+    """
+    Write `size` bytes of deterministic sample data without holding it all in memory.
+    Each block is the same base sample with its byte values rotated, so blocks differ.
+    """
+    base = make_sample(block_size)
+    written = 0
+    with open(path, 'wb') as f:
+        block_number = 0
+        while written < size:
+            rotate = block_number % 256
+            table = bytes((value + rotate) % 256 for value in range(256))
+            block = base.translate(table)[:size - written]
+            written += f.write(block)
+            block_number += 1
+
+
+def benchmark_parallel(size=500 * 1024 * 1024, worker_counts=None):
+    """
+    Compress and decompress one large synthetic file with 1..N workers and
+    report throughput and speedup relative to a single worker
+    """
+    if worker_counts is None:
+        cpu_count = os.cpu_count() or 1
+        worker_counts = sorted({1, 2, 4, 8, 16, 32, cpu_count} & set(range(1, cpu_count + 1)))
+
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_path = os.path.join(temp_dir, 'synthetic.raw')
+        huff_path = os.path.join(temp_dir, 'synthetic.huff')
+        restored_path = os.path.join(temp_dir, 'restored.raw')
+        write_synthetic_file(input_path, size)
+
+        for workers in worker_counts:
+            compress_seconds, _ = time_call(huffman_codec.compress_file, input_path, huff_path,
+                                            huffman_codec.MAX_CODE_LENGTH, None,
+                                            huffman_codec.STREAM_BLOCK_SIZE, workers, repeat=1)
+            decompress_seconds, _ = time_call(huffman_codec.decompress_file, huff_path, restored_path,
+                                              workers, repeat=1)
+            results.append({
+                'workers': workers,
+                'compress_mb_per_s': megabytes_per_second(size, compress_seconds),
+                'decompress_mb_per_s': megabytes_per_second(size, decompress_seconds),
+            })
+
+    for result in results:
+        result['compress_speedup'] = result['compress_mb_per_s'] / results[0]['compress_mb_per_s']
+        result['decompress_speedup'] = result['decompress_mb_per_s'] / results[0]['decompress_mb_per_s']
+    return results
+
+
+class ReferenceNode:
+    """Huffman tree node of the original bit-string pipeline"""
+
+    def __init__(self, frequency, symbol, left=None, right=None):
+        self.frequency = frequency
+        self.symbol = symbol
+        self.left = left
+        self.right = right
+        self.huffman_direction = ''  # 0 or 1 for tree traversal
+
+    def __lt__(self, nxt):
+        return self.frequency < nxt.frequency
+
+
+def _reference_codes(node, codes, code=''):
+    code += node.huffman_direction
+    if node.left:
+        _reference_codes(node.left, codes, code)
+    if node.right:
+        _reference_codes(node.right, codes, code)
+    if not node.left and not node.right:
+        codes[node.symbol] = code
+    return codes
+
+
+def reference_bit_string_compress(image_bit_string):
+    """
+    The original string-keyed tree build and encoder, kept as the baseline
+    for code sizes and decode throughput
+
+    Returns:
+        Tuple of (compressed_bit_string, {byte_bit_string: code_bit_string})
+    """
+    byte_to_frequency = {}
+    for i in range(0, len(image_bit_string), 8):
+        byte = image_bit_string[i:i + 8]
+        byte_to_frequency[byte] = byte_to_frequency.get(byte, 0) + 1
+
+    huffman_tree = []
+    for byte, frequency in byte_to_frequency.items():
+        heapq.heappush(huffman_tree, ReferenceNode(frequency, byte))
+    while len(huffman_tree) > 1:
+        left = heapq.heappop(huffman_tree)
+        right = heapq.heappop(huffman_tree)
+        left.huffman_direction = "0"
+        right.huffman_direction = "1"
+        heapq.heappush(huffman_tree, ReferenceNode(left.frequency + right.frequency,
+                                                   left.symbol + right.symbol, left, right))
+    codes = _reference_codes(huffman_tree[0], {})
+
+    compressed_image_bit_string = ""
+    for i in range(0, len(image_bit_string), 8):
+        compressed_image_bit_string += codes[image_bit_string[i:i + 8]]
+    return compressed_image_bit_string, codes
+
+
+def reference_bit_string_decompress(compressed_image_bit_string, code_strings):
+    """
+    The original bit-at-a-time decoder, kept as the throughput baseline
+    """
+    decompressed_image_bit_string = ""
+    current_code = ""
+    for bit in compressed_image_bit_string:
+        current_code += bit
+        for byte, code in code_strings.items():
+            if current_code == code:
+                decompressed_image_bit_string += byte
+                current_code = ""
+    return decompressed_image_bit_string
+
+
+def benchmark_decode(size=1024 * 1024, legacy_size=4 * 1024):
+    """
+    Compare table-driven decode throughput against the original bit-string decoder.
+    The legacy decoder is measured on a smaller sample because it is
+    O(bits x alphabet) and does not finish on realistic inputs.
+    """
+    data = make_sample(size)
+    packed, bit_length, codes, lengths = huffman_codec.compress_bytes(data)
+    tables = huffman_codec.build_decode_table(codes, lengths)
+    table_seconds, decoded = time_call(huffman_codec.decode, packed, len(data), tables)
+    assert decoded == data, "table decoder round-trip mismatch"
+
+    legacy_data = data[:legacy_size]
+    bit_string = ''.join(format(byte, '08b') for byte in legacy_data)
+    compressed_bit_string, code_strings = reference_bit_string_compress(bit_string)
+    legacy_seconds, legacy_decoded = time_call(
+        reference_bit_string_decompress, compressed_bit_string, code_strings, repeat=1
+    )
+    assert legacy_decoded == bit_string, "legacy decoder round-trip mismatch"
+
+    return {
+        'table_mb_per_s': megabytes_per_second(len(data), table_seconds),
+        'legacy_mb_per_s': megabytes_per_second(len(legacy_data), legacy_seconds),
+        'table_bytes': len(data),
+        'legacy_bytes': len(legacy_data),
+    }
+
+
+def make_scan_sample(size, seed=1234):
+    """
+    Deterministic bytes resembling a scanned document: mostly white, some black, a little grey
+    """
+    rng = random.Random(seed)
+    return bytes(rng.choices((255, 0, 128), weights=(90, 8, 2), k=size))
+
+
+def benchmark_multi_symbol(size=1024 * 1024, window_sizes=(12, 14, 16)):
+    """
+    Compare single-symbol and multi-symbol table decoding on the same
+    low-entropy corpora. Table build time is reported separately because it
+    is paid once per codebook.
+    """
+    results = []
+    for name, data in (('skewed', make_sample(size)), ('scan', make_scan_sample(size))):
+        codec = huffman_codec.HuffmanCodec.from_data(data)
+        packed, bit_length = codec.encode(data)
+        single_seconds, decoded = time_call(huffman_codec.decode, packed, len(data), codec.decode_tables)
+        assert decoded == data, "single-symbol decoder round-trip mismatch"
+        for window_bits in window_sizes:
+            build_seconds, multi_table = time_call(
+                huffman_codec.build_multi_symbol_table, codec.codes, codec.lengths, window_bits, repeat=1
+            )
+            multi_seconds, decoded = time_call(
+                huffman_codec.decode_multi_symbol, packed, len(data), codec.decode_tables, multi_table
+            )
+            assert decoded == data, "multi-symbol decoder round-trip mismatch"
+            results.append({
+                'corpus': name,
+                'bits_per_symbol': bit_length / len(data),
+                'window_bits': window_bits,
+                'single_mb_per_s': megabytes_per_second(len(data), single_seconds),
+                'multi_mb_per_s': megabytes_per_second(len(data), multi_seconds),
+                'build_seconds': build_seconds,
+            })
+    return results
+
+
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Huffman codec benchmarks")
+    parser.add_argument('--size', type=int, default=1024 * 1024, help="sample size in bytes")
+    parser.add_argument('--legacy-size', type=int, default=4 * 1024, help="sample size for the bit-string decoder")
+    parser.add_argument('--parallel', action='store_true', help="also run the multi-core file benchmark")
+    parser.add_argument('--parallel-size', type=int, default=500 * 1024 * 1024, help="synthetic file size in bytes")
+    parser.add_argument('--workers', type=int, nargs='+', help="worker counts for --parallel")
+    args = parser.parse_args()
+
+    print("Encode throughput")
+    print("=" * 50)
+    for backend, mb_per_s in benchmark_encode(args.size).items():
+        print(f"{backend:>6} backend: {mb_per_s:.2f} MB/s")
+    print()
+
+    print("Decode throughput")
+    print("=" * 50)
+    results = benchmark_decode(args.size, args.legacy_size)
+    print(f"Table-driven decoder: {results['table_mb_per_s']:.2f} MB/s ({results['table_bytes']:,} bytes)")
+    print(f"Bit-string decoder:   {results['legacy_mb_per_s']:.4f} MB/s ({results['legacy_bytes']:,} bytes)")
+    print(f"Speedup: {results['table_mb_per_s'] / results['legacy_mb_per_s']:.0f}x")
+    print()
+
+    print("Multi-symbol decode throughput")
+    print("=" * 50)
+    for result in benchmark_multi_symbol(args.size):
+        print(f"{result['corpus']:>6} ({result['bits_per_symbol']:.2f} bits/symbol), "
+              f"{result['window_bits']}-bit window: "
+              f"single {result['single_mb_per_s']:.2f} MB/s, multi {result['multi_mb_per_s']:.2f} MB/s "
+              f"({result['multi_mb_per_s'] / result['single_mb_per_s']:.2f}x, "
+              f"table built in {result['build_seconds'] * 1000:.0f} ms)")
+
+    if args.parallel:
+        print()
+        print(f"Parallel file throughput ({args.parallel_size / (1024 * 1024):.0f} MB synthetic input)")
+        print("=" * 50)
+        for result in benchmark_parallel(args.parallel_size, args.workers):
+            print(f"{result['workers']:>3} workers: "
+                  f"compress {result['compress_mb_per_s']:.2f} MB/s ({result['compress_speedup']:.2f}x), "
+                  f"decompress {result['decompress_mb_per_s']:.2f} MB/s ({result['decompress_speedup']:.2f}x)")
@@ -0,0 +1,207 @@
+import argparse
+import io
+import json
+import math
+import platform
+import random
+import sys
+import tracemalloc
+
+import huffman_codec
+import numpy_backend
+from benchmark import megabytes_per_second, time_call
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is only needed for the JPEG/PNG corpora
+    Image = None
+
+# Bump when the result layout changes so old baselines are not compared blindly
+RESULTS_VERSION = 1
+
+# Default fractional slowdown (or memory growth) tolerated by compare mode
+TOLERANCE = 0.10
+
+
+# --- Deterministic synthetic corpora (raw 8-bit RGB rasters) ---
+def flat_image(width, height, seed=0):
+    rng = random.Random(seed)
+    colour = bytes(rng.randrange(256) for _ in range(3))
+    return colour * (width * height)
+
+
+def gradient_image(width, height, seed=0):
+    pixels = bytearray()
+    for y in range(height):
+        for x in range(width):
+            pixels += bytes((x * 255 // max(width - 1, 1), y * 255 // max(height - 1, 1),
+                             (x + y) * 255 // max(width + height - 2, 1)))
+    return bytes(pixels)
+
+
+def noise_image(width, height, seed=0):
+    rng = random.Random(seed)
+    return bytes(rng.getrandbits(8) for _ in range(width * height * 3))
+
+
+def photo_like_image(width, height, seed=0):
+    """
+    Smooth low-frequency shapes per channel plus mild sensor-style noise
+    """
+    rng = random.Random(seed)
+    waves = [[(rng.uniform(0.5, 4), rng.uniform(0.5, 4), rng.uniform(0, 2 * math.pi)) for _ in range(3)]
+             for _ in range(3)]
+    pixels = bytearray()
+    for y in range(height):
+        for x in range(width):
+            for channel_waves in waves:
+                value = 128
+                for fx, fy, phase in channel_waves:
+                    value += 40 * math.sin(2 * math.pi * (fx * x / width + fy * y / height) + phase)
+                value += rng.gauss(0, 3)
+                pixels.append(min(255, max(0, int(value))))
+    return bytes(pixels)
+
+
+def encoded_image(raster, width, height, image_format, **options):
+    """
+    Wrap a raw RGB raster in a real JPEG or PNG container with Pillow
+    """
+    output = io.BytesIO()
+    Image.frombytes('RGB', (width, height), raster).save(output, image_format, **options)
+    return output.getvalue()
+
+
+def build_corpora(size=256, seed=0):
+    """
+    Returns:
+        Dict of corpus name to bytes; the JPEG/PNG corpora need Pillow
+    """
+    photo = photo_like_image(size, size, seed)
+    corpora = {
+        'flat': flat_image(size, size, seed),
+        'gradient': gradient_image(size, size, seed),
+        'noise': noise_image(size, size, seed),
+        'photo': photo,
+    }
+    if Image is not None:
+        corpora['jpeg'] = encoded_image(photo, size, size, 'JPEG', quality=90)
+        corpora['png'] = encoded_image(photo, size, size, 'PNG')
+    return corpora
+
+
+# --- Measurements ---
+def peak_memory_mb(func, *args):
+    """
+    Peak traced Python (and NumPy) allocation during one call, in MB
+    """
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def _round_trip(data, backend):
+    huffman_codec.decompress(huffman_codec.compress(data, backend=backend))
+
+
+def run_suite(size=256, repeat=3, corpus_names=None, backends=None):
+    """
+    Encode/decode throughput, peak memory and ratio for every corpus and backend
+
+    Returns:
+        Dict ready to be written as JSON
+    """
+    corpora = build_corpora(size)
+    results = []
+    for name, data in corpora.items():
+        if corpus_names and name not in corpus_names:
+            continue
+        for backend in backends or huffman_codec.BACKENDS:
+            encode_seconds, container = time_call(huffman_codec.compress, data, huffman_codec.MAX_CODE_LENGTH,
+                                                  backend, repeat=repeat)
+            decode_seconds, decoded = time_call(huffman_codec.decompress, container, repeat=repeat)
+            if decoded != data:
+                raise AssertionError(f"round-trip mismatch on {name} with the {backend} backend")
+            results.append({
+                'corpus': name,
+                'backend': backend,
+                'bytes': len(data),
+                'ratio': len(data) / len(container),
+                'encode_mb_per_s': megabytes_per_second(len(data), encode_seconds),
+                'decode_mb_per_s': megabytes_per_second(len(data), decode_seconds),
+                'peak_memory_mb': peak_memory_mb(_round_trip, data, backend),
+            })
+    return {
+        'version': RESULTS_VERSION,
+        'size': size,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': numpy_backend.np.__version__ if numpy_backend.AVAILABLE else None,
+        'results': results,
+    }
+
+
+def compare(current, baseline, tolerance=TOLERANCE):
+    """
+    Flag results that got slower or used more memory than tolerance allows,
+    or whose ratio dropped at all (ratios are deterministic)
+
+    Returns:
+        List of human-readable regression descriptions
+    """
+    if baseline.get('version') != current.get('version') or baseline.get('size') != current.get('size'):
+        return ["baseline was recorded with a different result version or corpus size"]
+    baseline_results = {(result['corpus'], result['backend']): result for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        key = (result['corpus'], result['backend'])
+        previous = baseline_results.get(key)
+        if previous is None:
+            continue
+        label = f"{key[0]}/{key[1]}"
+        for metric in ('encode_mb_per_s', 'decode_mb_per_s'):
+            if result[metric] < previous[metric] * (1 - tolerance):
+                regressions.append(f"{label} {metric}: {previous[metric]:.2f} -> {result[metric]:.2f}")
+        if result['peak_memory_mb'] > previous['peak_memory_mb'] * (1 + tolerance):
+            regressions.append(f"{label} peak_memory_mb: {previous['peak_memory_mb']:.1f} -> "
+                               f"{result['peak_memory_mb']:.1f}")
+        if result['ratio'] < previous['ratio'] - 1e-9:
+            regressions.append(f"{label} ratio: {previous['ratio']:.4f} -> {result['ratio']:.4f}")
+    return regressions
+
+
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Huffman codec throughput benchmark suite")
+    parser.add_argument('--size', type=int, default=256, help="width and height of the synthetic images")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per measurement (best is kept)")
+    parser.add_argument('--corpus', nargs='+', help="only run these corpora")
+    parser.add_argument('--backend', nargs='+', choices=huffman_codec.BACKENDS, help="only run these backends")
+    parser.add_argument('--output', help="write the results as JSON to this path")
+    parser.add_argument('--compare', help="baseline JSON to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help="allowed fractional slowdown")
+    args = parser.parse_args()
+
+    suite = run_suite(args.size, args.repeat, args.corpus, args.backend)
+    print(f"{'corpus':<10}{'backend':<8}{'ratio':>8}{'encode MB/s':>14}{'decode MB/s':>14}{'peak MB':>10}")
+    for result in suite['results']:
+        print(f"{result['corpus']:<10}{result['backend']:<8}{result['ratio']:>8.2f}"
+              f"{result['encode_mb_per_s']:>14.2f}{result['decode_mb_per_s']:>14.2f}{result['peak_memory_mb']:>10.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(suite, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(suite, json.load(f), args.tolerance)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
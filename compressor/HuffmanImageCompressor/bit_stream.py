@@ -0,0 +1,91 @@
+# --- Bit writer for packing variable-length codes into bytes ---
+class BitWriter:
+    """
+    Pack variable-length codes MSB-first into a bytearray.
+    The final partial byte is padded with zero bits on the right.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self._accumulator = 0
+        self._pending_bits = 0
+
+    def write(self, code, length):
+        """
+        Append the lowest `length` bits of `code`
+        """
+        self._accumulator = (self._accumulator << length) | code
+        self._pending_bits += length
+        if self._pending_bits >= 64:
+            self._flush_whole_bytes()
+
+    def write_symbols(self, data, codes, lengths):
+        """
+        Append the code of every byte in `data` using 256-entry code/length tables
+        """
+        buffer = self.buffer
+        accumulator = self._accumulator
+        pending_bits = self._pending_bits
+
+        for byte in data:
+            length = lengths[byte]
+            accumulator = (accumulator << length) | codes[byte]
+            pending_bits += length
+            if pending_bits >= 64:
+                kept_bits = pending_bits & 7
+                buffer += (accumulator >> kept_bits).to_bytes(pending_bits >> 3, 'big')
+                accumulator &= (1 << kept_bits) - 1
+                pending_bits = kept_bits
+
+        self._accumulator = accumulator
+        self._pending_bits = pending_bits
+
+    def write_context_symbols(self, data, codes, lengths):
+        """
+        Append the code of every byte in `data` using 65536-entry tables
+        indexed by (previous_byte << 8) | byte; the first byte's previous
+        byte is 0
+        """
+        buffer = self.buffer
+        accumulator = self._accumulator
+        pending_bits = self._pending_bits
+        previous = 0
+
+        for byte in data:
+            pair = (previous << 8) | byte
+            length = lengths[pair]
+            accumulator = (accumulator << length) | codes[pair]
+            pending_bits += length
+            if pending_bits >= 64:
+                kept_bits = pending_bits & 7
+                buffer += (accumulator >> kept_bits).to_bytes(pending_bits >> 3, 'big')
+                accumulator &= (1 << kept_bits) - 1
+                pending_bits = kept_bits
+            previous = byte
+
+        self._accumulator = accumulator
+        self._pending_bits = pending_bits
+
+    def _flush_whole_bytes(self):
+        kept_bits = self._pending_bits & 7
+        whole_bytes = self._pending_bits >> 3
+        if whole_bytes:
+            self.buffer += (self._accumulator >> kept_bits).to_bytes(whole_bytes, 'big')
+            self._accumulator &= (1 << kept_bits) - 1
+            self._pending_bits = kept_bits
+
+    @property
+    def bit_length(self):
+        return len(self.buffer) * 8 + self._pending_bits
+
+    def finish(self):
+        """
+        Flush the last partial byte (zero-padded) and return (packed_bytes, bit_length)
+        """
+        self._flush_whole_bytes()
+        bit_length = self.bit_length
+        if self._pending_bits:
+            self.buffer.append((self._accumulator << (8 - self._pending_bits)) & 0xFF)
+            self._accumulator = 0
+            self._pending_bits = 0
+        return self.buffer, bit_length
@@ -0,0 +1,231 @@
+# --- Order-1 context modelling: codebooks chosen by the previous byte ---
+from collections import Counter
+
+import huff_container
+import huffman_codec
+import numpy_backend
+from bit_stream import BitWriter
+
+# Most codebooks per block; cluster ids are stored as 4-bit values
+MAX_CLUSTERS = 16
+
+# Passes that move each context to the cluster that codes it most cheaply
+REFINE_ROUNDS = 2
+
+# Assignment cost of a byte a cluster's codebook cannot code yet
+MISSING_SYMBOL_BITS = 16
+
+
+def count_pair_frequencies(data, backend=None):
+    """
+    Return a 65536-entry list counting (previous_byte << 8) | byte pairs.
+    The first byte is counted with previous byte 0.
+    """
+    if huffman_codec._resolve_backend(backend) == 'numpy':
+        return numpy_backend.count_pair_frequencies(data)
+    symbols = memoryview(data).cast('B')
+    frequencies = [0] * 65536
+    for (previous, byte), frequency in Counter(zip(b'\x00' + bytes(symbols[:-1]), symbols)).items():
+        frequencies[(previous << 8) | byte] = frequency
+    return frequencies
+
+
+def _coded_bits(frequencies, lengths):
+    return sum(frequency * length for frequency, length in zip(frequencies, lengths))
+
+
+def _estimated_bits(frequencies):
+    """
+    Entropy of a histogram plus the size of its code-length table, used to
+    decide cheaply whether two clusters should share a codebook
+    """
+    table_bytes = huff_container.code_length_table_size(sum(1 for frequency in frequencies if frequency))
+    return huffman_codec.entropy_bits(frequencies) + 8 * table_bytes
+
+
+def _merge(first, second):
+    return [a + b for a, b in zip(first, second)]
+
+
+def cluster_contexts(pair_frequencies, max_code_length=huffman_codec.MAX_CODE_LENGTH,
+                     max_clusters=MAX_CLUSTERS):
+    """
+    Group the 256 previous-byte contexts into at most max_clusters codebooks.
+    The busiest contexts seed the clusters (the rest share the last one),
+    contexts then move to the cluster that codes them in the fewest bits,
+    and finally clusters are merged while that lowers the estimated size.
+
+    Returns:
+        Tuple of (context_map, cluster_lengths, estimated_bits) where
+        estimated_bits covers the payload and the block's codebook header
+    """
+    histograms = [pair_frequencies[context << 8:(context + 1) << 8] for context in range(256)]
+    active = sorted((context for context in range(256) if any(histograms[context])),
+                    key=lambda context: (-sum(histograms[context]), context))
+    cluster_count = min(max_clusters, len(active))
+    assignment = {context: min(rank, cluster_count - 1) for rank, context in enumerate(active)}
+    used_symbols = {
+        context: [(symbol, frequency) for symbol, frequency in enumerate(histograms[context]) if frequency]
+        for context in active
+    }
+
+    for _ in range(REFINE_ROUNDS):
+        cluster_histograms = {}
+        for context, cluster in assignment.items():
+            cluster_histograms[cluster] = _merge(cluster_histograms.get(cluster, [0] * 256), histograms[context])
+        cluster_lengths = {
+            cluster: huffman_codec.build_code_lengths(histogram, max_code_length)
+            for cluster, histogram in cluster_histograms.items()
+        }
+        for context in active:
+            costs = {
+                cluster: sum(frequency * (lengths[symbol] or MISSING_SYMBOL_BITS)
+                             for symbol, frequency in used_symbols[context])
+                for cluster, lengths in cluster_lengths.items()
+            }
+            current = assignment[context]
+            best = min(costs, key=lambda cluster: (costs[cluster], cluster != current, cluster))
+            assignment[context] = best
+
+    # Merge the pair of clusters that saves the most until no merge helps
+    members = {}
+    for context, cluster in assignment.items():
+        members.setdefault(cluster, []).append(context)
+    clusters = []
+    for cluster in sorted(members):
+        histogram = [0] * 256
+        for context in members[cluster]:
+            histogram = _merge(histogram, histograms[context])
+        clusters.append((members[cluster], histogram, _estimated_bits(histogram)))
+    while len(clusters) > 1:
+        best_saving, best_pair = 0, None
+        for i in range(len(clusters)):
+            for j in range(i + 1, len(clusters)):
+                merged_bits = _estimated_bits(_merge(clusters[i][1], clusters[j][1]))
+                saving = clusters[i][2] + clusters[j][2] - merged_bits
+                if saving > best_saving:
+                    best_saving, best_pair = saving, (i, j)
+        if best_pair is None:
+            break
+        i, j = best_pair
+        histogram = _merge(clusters[i][1], clusters[j][1])
+        merged = (clusters[i][0] + clusters[j][0], histogram, _estimated_bits(histogram))
+        clusters = [cluster for k, cluster in enumerate(clusters) if k not in best_pair] + [merged]
+
+    context_map = [0] * 256
+    cluster_lengths = []
+    payload_bits = 0
+    for cluster, (contexts, histogram, _) in enumerate(clusters):
+        for context in contexts:
+            context_map[context] = cluster
+        lengths = huffman_codec.build_code_lengths(histogram, max_code_length)
+        cluster_lengths.append(lengths)
+        payload_bits += _coded_bits(histogram, lengths)
+    header_bytes = 1 + 128 + sum(len(huff_container.pack_code_lengths(lengths)) for lengths in cluster_lengths)
+    return context_map, cluster_lengths, payload_bits + 8 * header_bytes
+
+
+def _pair_tables(context_map, cluster_lengths):
+    """
+    Expand cluster codebooks to 65536-entry code/length tables indexed by
+    (previous_byte << 8) | byte
+    """
+    cluster_codes = [huffman_codec.assign_canonical_codes(lengths) for lengths in cluster_lengths]
+    codes = []
+    lengths = []
+    for context in range(256):
+        codes += cluster_codes[context_map[context]]
+        lengths += cluster_lengths[context_map[context]]
+    return codes, lengths
+
+
+def encode(data, context_map, cluster_lengths, backend=None):
+    """
+    Returns:
+        Tuple of (packed_bytearray, bit_length)
+    """
+    codes, lengths = _pair_tables(context_map, cluster_lengths)
+    if huffman_codec._resolve_backend(backend) == 'numpy':
+        return numpy_backend.encode_context(data, codes, lengths)
+    writer = BitWriter()
+    writer.write_context_symbols(memoryview(data).cast('B'), codes, lengths)
+    return writer.finish()
+
+
+def decode(packed, symbol_count, context_map, cluster_lengths, bit_length=None):
+    """
+    Decode `symbol_count` bytes, switching decode tables on every byte to
+    the cluster of the byte before it. A given bit_length must be consumed
+    exactly, or the data is rejected as corrupt.
+    """
+    if bit_length is not None:
+        huffman_codec.check_symbol_count(symbol_count, bit_length)
+    output = bytearray(symbol_count)
+    if not symbol_count:
+        return output
+    cluster_tables = [
+        huffman_codec.build_decode_table(huffman_codec.assign_canonical_codes(lengths), lengths)
+        for lengths in cluster_lengths
+    ]
+    if not all(cluster_tables):
+        raise ValueError("Empty codebook cannot decode non-empty data")
+    cluster_roots = [(tables[0][0], (1 << tables[0][0]) - 1, tables[0][1], tables) for tables in cluster_tables]
+    context_roots = [cluster_roots[context_map[context]] for context in range(256)]
+
+    data = memoryview(packed).cast('B')
+    refill_threshold = max(huffman_codec._lookup_chain_bits(tables, 0) for tables in cluster_tables)
+    accumulator = 0
+    buffered_bits = 0
+    position = 0
+    previous = 0
+
+    for index in range(symbol_count):
+        while buffered_bits < refill_threshold:
+            chunk = data[position:position + 8]
+            position += 8
+            accumulator = ((accumulator & ((1 << buffered_bits) - 1)) << 64) | (
+                int.from_bytes(chunk, 'big') << (8 * (8 - len(chunk)))
+            )
+            buffered_bits += 64
+
+        root_bits, root_mask, root, tables = context_roots[previous]
+        entry = root[(accumulator >> (buffered_bits - root_bits)) & root_mask]
+        if entry <= 0:
+            index_bits = root_bits
+            while entry < 0:
+                buffered_bits -= index_bits
+                index_bits, entries = tables[-entry]
+                entry = entries[(accumulator >> (buffered_bits - index_bits)) & ((1 << index_bits) - 1)]
+            if entry == 0:
+                raise ValueError(f"Invalid Huffman code at symbol {index}")
+        buffered_bits -= entry & 31
+        previous = entry >> 5
+        output[index] = previous
+
+    if bit_length is not None:
+        huffman_codec._check_bits_consumed(position * 8 - buffered_bits, bit_length)
+    return output
+
+
+def compress_block(block, max_code_length=huffman_codec.MAX_CODE_LENGTH, backend=None):
+    """
+    Code one block as order-0 or order-1, whichever is estimated smaller
+
+    Returns:
+        The encoded block (header and payload)
+    """
+    pair_frequencies = count_pair_frequencies(block, backend)
+    frequencies = [0] * 256
+    for pair, frequency in enumerate(pair_frequencies):
+        if frequency:
+            frequencies[pair & 0xFF] += frequency
+    lengths = huffman_codec.build_code_lengths(frequencies, max_code_length)
+    order0_bits = _coded_bits(frequencies, lengths) + 8 * len(huff_container.pack_code_lengths(lengths))
+
+    context_map, cluster_lengths, order1_bits = cluster_contexts(pair_frequencies, max_code_length)
+    if order1_bits < order0_bits:
+        packed, bit_length = encode(block, context_map, cluster_lengths, backend)
+        return huff_container.encode_context_block_header(len(block), bit_length, context_map, cluster_lengths) + packed
+    codec = huffman_codec.HuffmanCodec(lengths)
+    packed, bit_length = codec.encode(block, backend)
+    return huff_container.encode_block_header(len(block), bit_length, lengths) + packed
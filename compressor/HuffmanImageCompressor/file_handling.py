@@ -23,4 +23,4 @@ def write_image(bit_string, path):
 def write_dictionary_file(dictionary, path):
     with open(path, 'w') as f:
         for key, value in dictionary.items():
-            f.write(f"{key}:{value}\n")
\ No newline at end of file
+            f.write(f"{key}:{value}\n")
@@ -0,0 +1,437 @@
+import io
+import struct
+import zlib
+
+# --- .huff container layout (version 1, single block) ---
+# magic "HUFF" | version u8 | flags u8 | original_length u64 | valid_bits u8
+# | code-length table | packed payload (to end of file)
+#
+# valid_bits is the number of meaningful bits in the last payload byte (1-8,
+# 0 for an empty payload); the remaining low bits are zero padding.
+#
+# With FLAG_SHARED_CODEBOOK set, a u32 codebook ID replaces the code-length
+# table and the payload is coded with that pre-trained codebook. With
+# FLAG_STORED set there is no table and the payload is the original bytes.
+MAGIC = b'HUFF'
+VERSION = 1
+HEADER = struct.Struct('>4sBBQB')
+CODEBOOK_ID = struct.Struct('>I')
+
+# Single-block header flags
+FLAG_SHARED_CODEBOOK = 0x01  # payload uses a shared codebook named by its ID
+FLAG_STORED = 0x02           # payload is stored raw (incompressible input)
+
+# --- Shared codebook artifact (.hcb) ---
+# magic "HCBK" | format version u8 | codebook ID u32 | code-length table
+# The ID is the CRC-32 of the code lengths packed two per byte, so the same
+# codebook always gets the same ID and a mismatched file is detected on load.
+CODEBOOK_MAGIC = b'HCBK'
+CODEBOOK_VERSION = 1
+CODEBOOK_HEADER = struct.Struct('>4sBI')
+
+# --- Block stream layout (version 2) ---
+# magic "HUFF" | version u8 | flags u8 | block_size u32
+# then any number of blocks:
+#   block_type u8 | raw_length u32 | payload_length u32 | valid_bits u8
+#   | code-length table | packed payload
+# then BLOCK_END u8 | total original_length u64
+# and, when FLAG_INDEXED is set, a block index footer:
+#   (raw_offset u64 | block_offset u64) per block
+#   | total original_length u64 | index_offset u64 | block_count u32 | "HIDX"
+#
+# A BLOCK_CONTEXT block codes each byte with the codebook of its previous
+# byte's cluster (order-1 context modelling); after valid_bits it stores
+#   cluster_count u8 | 256 cluster ids packed two per byte
+#   | one code-length table per cluster
+# in place of the single code-length table. The first byte of every block
+# uses previous byte 0, so blocks still decode independently. A
+# BLOCK_STORED block has no table; its payload is the raw bytes.
+#
+# Blocks are written as the input is read, so neither side needs the whole
+# file in memory. The footer lets readers jump straight to any block, e.g.
+# to decode blocks in parallel.
+STREAM_VERSION = 2
+STREAM_HEADER = struct.Struct('>4sBBI')
+BLOCK_HEADER = struct.Struct('>BIIB')
+STREAM_END = struct.Struct('>BQ')
+INDEX_ENTRY = struct.Struct('>QQ')
+INDEX_TRAILER = struct.Struct('>QQI4s')
+INDEX_MAGIC = b'HIDX'
+
+# --- Pixel container layout (version 3) ---
+# magic "HUFF" | version u8 | flags u8 | width u32 | height u32 | channels u8
+# | mode_length u8 | Pillow mode (ASCII)
+# then block stream blocks (see above): one holding the per-row filter
+# types, then one residual plane per channel, then BLOCK_END | total u64.
+#
+# Pixels are decoded with Pillow and passed through PNG-style prediction
+# filters first, so the Huffman stage codes small residuals instead of
+# already entropy-coded file bytes. Decoding restores the pixels, not the
+# original file bytes.
+PIXEL_VERSION = 3
+PIXEL_HEADER = struct.Struct('>4sBBIIBB')
+
+# Stream header flags
+FLAG_INDEXED = 0x01  # a block index footer follows the end marker
+
+# Block types
+BLOCK_HUFFMAN = 0   # block coded with its own code-length table
+BLOCK_CONTEXT = 1   # block coded with per-context codebooks
+BLOCK_STORED = 2    # incompressible block stored raw
+BLOCK_END = 0xFF    # end of stream, followed by the total original length
+
+# Code-length table encodings
+TABLE_EMPTY = 0   # no symbols (empty input)
+TABLE_DENSE = 1   # 256 lengths packed two per byte
+TABLE_SPARSE = 2  # symbol count, symbol list, then their lengths packed two per byte
+
+
+def _pack_nibbles(values):
+    if len(values) % 2:
+        values = list(values) + [0]
+    return bytes((values[i] << 4) | values[i + 1] for i in range(0, len(values), 2))
+
+
+def _unpack_nibbles(data, count):
+    values = []
+    for byte in data:
+        values.append(byte >> 4)
+        values.append(byte & 0x0F)
+    return values[:count]
+
+
+def pack_code_lengths(lengths):
+    """
+    Serialize 256 canonical code lengths (each 0-15) in the smaller of the
+    dense or sparse encodings
+    """
+    symbols = [symbol for symbol in range(256) if lengths[symbol]]
+    if not symbols:
+        return bytes([TABLE_EMPTY])
+    if max(lengths) > 15:
+        raise ValueError("Code lengths above 15 bits cannot be stored in a .huff header")
+
+    dense = bytes([TABLE_DENSE]) + _pack_nibbles(lengths)
+    sparse = (
+        bytes([TABLE_SPARSE, len(symbols) - 1]) + bytes(symbols)
+        + _pack_nibbles([lengths[symbol] for symbol in symbols])
+    )
+    return sparse if len(sparse) < len(dense) else dense
+
+
+def code_length_table_size(symbol_count):
+    """
+    Bytes pack_code_lengths uses for a codebook with symbol_count symbols
+    """
+    if not symbol_count:
+        return 1
+    return min(1 + 128, 2 + symbol_count + (symbol_count + 1) // 2)
+
+
+def _read_exact(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated .huff container")
+    return data
+
+
+def check_code_lengths(lengths):
+    """
+    Raise ValueError unless the lengths describe a prefix code, i.e. satisfy
+    the Kraft inequality; an oversubscribed table has no canonical decoding
+    """
+    if sum(1 << (15 - length) for length in lengths if length) > 1 << 15:
+        raise ValueError("Corrupt code-length table: lengths oversubscribe the code space")
+    return lengths
+
+
+def read_code_lengths(stream):
+    """
+    Read a code-length table from a binary file object
+    """
+    table_format = _read_exact(stream, 1)[0]
+    lengths = [0] * 256
+    if table_format == TABLE_EMPTY:
+        return lengths
+    if table_format == TABLE_DENSE:
+        return check_code_lengths(_unpack_nibbles(_read_exact(stream, 128), 256))
+    if table_format == TABLE_SPARSE:
+        count = _read_exact(stream, 1)[0] + 1
+        symbols = _read_exact(stream, count)
+        for symbol, length in zip(symbols, _unpack_nibbles(_read_exact(stream, (count + 1) // 2), count)):
+            lengths[symbol] = length
+        return check_code_lengths(lengths)
+    raise ValueError(f"Unknown code-length table format: {table_format}")
+
+
+def unpack_code_lengths(data, offset=0):
+    """
+    Parse a code-length table starting at `offset`
+
+    Returns:
+        Tuple of (lengths, offset_after_table)
+    """
+    # The largest table is the sparse form with 256 symbols: 2 + 256 + 128 bytes
+    stream = io.BytesIO(data[offset:offset + 386])
+    lengths = read_code_lengths(stream)
+    return lengths, offset + stream.tell()
+
+
+def encode_header(original_length, bit_length, lengths, flags=0):
+    """
+    Build the header and code-length table that precede the packed payload
+    """
+    valid_bits = (bit_length - 1) % 8 + 1 if bit_length else 0
+    return HEADER.pack(MAGIC, VERSION, flags, original_length, valid_bits) + pack_code_lengths(lengths)
+
+
+def encode_shared_header(original_length, bit_length, codebook_id):
+    """
+    Header for a payload coded with a shared codebook: the code-length
+    table is replaced by the 4-byte codebook ID
+    """
+    valid_bits = (bit_length - 1) % 8 + 1 if bit_length else 0
+    return (HEADER.pack(MAGIC, VERSION, FLAG_SHARED_CODEBOOK, original_length, valid_bits)
+            + CODEBOOK_ID.pack(codebook_id))
+
+
+def encode_stored_header(original_length):
+    """
+    Header for a payload stored raw: no code-length table follows
+    """
+    return HEADER.pack(MAGIC, VERSION, FLAG_STORED, original_length, 0)
+
+
+def peek_version(data):
+    """
+    Check the magic number and return the container version
+    """
+    if len(data) < 5 or bytes(data[:4]) != MAGIC:
+        raise ValueError("Not a .huff container (bad magic number)")
+    return data[4]
+
+
+def decode_header(data):
+    """
+    Parse a .huff header from bytes-like data
+
+    Returns:
+        Dict with version, flags, original_length, valid_bits, lengths and
+        payload_offset; with FLAG_SHARED_CODEBOOK, lengths is None and
+        codebook_id names the codebook; with FLAG_STORED, lengths is None
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("File is too short to be a .huff container")
+    magic, version, flags, original_length, valid_bits = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a .huff container (bad magic number)")
+    if version != VERSION:
+        raise ValueError(f"Expected a single-block .huff container, found version {version}")
+    header = {
+        'version': version,
+        'flags': flags,
+        'original_length': original_length,
+        'valid_bits': valid_bits,
+    }
+    if flags & FLAG_STORED:
+        header['lengths'] = None
+        header['payload_offset'] = HEADER.size
+        return header
+    if flags & FLAG_SHARED_CODEBOOK:
+        if len(data) < HEADER.size + CODEBOOK_ID.size:
+            raise ValueError("Truncated .huff container: codebook ID is missing")
+        (header['codebook_id'],) = CODEBOOK_ID.unpack_from(data, HEADER.size)
+        header['lengths'] = None
+        header['payload_offset'] = HEADER.size + CODEBOOK_ID.size
+        return header
+    header['lengths'], header['payload_offset'] = unpack_code_lengths(data, HEADER.size)
+    return header
+
+
+def codebook_id(lengths):
+    """
+    Stable 32-bit ID of a codebook, derived from its code lengths
+    """
+    return zlib.crc32(_pack_nibbles(lengths))
+
+
+def encode_codebook(lengths):
+    """
+    Serialize a shared codebook artifact
+    """
+    return CODEBOOK_HEADER.pack(CODEBOOK_MAGIC, CODEBOOK_VERSION, codebook_id(lengths)) + pack_code_lengths(lengths)
+
+
+def decode_codebook(data):
+    """
+    Parse a shared codebook artifact
+
+    Returns:
+        Tuple of (codebook_id, lengths)
+    """
+    stream = io.BytesIO(data)
+    magic, version, stored_id = CODEBOOK_HEADER.unpack(_read_exact(stream, CODEBOOK_HEADER.size))
+    if magic != CODEBOOK_MAGIC:
+        raise ValueError("Not a shared codebook file (bad magic number)")
+    if version != CODEBOOK_VERSION:
+        raise ValueError(f"Unsupported shared codebook version {version}")
+    lengths = read_code_lengths(stream)
+    if codebook_id(lengths) != stored_id:
+        raise ValueError("Corrupt shared codebook: ID does not match its code lengths")
+    return stored_id, lengths
+
+
+def payload_bit_length(payload_size, valid_bits):
+    """
+    Total number of meaningful bits in a payload of `payload_size` bytes
+    """
+    return (payload_size - 1) * 8 + valid_bits if payload_size else 0
+
+
+# --- Block stream helpers ---
+def encode_stream_header(block_size, flags=0):
+    return STREAM_HEADER.pack(MAGIC, STREAM_VERSION, flags, block_size)
+
+
+def read_stream_header(stream):
+    """
+    Returns:
+        Dict with version, flags and block_size
+    """
+    magic, version, flags, block_size = STREAM_HEADER.unpack(_read_exact(stream, STREAM_HEADER.size))
+    if magic != MAGIC:
+        raise ValueError("Not a .huff container (bad magic number)")
+    if version != STREAM_VERSION:
+        raise ValueError(f"Expected a .huff block stream, found version {version}")
+    return {'version': version, 'flags': flags, 'block_size': block_size}
+
+
+def encode_block_header(raw_length, bit_length, lengths, block_type=BLOCK_HUFFMAN):
+    payload_length = (bit_length + 7) // 8
+    valid_bits = (bit_length - 1) % 8 + 1 if bit_length else 0
+    return BLOCK_HEADER.pack(block_type, raw_length, payload_length, valid_bits) + pack_code_lengths(lengths)
+
+
+def encode_stored_block_header(raw_length):
+    """
+    Block header for a block stored raw: the payload is the block itself
+    """
+    return BLOCK_HEADER.pack(BLOCK_STORED, raw_length, raw_length, 0)
+
+
+def encode_context_block_header(raw_length, bit_length, context_map, cluster_lengths):
+    """
+    Block header for an order-1 block: context_map gives the cluster (0-15)
+    of every previous-byte value, cluster_lengths the codebook of each cluster
+    """
+    payload_length = (bit_length + 7) // 8
+    valid_bits = (bit_length - 1) % 8 + 1 if bit_length else 0
+    header = bytearray(BLOCK_HEADER.pack(BLOCK_CONTEXT, raw_length, payload_length, valid_bits))
+    header.append(len(cluster_lengths))
+    header += _pack_nibbles(context_map)
+    for lengths in cluster_lengths:
+        header += pack_code_lengths(lengths)
+    return bytes(header)
+
+
+def encode_stream_end(total_length):
+    return STREAM_END.pack(BLOCK_END, total_length)
+
+
+def read_block_header(stream):
+    """
+    Read the next block header from a block stream
+
+    Returns:
+        Dict with block_type, raw_length, payload_length, valid_bits and
+        lengths (context_map and cluster_lengths for BLOCK_CONTEXT, nothing
+        more for BLOCK_STORED),
+        or {'block_type': BLOCK_END, 'total_length': n} at the end
+    """
+    block_type = _read_exact(stream, 1)[0]
+    if block_type == BLOCK_END:
+        (total_length,) = struct.unpack('>Q', _read_exact(stream, 8))
+        return {'block_type': BLOCK_END, 'total_length': total_length}
+    if block_type not in (BLOCK_HUFFMAN, BLOCK_CONTEXT, BLOCK_STORED):
+        raise ValueError(f"Unknown .huff block type: {block_type}")
+    _, raw_length, payload_length, valid_bits = BLOCK_HEADER.unpack(
+        bytes([block_type]) + _read_exact(stream, BLOCK_HEADER.size - 1)
+    )
+    block = {
+        'block_type': block_type,
+        'raw_length': raw_length,
+        'payload_length': payload_length,
+        'valid_bits': valid_bits,
+    }
+    if block_type == BLOCK_HUFFMAN:
+        block['lengths'] = read_code_lengths(stream)
+        return block
+    if block_type == BLOCK_STORED:
+        return block
+    cluster_count = _read_exact(stream, 1)[0]
+    block['context_map'] = _unpack_nibbles(_read_exact(stream, 128), 256)
+    if not cluster_count or max(block['context_map']) >= cluster_count:
+        raise ValueError("Corrupt .huff block: context map names a missing cluster")
+    block['cluster_lengths'] = [read_code_lengths(stream) for _ in range(cluster_count)]
+    return block
+
+
+def encode_index(entries, total_length, index_offset):
+    """
+    Build the block index footer from (raw_offset, block_offset) pairs.
+    index_offset is where the footer starts, relative to the stream start.
+    """
+    footer = bytearray()
+    for raw_offset, block_offset in entries:
+        footer += INDEX_ENTRY.pack(raw_offset, block_offset)
+    footer += INDEX_TRAILER.pack(total_length, index_offset, len(entries), INDEX_MAGIC)
+    return bytes(footer)
+
+
+def read_index(stream):
+    """
+    Read the block index footer of a seekable block stream
+
+    Returns:
+        Dict with total_length and entries, a list of (raw_offset, block_offset)
+    """
+    stream.seek(0)
+    if not read_stream_header(stream)['flags'] & FLAG_INDEXED:
+        raise ValueError(".huff stream has no block index")
+    stream.seek(-INDEX_TRAILER.size, io.SEEK_END)
+    total_length, index_offset, block_count, magic = INDEX_TRAILER.unpack(
+        _read_exact(stream, INDEX_TRAILER.size)
+    )
+    if magic != INDEX_MAGIC:
+        raise ValueError("Corrupt .huff block index")
+    stream.seek(index_offset)
+    index_data = _read_exact(stream, block_count * INDEX_ENTRY.size)
+    return {'total_length': total_length, 'entries': list(INDEX_ENTRY.iter_unpack(index_data))}
+
+
+# --- Pixel container helpers ---
+def encode_pixel_header(width, height, channels, mode, flags=0):
+    mode_bytes = mode.encode('ascii')
+    return PIXEL_HEADER.pack(MAGIC, PIXEL_VERSION, flags, width, height, channels, len(mode_bytes)) + mode_bytes
+
+
+def read_pixel_header(stream):
+    """
+    Returns:
+        Dict with version, flags, width, height, channels and mode
+    """
+    magic, version, flags, width, height, channels, mode_length = PIXEL_HEADER.unpack(
+        _read_exact(stream, PIXEL_HEADER.size)
+    )
+    if magic != MAGIC:
+        raise ValueError("Not a .huff container (bad magic number)")
+    if version != PIXEL_VERSION:
+        raise ValueError(f"Expected a .huff pixel container, found version {version}")
+    return {
+        'version': version,
+        'flags': flags,
+        'width': width,
+        'height': height,
+        'channels': channels,
+        'mode': _read_exact(stream, mode_length).decode('ascii'),
+    }
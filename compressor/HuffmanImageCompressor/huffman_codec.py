@@ -0,0 +1,926 @@
+import bisect
+import heapq
+import io
+import math
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import huff_container
+import numpy_backend
+from bit_stream import BitWriter
+
+# Longest code the encoder may assign; the codebook is fully described by code lengths
+MAX_CODE_LENGTH = 15
+
+# Number of bits indexed by the first-level decode table
+DECODE_ROOT_BITS = 10
+
+# Window indexed by multi-symbol decode tables (12-16 bits); one lookup
+# emits every complete code inside the window
+MULTI_SYMBOL_BITS = 12
+
+# Shortest output worth building a multi-symbol table for
+MULTI_SYMBOL_MIN_COUNT = 1 << 14
+
+# Input bytes per block when compressing in streaming mode
+STREAM_BLOCK_SIZE = 1 << 20
+
+# Estimated bits per byte at or above which input is stored raw instead of
+# coded; a byte-level Huffman code cannot save more than the remainder
+STORED_ENTROPY_BITS = 7.9
+
+# The entropy pre-check reads this many evenly spaced chunks of this size
+ENTROPY_SAMPLE_CHUNKS = 16
+ENTROPY_SAMPLE_CHUNK = 4096
+
+# Encode backends: "numpy" when NumPy is installed, otherwise pure "python"
+BACKENDS = ('numpy', 'python') if numpy_backend.AVAILABLE else ('python',)
+BACKEND = BACKENDS[0]
+
+
+def _resolve_backend(backend):
+    backend = backend or BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown or unavailable backend: {backend}")
+    return backend
+
+
+# --- Step 1: Count byte frequencies on integer byte values ---
+def count_frequencies(data, backend=None):
+    """
+    Return a 256-entry list with the number of occurrences of each byte value
+    """
+    if _resolve_backend(backend) == 'numpy':
+        return numpy_backend.count_frequencies(data)
+    frequencies = [0] * 256
+    for byte, frequency in Counter(memoryview(data).cast('B')).items():
+        frequencies[byte] = frequency
+    return frequencies
+
+
+def entropy_bits(frequencies):
+    """
+    Order-0 entropy of a histogram in bits, a lower bound on any prefix code's output
+    """
+    total = sum(frequencies)
+    return sum(frequency * math.log2(total / frequency) for frequency in frequencies if frequency)
+
+
+def _entropy_sample(data):
+    """
+    The whole input when it is small, otherwise ENTROPY_SAMPLE_CHUNKS chunks
+    spread evenly from its start to its end
+    """
+    symbols = memoryview(data).cast('B')
+    if len(symbols) <= ENTROPY_SAMPLE_CHUNKS * ENTROPY_SAMPLE_CHUNK:
+        return symbols
+    stride = (len(symbols) - ENTROPY_SAMPLE_CHUNK) // (ENTROPY_SAMPLE_CHUNKS - 1)
+    return b''.join(symbols[i * stride:i * stride + ENTROPY_SAMPLE_CHUNK] for i in range(ENTROPY_SAMPLE_CHUNKS))
+
+
+def looks_incompressible(data, backend=None):
+    """
+    Estimate the order-0 entropy of data from a sample of its byte histogram
+    and report whether it is too high for Huffman coding to pay off, e.g.
+    for JPEG or already compressed files. Small-sample estimates err low,
+    so short inputs are left to the size check after coding.
+    """
+    sample = _entropy_sample(data)
+    if not len(sample):
+        return False
+    return entropy_bits(count_frequencies(sample, backend)) >= STORED_ENTROPY_BITS * len(sample)
+
+
+# --- Step 2: Build length-limited canonical Huffman codes ---
+def build_code_lengths(frequencies, max_code_length=MAX_CODE_LENGTH):
+    """
+    Optimal code lengths no longer than `max_code_length` (package-merge).
+    Packages are array-backed: node ids below 256 are byte leaves, larger ids
+    index the package_children list, so no symbol lists are concatenated.
+
+    Returns:
+        256-entry list of code lengths (0 for unused bytes)
+    """
+    lengths = [0] * 256
+    leaves = sorted((frequency, symbol) for symbol, frequency in enumerate(frequencies) if frequency)
+    if not leaves:
+        return lengths
+    if len(leaves) == 1:
+        lengths[leaves[0][1]] = 1
+        return lengths
+    if len(leaves) > 1 << max_code_length:
+        raise ValueError(f"{len(leaves)} symbols cannot fit in {max_code_length}-bit codes")
+
+    package_children = []
+    items = leaves
+    for _ in range(max_code_length - 1):
+        packages = []
+        for i in range(0, len(items) - 1, 2):
+            packages.append((items[i][0] + items[i + 1][0], 256 + len(package_children)))
+            package_children.append((items[i][1], items[i + 1][1]))
+        items = list(heapq.merge(leaves, packages))
+
+    # Each time a leaf appears among the cheapest 2n - 2 items its code grows by one bit
+    stack = [node for _, node in items[:2 * len(leaves) - 2]]
+    while stack:
+        node = stack.pop()
+        if node < 256:
+            lengths[node] += 1
+        else:
+            stack.extend(package_children[node - 256])
+    return lengths
+
+
+def assign_canonical_codes(lengths):
+    """
+    Canonical code assignment: shorter codes first, ties broken by byte value
+    """
+    codes = [0] * 256
+    code = 0
+    previous_length = 0
+    for length, symbol in sorted((length, symbol) for symbol, length in enumerate(lengths) if length):
+        code <<= length - previous_length
+        codes[symbol] = code
+        code += 1
+        previous_length = length
+    return codes
+
+
+def build_huffman_codes(frequencies, max_code_length=MAX_CODE_LENGTH):
+    """
+    Build canonical Huffman codes for every byte value with a non-zero frequency
+
+    Returns:
+        Tuple of (codes, lengths), both 256-entry lists of ints
+    """
+    lengths = build_code_lengths(frequencies, max_code_length)
+    return assign_canonical_codes(lengths), lengths
+
+
+# --- Step 3: Encode bytes into a packed bit stream ---
+def encode(data, codes, lengths, backend=None):
+    """
+    Encode bytes-like data with the given code tables
+
+    Returns:
+        Tuple of (packed_bytearray, bit_length)
+    """
+    if _resolve_backend(backend) == 'numpy' and max(lengths) <= 16:
+        return numpy_backend.encode(data, codes, lengths)
+    writer = BitWriter()
+    writer.write_symbols(memoryview(data).cast('B'), codes, lengths)
+    return writer.finish()
+
+
+# --- Step 4: Build table-driven decoder ---
+def build_decode_table(codes, lengths, root_bits=DECODE_ROOT_BITS):
+    """
+    Build prefix lookup tables indexed by the next `root_bits` bits.
+    Codes longer than the root table are resolved through a second-level
+    table hanging off their root prefix.
+
+    Each table is (index_bits, entries). An entry is either
+    (symbol << 5) | bits_consumed for a complete code, -table_id for a link
+    to a longer-code table, or 0 for a bit pattern that is not a valid code.
+    """
+    symbols = [(codes[symbol], lengths[symbol], symbol) for symbol in range(256) if lengths[symbol]]
+    tables = []
+    if symbols:
+        _fill_decode_table(tables, symbols, root_bits)
+    return tables
+
+
+def _fill_decode_table(tables, symbols, root_bits):
+    index_bits = min(root_bits, max(length for _, length, _ in symbols))
+    entries = [0] * (1 << index_bits)
+    table_id = len(tables)
+    tables.append((index_bits, entries))
+
+    long_codes = {}
+    for code, length, symbol in symbols:
+        if length <= index_bits:
+            spread = index_bits - length
+            first = code << spread
+            entries[first:first + (1 << spread)] = [(symbol << 5) | length] * (1 << spread)
+        else:
+            tail_length = length - index_bits
+            long_codes.setdefault(code >> tail_length, []).append(
+                (code & ((1 << tail_length) - 1), tail_length, symbol)
+            )
+
+    for prefix, tail_symbols in long_codes.items():
+        entries[prefix] = -_fill_decode_table(tables, tail_symbols, root_bits)
+    return table_id
+
+
+def _lookup_chain_bits(tables, table_id):
+    index_bits, entries = tables[table_id]
+    links = {-entry for entry in entries if entry < 0}
+    return index_bits + max((_lookup_chain_bits(tables, link) for link in links), default=0)
+
+
+# --- Step 5: Decode a packed bit stream ---
+def check_symbol_count(symbol_count, bit_length):
+    """
+    Reject a symbol count that cannot fit in bit_length payload bits. Every
+    code is at least one bit long, so this bounds the output by the input
+    before anything is allocated.
+    """
+    if symbol_count > bit_length:
+        raise ValueError(f"Corrupt .huff data: {symbol_count} bytes cannot be coded in {bit_length} payload bits")
+
+
+def _check_bits_consumed(consumed, bit_length):
+    if consumed != bit_length:
+        raise ValueError(f"Corrupt .huff data: decoding used {consumed} of {bit_length} payload bits")
+
+
+def decode(packed, symbol_count, tables, bit_length=None, bit_offset=0):
+    """
+    Decode `symbol_count` bytes from MSB-first packed data with decode tables,
+    starting `bit_offset` bits into it. When symbol_count is None, decode
+    until `bit_length` bits (counted from the start of packed) are consumed;
+    otherwise a given bit_length must be consumed exactly, or the data is
+    rejected as corrupt.
+    """
+    stop_at_bit_length = symbol_count is None
+    if stop_at_bit_length:
+        symbol_count = bit_length - bit_offset
+    elif bit_length is not None:
+        check_symbol_count(symbol_count, bit_length - bit_offset)
+    output = bytearray(symbol_count)
+    if not symbol_count:
+        return output
+    if not tables:
+        raise ValueError("Empty codebook cannot decode non-empty data")
+
+    data = memoryview(packed).cast('B')
+    root_bits, root = tables[0]
+    root_mask = (1 << root_bits) - 1
+    # Enough buffered bits for the deepest chain of table lookups
+    refill_threshold = _lookup_chain_bits(tables, 0)
+    accumulator = 0
+    buffered_bits = 0
+    position = bit_offset // 8
+    if bit_offset % 8:
+        chunk = data[position:position + 8]
+        position += 8
+        accumulator = int.from_bytes(chunk, 'big') << (8 * (8 - len(chunk)))
+        buffered_bits = 64 - bit_offset % 8
+
+    for index in range(symbol_count):
+        while buffered_bits < refill_threshold:
+            chunk = data[position:position + 8]
+            position += 8
+            accumulator = ((accumulator & ((1 << buffered_bits) - 1)) << 64) | (
+                int.from_bytes(chunk, 'big') << (8 * (8 - len(chunk)))
+            )
+            buffered_bits += 64
+
+        entry = root[(accumulator >> (buffered_bits - root_bits)) & root_mask]
+        if entry <= 0:
+            index_bits = root_bits
+            while entry < 0:
+                buffered_bits -= index_bits
+                index_bits, entries = tables[-entry]
+                entry = entries[(accumulator >> (buffered_bits - index_bits)) & ((1 << index_bits) - 1)]
+            if entry == 0:
+                raise ValueError(f"Invalid Huffman code at symbol {index}")
+        buffered_bits -= entry & 31
+        output[index] = entry >> 5
+        if stop_at_bit_length and position * 8 - buffered_bits >= bit_length:
+            del output[index + 1:]
+            break
+
+    if bit_length is not None and not stop_at_bit_length:
+        _check_bits_consumed(position * 8 - buffered_bits, bit_length)
+    return output
+
+
+_SINGLE_BYTES = [bytes([symbol]) for symbol in range(256)]
+
+
+def build_multi_symbol_table(codes, lengths, window_bits=MULTI_SYMBOL_BITS):
+    """
+    Build a table indexed by the next `window_bits` bits whose entries hold
+    every complete code in that window: (symbols_bytes, bits_consumed).
+    Windows starting with a code longer than the window get (b'', 0).
+
+    Entries are built shortest window first: a window of r bits is its first
+    code followed by the already-built entry for the r - length bits left.
+    """
+    first = [0] * (1 << window_bits)
+    for symbol in range(256):
+        length = lengths[symbol]
+        if 0 < length <= window_bits:
+            spread = window_bits - length
+            start = codes[symbol] << spread
+            first[start:start + (1 << spread)] = [(symbol << 5) | length] * (1 << spread)
+
+    empty = (b'', 0)
+    by_width = [[empty]]
+    for width in range(1, window_bits + 1):
+        entries = []
+        for value in range(1 << width):
+            entry = first[value << (window_bits - width)]
+            length = entry & 31
+            if not entry or length > width:
+                entries.append(empty)
+                continue
+            rest = width - length
+            rest_symbols, rest_bits = by_width[rest][value & ((1 << rest) - 1)]
+            entries.append((bytes([entry >> 5]) + rest_symbols, length + rest_bits))
+        by_width.append(entries)
+
+    table = by_width[window_bits]
+    return [symbols for symbols, _ in table], [bits for _, bits in table]
+
+
+def prefers_multi_symbol(lengths, window_bits=MULTI_SYMBOL_BITS):
+    """
+    True when a code is expected to pack at least two symbols per window.
+    The expected length uses the probabilities the code implies (2 ** -length),
+    since decoders only see lengths.
+    """
+    expected_length = sum(length * 2.0 ** -length for length in lengths if length)
+    return 0 < expected_length <= window_bits / 2
+
+
+def decode_multi_symbol(packed, symbol_count, tables, multi_table, bit_length=None):
+    """
+    decode() using a multi-symbol table from build_multi_symbol_table. Each
+    lookup emits all codes in the window; windows that start with a longer
+    code fall back to the single-symbol tables. The last few symbols, whose
+    window could reach into the padding, are left to decode(). A given
+    bit_length must be consumed exactly, as in decode().
+    """
+    if bit_length is not None:
+        check_symbol_count(symbol_count, bit_length)
+    if not symbol_count:
+        return bytearray()
+    if not tables:
+        raise ValueError("Empty codebook cannot decode non-empty data")
+
+    data = memoryview(packed).cast('B')
+    multi_symbols, multi_bits = multi_table
+    # Windows are collected as bytes pieces, joined into output every 4 KB of input
+    output = bytearray()
+    pieces = []
+    append = pieces.append
+    window_bits = len(multi_bits).bit_length() - 1
+    window_mask = (1 << window_bits) - 1
+    root_bits, root = tables[0]
+    root_mask = (1 << root_bits) - 1
+    refill_threshold = max(_lookup_chain_bits(tables, 0), window_bits)
+    # A window holds at most window_bits codes, so up to here it never
+    # reaches past the last real code into the padding
+    last_window_index = symbol_count - window_bits
+    accumulator = 0
+    buffered_bits = 0
+    position = 0
+    index = 0
+
+    while index <= last_window_index:
+        if buffered_bits < refill_threshold:
+            chunk = data[position:position + 8]
+            position += 8
+            accumulator = ((accumulator & ((1 << buffered_bits) - 1)) << 64) | (
+                int.from_bytes(chunk, 'big') << (8 * (8 - len(chunk)))
+            )
+            buffered_bits += 64
+            if not position & 0xFFF:
+                output += b''.join(pieces)
+                pieces.clear()
+
+        window = (accumulator >> (buffered_bits - window_bits)) & window_mask
+        bits = multi_bits[window]
+        if bits:
+            symbols = multi_symbols[window]
+            append(symbols)
+            index += len(symbols)
+            buffered_bits -= bits
+            continue
+
+        entry = root[(accumulator >> (buffered_bits - root_bits)) & root_mask]
+        index_bits = root_bits
+        while entry < 0:
+            buffered_bits -= index_bits
+            index_bits, entries = tables[-entry]
+            entry = entries[(accumulator >> (buffered_bits - index_bits)) & ((1 << index_bits) - 1)]
+        if entry == 0:
+            raise ValueError(f"Invalid Huffman code at symbol {index}")
+        buffered_bits -= entry & 31
+        append(_SINGLE_BYTES[entry >> 5])
+        index += 1
+
+    output += b''.join(pieces)
+    if index < symbol_count:
+        output += decode(packed, symbol_count - index, tables, bit_length, bit_offset=position * 8 - buffered_bits)
+    elif bit_length is not None:
+        _check_bits_consumed(position * 8 - buffered_bits, bit_length)
+    return output
+
+
+# --- Step 6: Reentrant codec object ---
+class HuffmanCodec:
+    """
+    A canonical Huffman codebook with its encode and decode tables.
+    The codebook is fixed at construction and calls keep no state on the
+    instance (decode tables are built once, on first use), so one codec can
+    be reused across calls, shared between threads and pickled to worker
+    processes.
+    """
+
+    def __init__(self, lengths):
+        self.lengths = huff_container.check_code_lengths(list(lengths))
+        self.codes = assign_canonical_codes(self.lengths)
+        self._decode_tables = None
+        self._multi_symbol_table = None
+
+    @classmethod
+    def from_frequencies(cls, frequencies, max_code_length=MAX_CODE_LENGTH):
+        return cls(build_code_lengths(frequencies, max_code_length))
+
+    @classmethod
+    def from_data(cls, data, max_code_length=MAX_CODE_LENGTH, backend=None):
+        return cls.from_frequencies(count_frequencies(data, backend), max_code_length)
+
+    @classmethod
+    def from_bit_strings(cls, code_strings):
+        """
+        Rebuild a codec from a {"01000001": "0110", ...} dictionary of canonical codes
+        """
+        lengths = [0] * 256
+        for symbol, code in code_strings.items():
+            lengths[int(symbol, 2)] = len(code)
+        return cls(lengths)
+
+    @property
+    def decode_tables(self):
+        if self._decode_tables is None:
+            self._decode_tables = build_decode_table(self.codes, self.lengths)
+        return self._decode_tables
+
+    def encode(self, data, backend=None):
+        """
+        Returns:
+            Tuple of (packed_bytearray, bit_length)
+        """
+        return encode(data, self.codes, self.lengths, backend)
+
+    @property
+    def multi_symbol_table(self):
+        if self._multi_symbol_table is None:
+            self._multi_symbol_table = build_multi_symbol_table(self.codes, self.lengths)
+        return self._multi_symbol_table
+
+    def decode(self, packed, symbol_count, bit_length=None, multi_symbol=None):
+        """
+        multi_symbol picks the decoder; None uses multi-symbol tables for
+        outputs long enough to pay for building them, when the code lengths
+        suggest several symbols fit in one window. Decoding by bit_length
+        alone always uses the single-symbol tables; with a symbol_count,
+        bit_length is the payload's exact size in bits and is verified.
+        """
+        if multi_symbol is None:
+            multi_symbol = (symbol_count is not None and symbol_count >= MULTI_SYMBOL_MIN_COUNT
+                            and prefers_multi_symbol(self.lengths))
+        if multi_symbol and symbol_count is not None:
+            return decode_multi_symbol(packed, symbol_count, self.decode_tables, self.multi_symbol_table, bit_length)
+        return decode(packed, symbol_count, self.decode_tables, bit_length)
+
+    def as_bit_strings(self):
+        return codes_as_bit_strings(self.codes, self.lengths)
+
+    def __getstate__(self):
+        # Decode tables are cheap to rebuild, so keep pickles small
+        return {'lengths': self.lengths}
+
+    def __setstate__(self, state):
+        self.__init__(state['lengths'])
+
+
+# --- Step 7: One-shot compression helpers ---
+def compress_bytes(data, max_code_length=MAX_CODE_LENGTH, backend=None):
+    """
+    Huffman-compress bytes-like data with a codec built for it
+
+    Returns:
+        Tuple of (packed_bytearray, bit_length, codes, lengths)
+    """
+    codec = HuffmanCodec.from_data(data, max_code_length, backend)
+    packed, bit_length = codec.encode(data, backend)
+    return packed, bit_length, codec.codes, codec.lengths
+
+
+def decompress_bytes(packed, symbol_count, lengths, bit_length=None):
+    """
+    Decode data produced by compress_bytes from its code lengths alone;
+    a given bit_length is verified against the bits the decoding used
+    """
+    return HuffmanCodec(lengths).decode(packed, symbol_count, bit_length)
+
+
+# --- Step 8: Self-describing .huff container ---
+def _encode_single_block(data, max_code_length=MAX_CODE_LENGTH, backend=None, codebook=None):
+    """
+    Header and payload of a single-block container. With a shared codebook
+    the payload uses it unless a dynamic table would be smaller; the tree is
+    only built when the shared size is above the dynamic lower bound
+    (entropy plus table size). High-entropy data, and data whose coded form
+    would not be smaller, is stored raw.
+
+    Returns:
+        Tuple of (header, packed)
+    """
+    if looks_incompressible(data, backend):
+        return huff_container.encode_stored_header(len(data)), data
+    header, packed = _encode_coded_block(data, max_code_length, backend, codebook)
+    if len(header) + len(packed) >= huff_container.HEADER.size + len(data):
+        return huff_container.encode_stored_header(len(data)), data
+    return header, packed
+
+
+def _encode_coded_block(data, max_code_length, backend, codebook):
+    frequencies = count_frequencies(data, backend)
+    lengths = None
+    if codebook is not None and all(codebook.lengths[symbol] for symbol in range(256) if frequencies[symbol]):
+        shared_bytes = (sum(frequency * length for frequency, length in zip(frequencies, codebook.lengths)) + 7) // 8
+        table_bytes = huff_container.code_length_table_size(sum(1 for frequency in frequencies if frequency))
+        if shared_bytes + huff_container.CODEBOOK_ID.size > table_bytes + entropy_bits(frequencies) / 8:
+            lengths = build_code_lengths(frequencies, max_code_length)
+            dynamic_bytes = (sum(frequency * length for frequency, length in zip(frequencies, lengths)) + 7) // 8
+            if shared_bytes + huff_container.CODEBOOK_ID.size > table_bytes + dynamic_bytes:
+                codebook = None
+        if codebook is not None:
+            packed, bit_length = codebook.encode(data, backend)
+            codebook_id = huff_container.codebook_id(codebook.lengths)
+            return huff_container.encode_shared_header(len(data), bit_length, codebook_id), packed
+
+    codec = HuffmanCodec(lengths or build_code_lengths(frequencies, max_code_length))
+    packed, bit_length = codec.encode(data, backend)
+    return huff_container.encode_header(len(data), bit_length, codec.lengths), packed
+
+
+def compress(data, max_code_length=MAX_CODE_LENGTH, backend=None, workers=1,
+             block_size=STREAM_BLOCK_SIZE, context_model=False, codebook=None):
+    """
+    Compress bytes-like data into a self-describing .huff container.
+    With workers > 1, data larger than block_size becomes a block stream
+    whose blocks are coded in parallel. context_model=True always writes a
+    block stream so each block can pick order-0 or order-1 coding.
+    codebook is an optional shared HuffmanCodec (see shared_codebooks) used
+    for single-block containers when it beats a dynamic table.
+    """
+    if context_model or (workers > 1 and len(data) > block_size):
+        output = io.BytesIO()
+        compress_stream(io.BytesIO(data), output, block_size, max_code_length, backend, workers, context_model)
+        return bytearray(output.getbuffer())
+    header, packed = _encode_single_block(data, max_code_length, backend, codebook)
+    container = bytearray(header)
+    container += packed
+    return container
+
+
+def _shared_codec(header, codebooks):
+    """
+    Look up the codec named by a shared-codebook header
+    """
+    for codec in codebooks or ():
+        if huff_container.codebook_id(codec.lengths) == header['codebook_id']:
+            return codec
+    raise ValueError(f"Shared codebook {header['codebook_id']:08x} is required to decode this .huff container")
+
+
+def decompress(container, workers=1, codebooks=None):
+    """
+    Restore the original bytes from a .huff container or block stream.
+    With workers > 1, block stream blocks are decoded in parallel.
+    codebooks lists the shared codecs that containers may refer to by ID.
+    """
+    data = memoryview(container).cast('B')
+    if huff_container.peek_version(data) == huff_container.STREAM_VERSION:
+        output = io.BytesIO()
+        decompress_stream(io.BytesIO(data), output, workers)
+        return bytearray(output.getbuffer())
+    header = huff_container.decode_header(data)
+    payload = data[header['payload_offset']:]
+    if header['original_length'] and not len(payload):
+        raise ValueError("Truncated .huff container: payload is missing")
+    if header['flags'] & huff_container.FLAG_STORED:
+        if len(payload) < header['original_length']:
+            raise ValueError("Truncated .huff container: stored payload is incomplete")
+        return bytearray(payload[:header['original_length']])
+    bit_length = huff_container.payload_bit_length(len(payload), header['valid_bits'])
+    check_symbol_count(header['original_length'], bit_length)
+    if header['flags'] & huff_container.FLAG_SHARED_CODEBOOK:
+        return _shared_codec(header, codebooks).decode(payload, header['original_length'], bit_length)
+    return decompress_bytes(payload, header['original_length'], header['lengths'], bit_length)
+
+
+# --- Step 9: Streaming block compression ---
+def _ordered_map(func, tasks, workers=1):
+    """
+    Yield func(task) for each task in order. With workers > 1 the calls run
+    in a process pool with at most 2 * workers tasks in flight, so a lazy
+    task iterator is never read far ahead of the results being consumed.
+    """
+    if workers <= 1:
+        for task in tasks:
+            yield func(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for task in tasks:
+            in_flight.append(executor.submit(func, task))
+            if len(in_flight) >= 2 * workers:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def _compress_block(task):
+    """
+    Encode one block stream block; high-entropy blocks, and blocks that
+    coding would not shrink, are stored raw
+    """
+    block, max_code_length, backend, context_model = task
+    if looks_incompressible(block, backend):
+        return huff_container.encode_stored_block_header(len(block)) + block
+    if context_model:
+        import context_coding  # imports this module, so load it lazily
+        encoded_block = context_coding.compress_block(block, max_code_length, backend)
+    else:
+        packed, bit_length, codes, lengths = compress_bytes(block, max_code_length, backend)
+        encoded_block = huff_container.encode_block_header(len(block), bit_length, lengths) + packed
+    if len(encoded_block) >= huff_container.BLOCK_HEADER.size + len(block):
+        return huff_container.encode_stored_block_header(len(block)) + block
+    return encoded_block
+
+
+def _count_block(stats, raw_length, stored):
+    """
+    Tally a coded block in a caller's stats dict (if any)
+    """
+    if stats is None:
+        return
+    stats['blocks'] = stats.get('blocks', 0) + 1
+    stats['stored_blocks'] = stats.get('stored_blocks', 0) + stored
+    stats['stored_bytes'] = stats.get('stored_bytes', 0) + (raw_length if stored else 0)
+
+
+def decode_block(payload, block, symbol_count=None):
+    """
+    Decode one block stream block from its header dict and payload.
+    symbol_count stops after that many leading bytes instead of the whole
+    block; a whole block must use exactly the payload's valid bits.
+    """
+    whole_block = symbol_count is None or symbol_count == block['raw_length']
+    if symbol_count is None:
+        symbol_count = block['raw_length']
+    if block['block_type'] == huff_container.BLOCK_STORED:
+        if len(payload) < symbol_count:
+            raise ValueError("Truncated .huff block: stored payload is incomplete")
+        return bytearray(payload[:symbol_count])
+    if len(payload) < block['payload_length']:
+        raise ValueError("Truncated .huff block: payload is incomplete")
+    bit_length = huff_container.payload_bit_length(block['payload_length'], block['valid_bits'])
+    check_symbol_count(block['raw_length'], bit_length)
+    verified_bits = bit_length if whole_block else None
+    if block['block_type'] == huff_container.BLOCK_CONTEXT:
+        import context_coding  # imports this module, so load it lazily
+        return context_coding.decode(payload, symbol_count, block['context_map'], block['cluster_lengths'],
+                                     verified_bits)
+    return decompress_bytes(payload, symbol_count, block['lengths'], verified_bits)
+
+
+def _decompress_block(task):
+    payload, block = task
+    return decode_block(payload, block)
+
+
+def _decompress_block_at(task):
+    """
+    Decode one block straight from the file, so pool workers do their own reads
+    """
+    path, block_offset = task
+    with open(path, 'rb') as source:
+        source.seek(block_offset)
+        block = huff_container.read_block_header(source)
+        payload = source.read(block['payload_length'])
+    return decode_block(payload, block)
+
+
+def compress_stream(source, destination, block_size=STREAM_BLOCK_SIZE,
+                    max_code_length=MAX_CODE_LENGTH, backend=None, workers=1, context_model=False, stats=None):
+    """
+    Compress a binary file object into a .huff block stream, one block of
+    `block_size` input bytes at a time. Each block carries its own code
+    table, so memory use depends on block_size, not on the input size.
+    With workers > 1 the blocks are coded in a process pool. A block index
+    footer records where every block starts. With context_model=True each
+    block is coded with order-1 context codebooks when that is estimated
+    to be smaller. Incompressible blocks are stored raw; a stats dict, if
+    given, receives blocks, stored_blocks and stored_bytes counts.
+
+    Returns:
+        Tuple of (original_bytes, compressed_bytes)
+    """
+    def read_blocks():
+        while True:
+            block = source.read(block_size)
+            if not block:
+                return
+            yield block, max_code_length, backend, context_model
+
+    written = destination.write(huff_container.encode_stream_header(block_size, huff_container.FLAG_INDEXED))
+    total_length = 0
+    index_entries = []
+    for encoded_block in _ordered_map(_compress_block, read_blocks(), workers):
+        block_type, raw_length = huff_container.BLOCK_HEADER.unpack_from(encoded_block)[:2]
+        _count_block(stats, raw_length, block_type == huff_container.BLOCK_STORED)
+        index_entries.append((total_length, written))
+        written += destination.write(encoded_block)
+        total_length += raw_length
+    written += destination.write(huff_container.encode_stream_end(total_length))
+    written += destination.write(huff_container.encode_index(index_entries, total_length, written))
+    return total_length, written
+
+
+def decompress_stream(source, destination, workers=1):
+    """
+    Decode a .huff block stream from a binary file object block by block.
+    With workers > 1 the blocks are decoded in a process pool.
+
+    Returns:
+        Number of bytes written to destination
+    """
+    huff_container.read_stream_header(source)
+    trailer = {}
+
+    def read_blocks():
+        while True:
+            block = huff_container.read_block_header(source)
+            if block['block_type'] == huff_container.BLOCK_END:
+                trailer.update(block)
+                return
+            payload = source.read(block['payload_length'])
+            if len(payload) != block['payload_length']:
+                raise ValueError("Truncated .huff stream: block payload is incomplete")
+            yield payload, block
+
+    total_length = 0
+    for decoded in _ordered_map(_decompress_block, read_blocks(), workers):
+        destination.write(decoded)
+        total_length += len(decoded)
+    if trailer['total_length'] != total_length:
+        raise ValueError("Corrupt .huff stream: decoded length does not match the trailer")
+    return total_length
+
+
+def compress_fileobj(source, destination, max_code_length=MAX_CODE_LENGTH, backend=None,
+                     block_size=STREAM_BLOCK_SIZE, workers=1, context_model=False, codebook=None, stats=None):
+    """
+    Compress a seekable binary file object into a .huff container written to
+    destination, choosing between a single block and a block stream by the
+    bytes left in source, as compress_file does
+
+    Returns:
+        Tuple of (original_bytes, compressed_bytes)
+    """
+    start = source.tell()
+    remaining = source.seek(0, io.SEEK_END) - start
+    source.seek(start)
+    if context_model or remaining > block_size:
+        return compress_stream(source, destination, block_size, max_code_length, backend, workers, context_model, stats)
+
+    data = source.read()
+    header, packed = _encode_single_block(data, max_code_length, backend, codebook)
+    _count_block(stats, len(data), bool(header[5] & huff_container.FLAG_STORED))
+    destination.write(header)
+    destination.write(packed)
+    return len(data), len(header) + len(packed)
+
+
+def compress_file(input_path, output_path, max_code_length=MAX_CODE_LENGTH, backend=None,
+                  block_size=STREAM_BLOCK_SIZE, workers=1, context_model=False, codebook=None, stats=None):
+    """
+    Compress a file into a .huff container. Files larger than block_size are
+    written as a block stream so the whole file is never held in memory;
+    with workers > 1 its blocks are coded in a process pool. context_model=True
+    always writes a block stream and lets each block use order-1 coding.
+    Files that fit in one block may use the shared codebook instead of
+    their own table. stats is passed on as in compress_stream.
+
+    Returns:
+        Tuple of (original_bits, compressed_bits) where compressed_bits
+        includes the container header
+    """
+    with open(input_path, 'rb') as source, open(output_path, 'wb') as destination:
+        original_bytes, compressed_bytes = compress_fileobj(
+            source, destination, max_code_length, backend, block_size, workers, context_model, codebook, stats
+        )
+    return original_bytes * 8, compressed_bytes * 8
+
+
+def decompress_file(input_path, output_path, workers=1, codebooks=None):
+    """
+    Restore the original file from a .huff container or block stream.
+    With workers > 1, indexed block streams are decoded in a process pool
+    whose workers read their blocks directly at the indexed offsets.
+    Pixel containers are restored as an image in the format implied by
+    output_path. codebooks lists the shared codecs containers may refer to.
+
+    Returns:
+        Number of bytes written
+    """
+    with open(input_path, 'rb') as source:
+        header = source.read(huff_container.STREAM_HEADER.size)
+        source.seek(0)
+        version = huff_container.peek_version(header)
+        if version == huff_container.PIXEL_VERSION:
+            import predictive_filters  # imports this module, so load it lazily
+            return predictive_filters.decompress_image_file(input_path, output_path)
+        if version == huff_container.STREAM_VERSION:
+            indexed = huff_container.read_stream_header(source)['flags'] & huff_container.FLAG_INDEXED
+            source.seek(0)
+            with open(output_path, 'wb') as destination:
+                if workers <= 1 or not indexed:
+                    return decompress_stream(source, destination, workers)
+                index = huff_container.read_index(source)
+                tasks = ((input_path, block_offset) for raw_offset, block_offset in index['entries'])
+                total_length = 0
+                for decoded in _ordered_map(_decompress_block_at, tasks, workers):
+                    total_length += destination.write(decoded)
+                if total_length != index['total_length']:
+                    raise ValueError("Corrupt .huff stream: decoded length does not match the index")
+                return total_length
+        data = decompress(source.read(), codebooks=codebooks)
+    with open(output_path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+
+# --- Step 10: Random-access reads ---
+def _covering_blocks(source):
+    """
+    Yield (raw_offset, block_offset) for every block of a block stream,
+    from the index footer when there is one, otherwise by skipping from
+    block header to block header without decoding any payload
+    """
+    header = huff_container.read_stream_header(source)
+    if header['flags'] & huff_container.FLAG_INDEXED:
+        yield from huff_container.read_index(source)['entries']
+        return
+    raw_offset = 0
+    while True:
+        block_offset = source.tell()
+        block = huff_container.read_block_header(source)
+        if block['block_type'] == huff_container.BLOCK_END:
+            return
+        yield raw_offset, block_offset
+        source.seek(block['payload_length'], io.SEEK_CUR)
+        raw_offset += block['raw_length']
+
+
+def read_range(path, start, length, codebooks=None):
+    """
+    Return `length` original bytes starting at offset `start` of a .huff
+    file (fewer at the end of the file). In an indexed block stream the
+    covering blocks are found by binary search on the index footer and only
+    those blocks are read, each decoded no further than the range needs;
+    single-block containers are decoded whole.
+    """
+    if start < 0 or length < 0:
+        raise ValueError("start and length must not be negative")
+    end = start + length
+    with open(path, 'rb') as source:
+        version = huff_container.peek_version(source.read(5))
+        source.seek(0)
+        if version != huff_container.STREAM_VERSION:
+            return decompress(source.read(), codebooks=codebooks)[start:end]
+        blocks = list(_covering_blocks(source))
+        raw_offsets = [raw_offset for raw_offset, _ in blocks]
+        first = max(bisect.bisect_right(raw_offsets, start) - 1, 0)
+        output = bytearray()
+        for raw_offset, block_offset in blocks[first:bisect.bisect_left(raw_offsets, end)]:
+            source.seek(block_offset)
+            block = huff_container.read_block_header(source)
+            payload = source.read(block['payload_length'])
+            if len(payload) != block['payload_length']:
+                raise ValueError("Truncated .huff stream: block payload is incomplete")
+            # Codes are decoded in order, so stop at the last byte needed
+            decoded = decode_block(payload, block, min(block['raw_length'], end - raw_offset))
+            output += decoded[max(start - raw_offset, 0):]
+        return output
+
+
+def codes_as_bit_strings(codes, lengths):
+    """
+    Convert code tables to the {"01000001": "0110", ...} form used by code dictionary files
+    """
+    return {
+        format(symbol, '08b'): format(codes[symbol], f'0{lengths[symbol]}b')
+        for symbol in range(256) if lengths[symbol]
+    }
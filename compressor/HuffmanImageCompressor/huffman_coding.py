@@ -1,94 +1,48 @@
-import heapq
 import file_handling
+from huffman_codec import HuffmanCodec
 
-# Global dictionary for storing Huffman codes
+# Codebook of the most recent compress() call, kept for decompress() and
+# code dictionary files. New code should hold a huffman_codec.HuffmanCodec.
 huffman_codes = {}
 
-# --- Node class for Huffman Tree ---
-class Node:
-    def __init__(self, frequency, symbol, left=None, right=None):
-        self.frequency = frequency
-        self.symbol = symbol
-        self.left = left
-        self.right = right
-        self.huffman_direction = ''  # 0 or 1 for tree traversal
+# --- Bit-string <-> bytes helpers for the codec wrappers ---
+def _bit_string_to_bytes(bit_string):
+    padded_length = (len(bit_string) + 7) // 8 * 8
+    if not padded_length:
+        return b''
+    return int(bit_string.ljust(padded_length, '0'), 2).to_bytes(padded_length // 8, 'big')
 
-    def __lt__(self, nxt):
-        return self.frequency < nxt.frequency
 
+def _bytes_to_bit_string(data, bit_length):
+    if not bit_length:
+        return ''
+    return format(int.from_bytes(data, 'big'), f'0{len(data) * 8}b')[:bit_length]
 
-# --- Step 1: Count byte frequencies ---
-def get_frequency(image_bit_string):
-    byte_to_frequency = {}
-    for i in range(0, len(image_bit_string), 8):
-        byte = image_bit_string[i:i + 8]
-        byte_to_frequency[byte] = byte_to_frequency.get(byte, 0) + 1
-    return byte_to_frequency
 
-
-# --- Step 2: Build Huffman Tree ---
-def get_merged_huffman_tree(byte_to_frequency):
-    huffman_tree = []
-    for byte, frequency in byte_to_frequency.items():
-        heapq.heappush(huffman_tree, Node(frequency, byte))
-
-    while len(huffman_tree) > 1:
-        left = heapq.heappop(huffman_tree)
-        right = heapq.heappop(huffman_tree)
-        left.huffman_direction = "0"
-        right.huffman_direction = "1"
-        merged_node = Node(
-            left.frequency + right.frequency,
-            left.symbol + right.symbol,
-            left,
-            right
-        )
-        heapq.heappush(huffman_tree, merged_node)
-
-    return huffman_tree[0]
-
-
-# --- Step 3: Generate Huffman Codes ---
-def calculate_huffman_codes(node, code=''):
-    code += node.huffman_direction
-    if node.left:
-        calculate_huffman_codes(node.left, code)
-    if node.right:
-        calculate_huffman_codes(node.right, code)
-    if not node.left and not node.right:
-        huffman_codes[node.symbol] = code
-    return huffman_codes
-
-
-# --- Step 4: Compress image bit string ---
-def get_compressed_image(image_bit_string):
-    compressed_image_bit_string = ""
-    for i in range(0, len(image_bit_string), 8):
-        byte = image_bit_string[i:i + 8]
-        compressed_image_bit_string += huffman_codes[byte]
-    return compressed_image_bit_string
-
-
-# --- Step 5: Main Compression Function ---
+# --- Main Compression Function ---
 def compress(image_bit_string):
-    byte_to_frequency = get_frequency(image_bit_string)
-    merged_huffman_tree = get_merged_huffman_tree(byte_to_frequency)
-    calculate_huffman_codes(merged_huffman_tree)
+    """
+    Thin wrapper over huffman_codec.HuffmanCodec for bit-string callers.
+    huffman_codes is replaced with this image's codebook on every call.
+    """
+    data = _bit_string_to_bytes(image_bit_string)
+    codec = HuffmanCodec.from_data(data)
+    huffman_codes.clear()
+    huffman_codes.update(codec.as_bit_strings())
 
     # Save Huffman codes to file for reference
     file_handling.write_dictionary_file(huffman_codes, "IO/Outputs/huffman_codes.txt")
 
-    return get_compressed_image(image_bit_string)
+    packed, bit_length = codec.encode(data)
+    return _bytes_to_bit_string(packed, bit_length)
 
 
-# --- Step 6: Decompression Function ---
+# --- Decompression Function ---
 def decompress(compressed_image_bit_string):
-    decompressed_image_bit_string = ""
-    current_code = ""
-    for bit in compressed_image_bit_string:
-        current_code += bit
-        for byte, code in huffman_codes.items():
-            if current_code == code:
-                decompressed_image_bit_string += byte
-                current_code = ""
-    return decompressed_image_bit_string
\ No newline at end of file
+    """
+    Decode a bit string produced by compress() using the codebook in huffman_codes
+    """
+    codec = HuffmanCodec.from_bit_strings(huffman_codes)
+    packed = _bit_string_to_bytes(compressed_image_bit_string)
+    decoded = codec.decode(packed, None, bit_length=len(compressed_image_bit_string))
+    return _bytes_to_bit_string(decoded, len(decoded) * 8)
@@ -1,5 +1,6 @@
-import file_handling
-import huffman_coding
+import huffman_codec
+import predictive_filters
+import shared_codebooks
 import os
 from PIL import Image
 import io
@@ -30,33 +31,58 @@ def compress_image_to_jpg(input_path, output_path, quality=85):
 
 def huffman_compress_image(input_path, output_path):
     """
-    Compress image using Huffman coding and save as binary file
+    Compress image using Huffman coding and save as a .huff container
     """
     try:
-        # Read image as bit string
-        image_bit_string = file_handling.read_image_bit_string(input_path)
-        print(f"Original size: {len(image_bit_string)} bits")
+        # Compress into a self-describing .huff container
+        original_bits, compressed_bits = huffman_codec.compress_file(input_path, output_path)
+        print(f"Original size: {original_bits} bits")
+        print(f"Compressed size: {compressed_bits} bits")
         
-        # Compress using Huffman coding
-        compressed_image_bit_string = huffman_coding.compress(image_bit_string)
-        print(f"Compressed size: {len(compressed_image_bit_string)} bits")
+        return original_bits, compressed_bits
         
-        # Save compressed file
-        file_handling.write_image(compressed_image_bit_string, output_path)
+    except Exception as e:
+        print(f"Error: {e}")
+        return None, None
+
+def huffman_compress_pixels(input_path, output_path):
+    """
+    Losslessly compress image pixels with prediction filters and Huffman coding
+    """
+    try:
+        original_bits, compressed_bits = predictive_filters.compress_image_file(input_path, output_path)
+        print(f"Original size: {original_bits} bits")
+        print(f"Compressed size: {compressed_bits} bits")
         
-        return len(image_bit_string), len(compressed_image_bit_string)
+        return original_bits, compressed_bits
         
     except Exception as e:
         print(f"Error: {e}")
         return None, None
 
+def huffman_decompress_image(input_path, output_path, codebooks=None):
+    """
+    Restore the original image file from a .huff container. codebooks lists
+    the shared codecs (see shared_codebooks) the container may refer to.
+    """
+    try:
+        restored_size = huffman_codec.decompress_file(input_path, output_path, codebooks=codebooks)
+        print(f"Restored size: {restored_size} bytes")
+        return restored_size
+        
+    except Exception as e:
+        print(f"Error: {e}")
+        return None
+
 # Main execution
 if __name__ == "__main__":
     print("Image Compressor")
     print("1. JPEG Quality Compression (viewable image)")
     print("2. Huffman Binary Compression (not viewable)")
+    print("3. Huffman Decompression (.huff back to the original image)")
+    print("4. Lossless Pixel Compression (prediction filters + Huffman, for BMP/TIFF)")
     
-    choice = input("Choose compression method (1 or 2): ")
+    choice = input("Choose compression method (1, 2, 3 or 4): ")
     image_path = input("Enter image path: ")
     
     input_filename = os.path.splitext(os.path.basename(image_path))[0]
@@ -82,7 +108,7 @@ if __name__ == "__main__":
             
     elif choice == "2":
         # Huffman compression
-        output_path = f"IO/Outputs/{input_filename}_huffman_compressed.bin"
+        output_path = f"IO/Outputs/{input_filename}.huff"
         print(f"Compressing with Huffman coding...")
         
         original_bits, compressed_bits = huffman_compress_image(image_path, output_path)
@@ -99,5 +125,37 @@ if __name__ == "__main__":
             print(f"Space saved: {space_saved} bits")
             print("Note: This is a binary file, not a viewable image.")
             
+    elif choice == "3":
+        # Huffman decompression
+        output_path = input("Enter output image path: ")
+        codebook_path = input("Shared codebook (.hcb) the file was compressed with (Enter to skip): ").strip()
+        codebooks = [shared_codebooks.load_codebook(codebook_path)] if codebook_path else None
+        print(f"Decompressing {image_path}...")
+        
+        restored_size = huffman_decompress_image(image_path, output_path, codebooks)
+        
+        if restored_size is not None:
+            print(f"\nDecompression Complete!")
+            print(f"Restored file: {output_path}")
+            
+    elif choice == "4":
+        # Predictive filtering on decoded pixels
+        output_path = f"IO/Outputs/{input_filename}_pixels.huff"
+        print(f"Compressing pixels with prediction filters...")
+        
+        original_bits, compressed_bits = huffman_compress_pixels(image_path, output_path)
+        
+        if original_bits and compressed_bits:
+            compression_ratio = original_bits / compressed_bits
+            space_saved = original_bits - compressed_bits
+            
+            print(f"\nCompression Complete!")
+            print(f"Compressed file: {output_path}")
+            print(f"Original size: {original_bits} bits")
+            print(f"Compressed size: {compressed_bits} bits")
+            print(f"Compression ratio: {compression_ratio:.2f}")
+            print(f"Space saved: {space_saved} bits")
+            print("Note: Decompress to .png, .bmp or .tiff to restore the exact pixels.")
+            
     else:
         print("Invalid choice!")
@@ -1,27 +1,20 @@
-import file_handling
-import huffman_coding
+import huffman_codec
 import os
 
 # --- Get image path ---
 image_path = input("Enter Image Path: ")
 print(f"Compressing: {image_path}")
 
-# --- Read image ---
-image_bit_string = file_handling.read_image_bit_string(image_path)
-print(f"Original size: {len(image_bit_string)} bits")
-
-# --- Compress with Huffman coding ---
-compressed_image_bit_string = huffman_coding.compress(image_bit_string)
-print(f"Compressed size: {len(compressed_image_bit_string)} bits")
-
-# --- Save compressed file ---
+# --- Compress with Huffman coding into a .huff container ---
 input_filename = os.path.splitext(os.path.basename(image_path))[0]
-output_path = f"IO/Outputs/{input_filename}_compressed.bin"
-file_handling.write_image(compressed_image_bit_string, output_path)
+output_path = f"IO/Outputs/{input_filename}.huff"
+original_bits, compressed_bits = huffman_codec.compress_file(image_path, output_path)
+print(f"Original size: {original_bits} bits")
+print(f"Compressed size: {compressed_bits} bits")
 
 # --- Show results ---
-compression_ratio = len(image_bit_string) / len(compressed_image_bit_string)
-space_saved = len(image_bit_string) - len(compressed_image_bit_string)
+compression_ratio = original_bits / compressed_bits
+space_saved = original_bits - compressed_bits
 
 print(f"\nCompression Complete!")
 print(f"Compressed file: {output_path}")
@@ -0,0 +1,90 @@
+# --- Optional NumPy backend for the Huffman encode path ---
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; huffman_codec falls back to pure Python
+    np = None
+
+AVAILABLE = np is not None
+
+# Symbols encoded per vectorized pass, bounding temporary arrays to a few MB
+ENCODE_CHUNK_SIZE = 1 << 20
+
+
+def count_frequencies(data):
+    """
+    256-entry byte histogram via np.bincount on a zero-copy view
+    """
+    symbols = np.frombuffer(data, dtype=np.uint8)
+    return np.bincount(symbols, minlength=256).tolist()
+
+
+def count_pair_frequencies(data):
+    """
+    65536-entry histogram of (previous_byte << 8) | byte pairs, where the
+    first byte's previous byte is 0
+    """
+    symbols = np.frombuffer(data, dtype=np.uint8).astype(np.int32)
+    previous = np.concatenate(([0], symbols[:-1])) if len(symbols) else symbols
+    return np.bincount((previous << 8) | symbols, minlength=65536).tolist()
+
+
+def encode(data, codes, lengths, chunk_size=ENCODE_CHUNK_SIZE):
+    """
+    Encode bytes-like data with 256-entry code/length tables (codes of at
+    most 16 bits). Every code is left-aligned in a big-endian uint16, so one
+    gather plus np.unpackbits yields an (n, 16) bit matrix; masking off the
+    bits past each code's length leaves the concatenated bit stream, which
+    np.packbits packs. Bits left over from a chunk carry into the next one.
+
+    Returns:
+        Tuple of (packed_bytearray, bit_length) matching BitWriter output
+    """
+    symbols = np.frombuffer(data, dtype=np.uint8)
+    chunks = (symbols[start:start + chunk_size] for start in range(0, len(symbols), chunk_size))
+    return _encode_indices(chunks, codes, lengths)
+
+
+def encode_context(data, codes, lengths, chunk_size=ENCODE_CHUNK_SIZE):
+    """
+    encode() with 65536-entry tables indexed by (previous_byte << 8) | byte,
+    matching BitWriter.write_context_symbols
+    """
+    symbols = np.frombuffer(data, dtype=np.uint8)
+
+    def chunks():
+        for start in range(0, len(symbols), chunk_size):
+            chunk = symbols[start:start + chunk_size].astype(np.uint16)
+            previous = np.empty_like(chunk)
+            previous[0] = symbols[start - 1] if start else 0
+            previous[1:] = chunk[:-1]
+            yield (previous << 8) | chunk
+
+    return _encode_indices(chunks(), codes, lengths)
+
+
+def _encode_indices(index_chunks, codes, lengths):
+    length_table = np.asarray(lengths, dtype=np.uint16)
+    if length_table.max(initial=0) > 16:
+        raise ValueError("The NumPy backend supports codes of at most 16 bits")
+    aligned_codes = (
+        np.asarray(codes, dtype=np.uint32) << (16 - length_table.astype(np.uint32))
+    ).astype('>u2')
+    bit_columns = np.arange(16, dtype=np.uint16)
+
+    packed = bytearray()
+    carry = np.zeros(0, dtype=np.uint8)
+    bit_length = 0
+
+    for chunk in index_chunks:
+        bit_matrix = np.unpackbits(aligned_codes[chunk].view(np.uint8)).reshape(-1, 16)
+        chunk_bits = bit_matrix[bit_columns < length_table[chunk][:, None]]
+        bit_length += len(chunk_bits)
+
+        bits = np.concatenate((carry, chunk_bits)) if len(carry) else chunk_bits
+        whole_bits = len(bits) & ~7
+        packed += np.packbits(bits[:whole_bits]).tobytes()
+        carry = bits[whole_bits:]
+
+    if len(carry):
+        packed += np.packbits(carry).tobytes()
+    return packed, bit_length
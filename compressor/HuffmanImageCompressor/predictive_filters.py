@@ -0,0 +1,297 @@
+# --- Lossless pixel-domain compression with PNG-style prediction filters ---
+import io
+import math
+import os
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:  # Predictive filtering needs both NumPy and Pillow
+    np = None
+    Image = None
+
+import huff_container
+import huffman_codec
+
+AVAILABLE = np is not None
+
+# Filter types, numbered as in PNG
+FILTER_NONE = 0
+FILTER_SUB = 1      # predict from the pixel to the left
+FILTER_UP = 2       # predict from the pixel above
+FILTER_AVERAGE = 3  # predict from the mean of left and above
+FILTER_PAETH = 4    # predict from whichever of left, above, upper-left is closest to left + above - upper-left
+
+# Rows filtered per vectorized pass, bounding the candidate residual arrays
+FILTER_CHUNK_ROWS = 256
+
+# Cells in each skewed buffer when unfiltering Average/Paeth rows (int16, so 8 MB)
+UNFILTER_BAND_CELLS = 1 << 22
+
+# Modes stored as-is (8 bits per channel); others are converted first
+SUPPORTED_MODES = ('L', 'LA', 'RGB', 'RGBA', 'CMYK', 'YCbCr', 'LAB', 'HSV')
+
+
+def _require_dependencies():
+    if not AVAILABLE:
+        raise RuntimeError("Predictive filtering requires NumPy and Pillow")
+
+
+def _paeth(a, b, c):
+    """
+    Paeth predictor on int16 arrays of left, above and upper-left pixels
+    """
+    pa = np.abs(b - c)
+    pb = np.abs(a - c)
+    pc = np.abs(a + b - 2 * c)
+    return np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+
+
+def _predict(filter_types, a, b, c):
+    """
+    Per-pixel prediction; filter_types broadcasts against a, b and c
+    """
+    return np.select(
+        [filter_types == FILTER_SUB, filter_types == FILTER_UP,
+         filter_types == FILTER_AVERAGE, filter_types == FILTER_PAETH],
+        [a, b, (a + b) >> 1, _paeth(a, b, c)],
+        0,
+    )
+
+
+def filter_pixels(pixels, chunk_rows=FILTER_CHUNK_ROWS):
+    """
+    Apply the best of the five PNG filters to each row of an (height, width,
+    channels) uint8 array. Like PNG encoders, the filter chosen for a row is
+    the one whose residuals, read as signed bytes, have the smallest sum of
+    absolute values.
+
+    Returns:
+        Tuple of (filter_types uint8 array of length height, residuals uint8
+        array shaped like pixels)
+    """
+    _require_dependencies()
+    height = pixels.shape[0]
+    filter_types = np.zeros(height, dtype=np.uint8)
+    residuals = np.empty_like(pixels)
+    candidate_types = np.arange(5)[:, None, None, None]
+
+    for start in range(0, height, chunk_rows):
+        stop = min(start + chunk_rows, height)
+        x = pixels[start:stop].astype(np.int16)
+        b = np.zeros_like(x)
+        b[1:] = x[:-1]
+        if start:
+            b[0] = pixels[start - 1]
+        a = np.zeros_like(x)
+        a[:, 1:] = x[:, :-1]
+        c = np.zeros_like(x)
+        c[:, 1:] = b[:, :-1]
+
+        # One residual array per filter type, then pick the cheapest per row
+        candidates = (x - _predict(candidate_types, a, b, c)) & 0xFF
+        costs = np.minimum(candidates, 256 - candidates).sum(axis=(2, 3))
+        chosen = costs.argmin(axis=0)
+        filter_types[start:stop] = chosen
+        residuals[start:stop] = candidates[chosen, np.arange(stop - start)]
+    return filter_types, residuals
+
+
+def _wavefront_band(types, residuals, previous):
+    """
+    Rebuild a band of Average/Paeth rows below the row `previous`. Each
+    pixel depends on its left, upper and upper-left neighbours, so pixels
+    on the same anti-diagonal (x + y) are independent and each diagonal is
+    rebuilt in one vectorized step. The band is stored skewed (row y
+    shifted right by y) so every diagonal is a plain column slice.
+    """
+    height, width, channels = residuals.shape
+    # skewed[y + 1, y + x + 2] holds pixel (y, x) and skewed[0, x + 1] the
+    # row above the band; unused cells stay zero as out-of-image neighbours
+    skewed = np.zeros((height + 1, height + width + 2, channels), dtype=np.int16)
+    skewed_residuals = np.zeros_like(skewed)
+    skewed[0, 1:width + 1] = previous
+    for y in range(height):
+        skewed_residuals[y + 1, y + 2:y + 2 + width] = residuals[y]
+    types = types.astype(np.int16)[:, None]
+
+    for diagonal in range(height + width - 1):
+        y0 = max(0, diagonal - width + 1)
+        y1 = min(height - 1, diagonal) + 1
+        a = skewed[y0 + 1:y1 + 1, diagonal + 1]
+        b = skewed[y0:y1, diagonal + 1]
+        c = skewed[y0:y1, diagonal]
+        prediction = _predict(types[y0:y1], a, b, c)
+        skewed[y0 + 1:y1 + 1, diagonal + 2] = (skewed_residuals[y0 + 1:y1 + 1, diagonal + 2] + prediction) & 0xFF
+
+    return np.stack([skewed[y + 1, y + 2:y + 2 + width] for y in range(height)]).astype(np.uint8)
+
+
+def _band_rows(width, channels):
+    """
+    Largest band height whose skewed buffer, band * (band + width + 2) *
+    channels cells, fits in UNFILTER_BAND_CELLS (at least one row)
+    """
+    span = width + 2
+    cells = UNFILTER_BAND_CELLS // channels
+    return max(1, (math.isqrt(span * span + 4 * cells) - span) // 2)
+
+
+def _unfilter_runs(filter_types, residuals, previous):
+    """
+    Rebuild rows without Average/Paeth filters below the row `previous`,
+    one run of the same filter type at a time
+    """
+    pixels = np.empty_like(residuals)
+    start = 0
+    while start < len(filter_types):
+        filter_type = filter_types[start]
+        stop = start + 1
+        while stop < len(filter_types) and filter_types[stop] == filter_type:
+            stop += 1
+        above = pixels[start - 1] if start else previous
+        if filter_type == FILTER_NONE:
+            pixels[start:stop] = residuals[start:stop]
+        elif filter_type == FILTER_UP:
+            # uint8 sums wrap modulo 256, as the filter arithmetic does
+            pixels[start:stop] = np.cumsum(residuals[start:stop], axis=0, dtype=np.uint8) + above
+        else:
+            pixels[start:stop] = np.cumsum(residuals[start:stop], axis=1, dtype=np.uint8)
+        start = stop
+    return pixels
+
+
+def unfilter_pixels(filter_types, residuals):
+    """
+    Invert filter_pixels, rebuilding bands of rows top to bottom. Bands
+    with Average or Paeth rows go through _wavefront_band; others are
+    rebuilt a run of None, Sub or Up rows at a time with cumulative sums.
+    Bands are sized so the skewed buffers stay within UNFILTER_BAND_CELLS,
+    so memory grows with the pixel count rather than with height * width.
+
+    Returns:
+        uint8 array of pixels shaped like residuals
+    """
+    _require_dependencies()
+    height, width, channels = residuals.shape
+    pixels = np.empty_like(residuals)
+    previous = np.zeros((width, channels), dtype=np.uint8)
+    band_rows = _band_rows(width, channels)
+    for start in range(0, height, band_rows):
+        stop = min(start + band_rows, height)
+        types = filter_types[start:stop]
+        if (types >= FILTER_AVERAGE).any():
+            pixels[start:stop] = _wavefront_band(types, residuals[start:stop], previous)
+        else:
+            pixels[start:stop] = _unfilter_runs(types, residuals[start:stop], previous)
+        previous = pixels[stop - 1]
+    return pixels
+
+
+def load_pixels(image):
+    """
+    Convert a Pillow image to an (height, width, channels) uint8 array.
+    Palette images become RGB or RGBA and 1-bit images become L; modes with
+    more than 8 bits per channel are rejected.
+
+    Returns:
+        Tuple of (pixels, mode)
+    """
+    _require_dependencies()
+    if image.mode == 'P':
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+    elif image.mode == '1':
+        image = image.convert('L')
+    if image.mode not in SUPPORTED_MODES:
+        raise ValueError(f"Predictive filtering supports 8-bit images only, not mode {image.mode}")
+    pixels = np.asarray(image, dtype=np.uint8)
+    if pixels.ndim == 2:
+        pixels = pixels[:, :, None]
+    return pixels, image.mode
+
+
+def compress_pixels(pixels, mode, max_code_length=huffman_codec.MAX_CODE_LENGTH, backend=None):
+    """
+    Filter an (height, width, channels) uint8 array and Huffman-code the
+    row filter types and each channel's residual plane with their own tables
+
+    Returns:
+        bytearray holding a .huff pixel container
+    """
+    filter_types, residuals = filter_pixels(pixels)
+    height, width, channels = pixels.shape
+    container = bytearray(huff_container.encode_pixel_header(width, height, channels, mode))
+    planes = [filter_types.tobytes()] + [residuals[:, :, channel].tobytes() for channel in range(channels)]
+    for plane in planes:
+        packed, bit_length, codes, lengths = huffman_codec.compress_bytes(plane, max_code_length, backend)
+        container += huff_container.encode_block_header(len(plane), bit_length, lengths)
+        container += packed
+    container += huff_container.encode_stream_end(pixels.size)
+    return container
+
+
+def decompress_pixels(container):
+    """
+    Restore the pixels of a .huff pixel container
+
+    Returns:
+        Tuple of (pixels uint8 array, mode)
+    """
+    _require_dependencies()
+    stream = io.BytesIO(container)
+    header = huff_container.read_pixel_header(stream)
+    height, width, channels = header['height'], header['width'], header['channels']
+
+    planes = []
+    for expected_length in [height] + [height * width] * channels:
+        block = huff_container.read_block_header(stream)
+        if block['block_type'] == huff_container.BLOCK_END or block['raw_length'] != expected_length:
+            raise ValueError("Corrupt .huff pixel container: unexpected plane size")
+        payload = stream.read(block['payload_length'])
+        if len(payload) != block['payload_length']:
+            raise ValueError("Truncated .huff pixel container: plane payload is incomplete")
+        planes.append(huffman_codec.decode_block(payload, block))
+    trailer = huff_container.read_block_header(stream)
+    if trailer['block_type'] != huff_container.BLOCK_END or trailer['total_length'] != height * width * channels:
+        raise ValueError("Corrupt .huff pixel container: pixel count does not match the trailer")
+
+    filter_types = np.frombuffer(bytes(planes[0]), dtype=np.uint8)
+    residuals = np.stack(
+        [np.frombuffer(bytes(plane), dtype=np.uint8).reshape(height, width) for plane in planes[1:]], axis=2
+    )
+    return unfilter_pixels(filter_types, residuals), header['mode']
+
+
+def compress_image_file(input_path, output_path, max_code_length=huffman_codec.MAX_CODE_LENGTH, backend=None):
+    """
+    Compress the pixels of an image file (first frame only) into a .huff
+    pixel container
+
+    Returns:
+        Tuple of (original_bits, compressed_bits) where original_bits is the
+        size of the input file
+    """
+    _require_dependencies()
+    with Image.open(input_path) as image:
+        pixels, mode = load_pixels(image)
+    container = compress_pixels(pixels, mode, max_code_length, backend)
+    with open(output_path, 'wb') as f:
+        f.write(container)
+    return os.path.getsize(input_path) * 8, len(container) * 8
+
+
+def decompress_image_file(input_path, output_path):
+    """
+    Restore the pixels of a .huff pixel container and save them with Pillow
+    in the format implied by output_path. Use a lossless format such as PNG,
+    BMP or TIFF to keep the round trip exact.
+
+    Returns:
+        Number of bytes written
+    """
+    _require_dependencies()
+    with open(input_path, 'rb') as f:
+        pixels, mode = decompress_pixels(f.read())
+    height, width = pixels.shape[:2]
+    Image.frombytes(mode, (width, height), pixels.tobytes()).save(output_path)
+    return os.path.getsize(output_path)
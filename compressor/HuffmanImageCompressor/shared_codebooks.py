@@ -0,0 +1,88 @@
+# --- Pre-trained shared codebooks for small images ---
+import argparse
+import os
+
+import huff_container
+import huffman_codec
+from batch_compressor import get_image_files_from_directory
+
+# Each sample file contributes this many counts, so large files do not
+# drown out the thumbnails the codebook is meant for
+SAMPLE_WEIGHT = 1 << 16
+
+# Only files up to this size are sampled: the thumbnails and icons whose
+# own code tables are a large share of their output
+SMALL_FILE_MAX_BYTES = 20 * 1024
+
+
+def small_image_files(directory, max_file_size=SMALL_FILE_MAX_BYTES):
+    """
+    Image files in a directory of at most max_file_size bytes (all of them when None)
+    """
+    return [image_path for image_path in get_image_files_from_directory(directory)
+            if max_file_size is None or os.path.getsize(image_path) <= max_file_size]
+
+
+def train_codebook(directory, max_code_length=huffman_codec.MAX_CODE_LENGTH, backend=None,
+                   max_file_size=SMALL_FILE_MAX_BYTES):
+    """
+    Build a shared codebook from the byte statistics of the small images
+    in a directory (max_file_size bytes or less; None samples every image).
+    Every byte value gets a code, so any file can be encoded with it.
+
+    Returns:
+        HuffmanCodec for the shared codebook
+    """
+    image_paths = small_image_files(directory, max_file_size)
+    if not image_paths:
+        raise ValueError(f"No image files of at most {max_file_size} bytes found in {directory}")
+
+    frequencies = [1] * 256
+    for image_path in image_paths:
+        with open(image_path, 'rb') as f:
+            file_frequencies = huffman_codec.count_frequencies(f.read(), backend)
+        total = sum(file_frequencies)
+        if total:
+            for symbol, frequency in enumerate(file_frequencies):
+                frequencies[symbol] += frequency * SAMPLE_WEIGHT // total
+    return huffman_codec.HuffmanCodec.from_frequencies(frequencies, max_code_length)
+
+
+def save_codebook(codec, path):
+    """
+    Write a codebook as a versioned .hcb artifact
+
+    Returns:
+        The codebook ID stored in .huff headers that use it
+    """
+    with open(path, 'wb') as f:
+        f.write(huff_container.encode_codebook(codec.lengths))
+    return huff_container.codebook_id(codec.lengths)
+
+
+def load_codebook(path):
+    """
+    Read a .hcb artifact written by save_codebook
+
+    Returns:
+        HuffmanCodec for the shared codebook
+    """
+    with open(path, 'rb') as f:
+        codebook_id, lengths = huff_container.decode_codebook(f.read())
+    return huffman_codec.HuffmanCodec(lengths)
+
+
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train a shared Huffman codebook for small images")
+    parser.add_argument('directory', help="directory of sample images")
+    parser.add_argument('output', help="path of the .hcb codebook to write")
+    parser.add_argument('--max-file-size', type=int, default=SMALL_FILE_MAX_BYTES,
+                        help=f"only sample images up to this many bytes (default {SMALL_FILE_MAX_BYTES})")
+    args = parser.parse_args()
+
+    codec = train_codebook(args.directory, max_file_size=args.max_file_size)
+    codebook_id = save_codebook(codec, args.output)
+    sample_count = len(small_image_files(args.directory, args.max_file_size))
+    print(f"Trained on {sample_count} images of at most {args.max_file_size} bytes from {args.directory}")
+    print(f"Codebook {codebook_id:08x} saved to {args.output} ({os.path.getsize(args.output)} bytes)")
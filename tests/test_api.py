@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+"""
+Test the Flask API in Controller/AccessPoint.py with Flask's test client
+"""
+
+import email
+import io
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+# Make the Controller and Service packages importable
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from flask import request
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+from Controller import AccessPoint
+from Controller.AccessPoint import app
+from Service.job_queue import JobQueue
+from Service.merge_sort import merge_sort_by_cost
+from Service.result_cache import ResultCache
+from Service.scheduler import longest_first
+from Service.upload_executor import UploadExecutor
+from Service import profiler, uploads
+from Service.huffman_tools import huff_container
+
+# Keep test uploads out of the real history file
+AccessPoint.history_manager.use_mongodb = False
+AccessPoint.history_manager.json_file_path = os.path.join(tempfile.mkdtemp(), 'history.json')
+
+
+def sample_upload(size=300000, seed=17):
+    """Compressible bytes with a high-entropy stretch in the middle"""
+    rng = random.Random(seed)
+    noise = bytes(rng.getrandbits(8) for _ in range(size // 3))
+    return b"huffman over http " * (size // 54) + noise + b"\x00\x01\x02" * (size // 9)
+
+
+def jpeg_upload(colour, size=(64, 48)):
+    output = io.BytesIO()
+    Image.new('RGB', size, colour).save(output, 'JPEG')
+    return output.getvalue()
+
+
+def upload_files():
+    """Two valid images (the same name twice) and one that is not an image"""
+    return {'images': [(io.BytesIO(jpeg_upload('red')), 'photo.jpg'),
+                       (io.BytesIO(jpeg_upload('blue', (32, 32))), 'photo.jpg'),
+                       (io.BytesIO(b'not an image'), 'broken.jpg')]}
+
+
+def test_upload_images_json_mode_is_default():
+    """Without Accept or ?response the upload endpoint keeps its base64 JSON body"""
+    response = app.test_client().post('/upload-images/medium/5000000/original', data=upload_files())
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['total_files'] == 3
+    assert sum('compressed_data' in entry for entry in body['processed_files']) == 2
+    assert sum('error' in entry for entry in body['processed_files']) == 1
+
+
+def test_upload_executors_keep_response_order():
+    """Thread and process pools return the same results, in the same order, as serial compression"""
+    client = app.test_client()
+    default_executor = AccessPoint.upload_executor
+    responses = {}
+    try:
+        for kind in ('serial', 'thread', 'process'):
+            AccessPoint.upload_executor = UploadExecutor(kind, workers=2)
+            AccessPoint.history_manager.clear_history()
+            files = {'images': upload_files()['images'] + [(io.BytesIO(jpeg_upload((i * 40, 90, 30), (40 + i, 40))),
+                                                             f'extra{i}.jpg') for i in range(5)]}
+            body = client.post('/upload-images/low/5000000/original', data=files).get_json()
+            history = [record['filename'] for record in AccessPoint.history_manager.get_all_history()]
+            # Files run longest first, but history and responses keep upload order
+            assert history == [entry['filename'] for entry in body['processed_files'] if 'error' not in entry]
+            assert [entry['index'] for entry in body['processed_files']] == list(range(len(files['images'])))
+            # Error texts name the source object, which differs between executors
+            responses[kind] = [dict(entry, error='error' in entry) for entry in body['processed_files']]
+            AccessPoint.upload_executor.shutdown()
+    finally:
+        AccessPoint.upload_executor = default_executor
+    assert responses['thread'] == responses['serial']
+    assert responses['process'] == responses['serial']
+
+
+def test_uploads_are_scheduled_longest_first():
+    """Files start in order of estimated cost from their headers; the response keeps upload order"""
+    png = io.BytesIO()
+    Image.new('RGB', (120, 90), (20, 40, 60)).save(png, format='PNG')
+    uploads = [(io.BytesIO(jpeg_upload((200, 10, 10), (40, 40))), 'small.jpg'),
+               (io.BytesIO(b'not an image'), 'broken.jpg'),
+               (io.BytesIO(png.getvalue()), 'large.png'),
+               (io.BytesIO(jpeg_upload((10, 10, 200), (120, 90))), 'large.jpg')]
+    files = [FileStorage(stream, filename) for stream, filename in uploads]
+    assert longest_first(files) == [2, 3, 0, 1]
+    assert all(file.stream.tell() == 0 for file in files)
+    # Ties keep upload order
+    jobs = [{'index': index, 'cost': cost} for index, cost in enumerate([3, 1, 3, 2, 1])]
+    assert [job['index'] for job in merge_sort_by_cost(jobs)] == [0, 2, 3, 1, 4]
+
+    client = app.test_client()
+    for mode in ('json', 'zip'):
+        data = {'images': [(io.BytesIO(stream.getvalue()), filename) for stream, filename in uploads]}
+        response = client.post(f'/upload-images/low/5000000/original?response={mode}', data=data)
+        if mode == 'json':
+            entries = response.get_json()['processed_files']
+        else:
+            archive = zipfile.ZipFile(io.BytesIO(response.data))
+            # Streamed entries are written as files finish, so sort them back by index
+            entries = sorted(json.loads(archive.read('manifest.json'))['processed_files'],
+                             key=lambda entry: entry['index'])
+            assert sorted(archive.namelist()) == ['large (2).jpg', 'large.jpg', 'manifest.json', 'small.jpg']
+        assert [entry['filename'] for entry in entries] == [filename for _, filename in uploads]
+        assert [entry['index'] for entry in entries] == [0, 1, 2, 3]
+
+
+def test_streamed_uploads_do_not_wait_for_earlier_files():
+    """A streamed part is sent once its file is done, even while earlier uploads are still queued"""
+    # Upload 0 is the cheapest, so longest-first scheduling compresses it last
+    uploads = [(jpeg_upload((200, 10, 10), (20, 20)), 'small.jpg'),
+               (jpeg_upload((10, 200, 10), (160, 120)), 'large.jpg'),
+               (jpeg_upload((10, 10, 200), (80, 60)), 'medium.jpg')]
+    client = app.test_client()
+    default_executor = AccessPoint.upload_executor
+    AccessPoint.upload_executor = UploadExecutor('serial')
+    try:
+        AccessPoint.history_manager.clear_history()
+        data = {'images': [(io.BytesIO(content), filename) for content, filename in uploads]}
+        with client.post('/upload-images/low/5000000/original?response=multipart', data=data) as response:
+            chunks = iter(response.response)
+            first = next(chunks)
+            # Only the largest file has been compressed when its part goes out
+            assert [record['filename'] for record in AccessPoint.history_manager.get_all_history()] == ['large.jpg']
+            body = first + b''.join(chunks)
+    finally:
+        AccessPoint.upload_executor = default_executor
+    message = email.message_from_bytes(
+        f"Content-Type: {response.headers['Content-Type']}\r\n\r\n".encode() + body
+    )
+    indices = [json.loads(part['X-Metadata'])['index'] for part in message.get_payload()]
+    assert indices == [1, 2, 0]
+
+
+def test_metrics_endpoint_reports_stages_and_counters():
+    """/metrics exposes per-stage histograms, file and byte counters, errors and gauges"""
+    def samples():
+        with client.get('/metrics') as response:
+            text = response.get_data(as_text=True)
+        return dict(line.rsplit(' ', 1) for line in text.splitlines() if not line.startswith('#'))
+
+    client = app.test_client()
+    before = samples()
+    png = io.BytesIO()
+    Image.new('RGBA', (60, 40), (20, 40, 60, 128)).save(png, format='PNG')
+    data = {'images': [(io.BytesIO(png.getvalue()), 'alpha.png'), (io.BytesIO(b'not an image'), 'broken.jpg')]}
+    # Servers close each response once it is sent, which ends its in-flight time
+    with client.post('/upload-images/low/5000000/1:1', data=data) as response:
+        compressed = response.get_json()['processed_files'][0]
+    after = samples()
+    delta = lambda name: float(after.get(name, 0)) - float(before.get(name, 0))
+
+    for stage in ('decode', 'flatten', 'crop', 'encode', 'history', 'base64'):
+        assert delta(f'image_compressor_stage_seconds_count{{stage="{stage}"}}') == 1
+        assert float(after[f'image_compressor_stage_seconds_bucket{{stage="{stage}",le="+Inf"}}']) == \
+            float(after[f'image_compressor_stage_seconds_count{{stage="{stage}"}}'])
+    assert delta('image_compressor_files_total{result="compressed"}') == 1
+    assert delta('image_compressor_files_total{result="failed"}') == 1
+    assert delta('image_compressor_errors_total{stage="compress",type="UnidentifiedImageError"}') == 1
+    assert delta('image_compressor_bytes_in_total') == compressed['original_size']
+    assert delta('image_compressor_bytes_out_total') == compressed['compressed_size']
+    assert delta('http_requests_total{method="POST",endpoint="/upload-images/<quality>/<maxSize>/<resize>",status="200"}') == 1
+    upload_route = 'endpoint="/upload-images/<quality>/<maxSize>/<resize>"'
+    assert delta(f'http_request_duration_seconds_count{{{upload_route}}}') == 1
+    assert delta('http_requests_in_flight') == 0
+    assert after['image_compressor_upload_queue_depth'] == '0'
+    assert after['image_compressor_job_queue_depth'] == '0'
+    assert client.get('/metrics').content_type.startswith('text/plain; version=0.0.4')
+
+
+def test_profiling_is_guarded_by_a_token():
+    """Without PROFILER_TOKEN the endpoint is hidden and X-Profile is ignored; wrong tokens are refused"""
+    client = app.test_client()
+    data = lambda: {'images': [(io.BytesIO(jpeg_upload((90, 90, 90), (30, 30))), 'plain.jpg')]}
+    default_token = profiler.PROFILER_TOKEN
+    try:
+        profiler.PROFILER_TOKEN = ''
+        assert client.get('/debug/profile?seconds=0').status_code == 404
+        response = client.post('/upload-images/low/5000000/original', data=data(),
+                               headers={'X-Profile': 'text', 'X-Profile-Token': ''})
+        assert response.get_json()['total_files'] == 1
+
+        profiler.PROFILER_TOKEN = 'secret'
+        assert client.get('/debug/profile?seconds=0', headers={'X-Profile-Token': 'wrong'}).status_code == 403
+        for seconds in ('abc', 'nan', 'inf'):
+            response = client.get(f'/debug/profile?seconds={seconds}', headers={'X-Profile-Token': 'secret'})
+            assert response.status_code == 400
+        response = client.post('/upload-images/low/5000000/original', data=data(),
+                               headers={'X-Profile': 'text', 'X-Profile-Token': 'wrong'})
+        assert response.get_json()['total_files'] == 1
+    finally:
+        profiler.PROFILER_TOKEN = default_token
+
+
+def test_profiling_returns_collapsed_stacks_and_pstats():
+    """/debug/profile samples every thread; X-Profile profiles a single request"""
+    def busy_profiled_worker(stop):
+        while not stop.is_set():
+            sum(range(1000))
+
+    client = app.test_client()
+    headers = {'X-Profile-Token': 'secret'}
+    data = lambda: {'images': [(io.BytesIO(jpeg_upload((90, 30, 90), (300, 200))), 'profiled.jpg')]}
+    default_token = profiler.PROFILER_TOKEN
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_profiled_worker, args=(stop,), name='busy-worker')
+    try:
+        profiler.PROFILER_TOKEN = 'secret'
+        worker.start()
+        response = client.get('/debug/profile?seconds=0.2', headers=headers)
+        stop.set()
+        lines = response.get_data(as_text=True).splitlines()
+        assert int(response.headers['X-Profile-Samples']) > 0
+        assert all(re.fullmatch(r'.+ \d+', line) for line in lines)
+        assert any(line.startswith('busy-worker;') and 'busy_profiled_worker (test_api.py:' in line for line in lines)
+        assert client.get('/debug/profile?seconds=soon', headers=headers).status_code == 400
+
+        response = client.post('/upload-images/low/5000000/original', data=data(),
+                               headers=dict(headers, **{'X-Profile': 'collapsed'}))
+        assert response.headers['X-Profile-Original-Status'] == '200 OK'
+        assert all(re.fullmatch(r'.+ \d+', line) for line in response.get_data(as_text=True).splitlines())
+
+        response = client.post('/upload-images/low/5000000/original', data=data(),
+                               headers=dict(headers, **{'X-Profile': 'text'}))
+        assert 'add_compression_record' in response.get_data(as_text=True)
+
+        # pstats output is the marshal format written by cProfile, streamed ZIP generation included
+        response = client.post('/upload-images/low/5000000/original?response=zip', data=data(),
+                               headers=dict(headers, **{'X-Profile': 'pstats'}))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'upload.prof')
+            with open(path, 'wb') as f:
+                f.write(response.data)
+            functions = {name for _, _, name in pstats.Stats(path).stats}
+        assert {'zip_stream', 'add_compression_record'} <= functions
+    finally:
+        stop.set()
+        worker.join()
+        profiler.PROFILER_TOKEN = default_token
+
+
+def test_repeat_uploads_hit_the_result_cache():
+    """Re-uploading the same image with the same settings is served from the cache"""
+    client = app.test_client()
+    before = client.get('/cache/stats').get_json()
+    image = jpeg_upload((10, 200, 30), (50, 30))
+    first = client.post('/upload-images/high/5000000/1:1', data={'images': [(io.BytesIO(image), 'a.jpg')]}).get_json()
+    second = client.post('/upload-images/high/5000000/1:1', data={'images': [(io.BytesIO(image), 'b.jpg')]}).get_json()
+    client.post('/upload-images/low/5000000/1:1', data={'images': [(io.BytesIO(image), 'c.jpg')]})
+    after = client.get('/cache/stats').get_json()
+    assert second['processed_files'][0]['compressed_data'] == first['processed_files'][0]['compressed_data']
+    assert second['processed_files'][0]['filename'] == 'b.jpg'
+    assert after['memory_hits'] - before['memory_hits'] == 1
+    assert after['misses'] - before['misses'] == 2
+
+
+def test_result_cache_tiers_and_eviction():
+    """The memory tier evicts least recently used entries past its cap; the disk tier is shared"""
+    key = lambda name: ResultCache.make_key(name.encode(), 'high', 'original', None, 'JPEG')
+    assert key('a') != ResultCache.make_key(b'a', 'low', 'original', None, 'JPEG')
+    cache = ResultCache(memory_bytes=250, disk_dir=None)
+    for name in 'abc':
+        cache.put(key(name), name.encode() * 100, {'name': name})
+    assert cache.get(key('a')) is None
+    assert cache.get(key('c')) == (b'c' * 100, {'name': 'c'})
+    stats = cache.stats()
+    assert stats['memory_evictions'] == 1 and stats['memory_entries'] == 2 and stats['memory_bytes'] == 200
+    assert stats['memory_hits'] == 1 and stats['misses'] == 1
+
+    with tempfile.TemporaryDirectory() as disk_dir:
+        writer = ResultCache(memory_bytes=0, disk_dir=disk_dir, disk_bytes=7000)
+        for age, name in enumerate('abc', 1):
+            writer.put(key(name), name.encode() * 3000, {'name': name})
+            # Quick writes can share an mtime, so age the entries explicitly
+            os.utime(writer._disk_path(key(name)), (age, age))
+        reader = ResultCache(memory_bytes=1 << 20, disk_dir=disk_dir, disk_bytes=7000)
+        assert reader.get(key('a')) is None
+        assert reader.get(key('c')) == (b'c' * 3000, {'name': 'c'})
+        assert reader.get(key('c')) is not None
+        assert writer.stats()['disk_evictions'] == 1
+        assert reader.stats()['disk_hits'] == 1 and reader.stats()['memory_hits'] == 1
+
+
+def test_uploads_are_spooled_and_sized_without_reading():
+    """Uploads past UPLOAD_SPOOL_BYTES go to temp files; sizes come from seek/tell"""
+    small, large = b'x' * 100, b'y' * (uploads.UPLOAD_SPOOL_BYTES + 1)
+    data = {'images': [(io.BytesIO(small), 'small.bin'), (io.BytesIO(large), 'large.bin')]}
+    with app.test_request_context('/', method='POST', data=data):
+        small_file, large_file = request.files.getlist('images')
+        assert not small_file.stream._rolled and large_file.stream._rolled
+        large_file.stream.seek(10)
+        assert [uploads.stream_size(small_file.stream), uploads.stream_size(large_file.stream)] == [len(small), len(large)]
+        assert large_file.stream.tell() == 10
+
+
+def test_upload_images_streams_zip():
+    """?response=zip streams one entry per compressed file plus a manifest"""
+    response = app.test_client().post('/upload-images/medium/5000000/original?response=zip', data=upload_files())
+    assert response.status_code == 200 and response.is_streamed
+    assert response.mimetype == 'application/zip'
+    archive = zipfile.ZipFile(io.BytesIO(response.get_data()))
+    manifest = json.loads(archive.read('manifest.json'))
+    assert manifest['total_files'] == 3
+    compressed = [entry for entry in manifest['processed_files'] if 'archive_name' in entry]
+    assert sorted(entry['archive_name'] for entry in compressed) == ['photo (2).jpg', 'photo.jpg']
+    for entry in compressed:
+        assert len(archive.read(entry['archive_name'])) == entry['compressed_size']
+    assert sum('error' in entry for entry in manifest['processed_files']) == 1
+
+
+def test_upload_images_streams_multipart():
+    """Accept: multipart/mixed streams one part per file with its metadata in a header"""
+    response = app.test_client().post('/upload-images/medium/5000000/original', data=upload_files(),
+                                      headers={'Accept': 'multipart/mixed'})
+    assert response.status_code == 200 and response.is_streamed
+    message = email.message_from_bytes(
+        f"Content-Type: {response.headers['Content-Type']}\r\n\r\n".encode() + response.get_data()
+    )
+    parts = message.get_payload()
+    assert sorted(part.get_content_type() for part in parts) == ['application/json', 'image/jpeg', 'image/jpeg']
+    for part in parts:
+        metadata = json.loads(part['X-Metadata'])
+        if part.get_content_type() == 'image/jpeg':
+            assert len(part.get_payload(decode=True)) == metadata['compressed_size']
+        else:
+            assert 'error' in json.loads(part.get_payload()) and 'error' in metadata
+
+
+def wait_for_job(client, status_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(status_url).get_json()
+        if job['status'] == 'completed':
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {status_url} did not finish in {timeout} s")
+
+
+def test_job_queue_processes_batches_in_background():
+    """POST /jobs returns a job ID at once; the job reports per-file results and serves outputs"""
+    client = app.test_client()
+    response = client.post('/jobs/medium/5000000/original', data=upload_files())
+    assert response.status_code == 202
+    submitted = response.get_json()
+    assert submitted['total_files'] == 3 and submitted['status'] in ('queued', 'running', 'completed')
+
+    job = wait_for_job(client, submitted['status_url'])
+    assert job['completed_files'] == 3 and job['failed_files'] == 1 and job['progress'] == 1.0
+    assert [result['filename'] for result in job['results']] == ['photo.jpg', 'photo.jpg', 'broken.jpg']
+    for result in job['results'][:2]:
+        output = client.get(result['output_url'])
+        assert output.status_code == 200 and output.mimetype == 'image/jpeg'
+        assert len(output.get_data()) == result['compressed_size']
+    assert 'output_url' not in job['results'][2]
+    assert client.get(f"/jobs/{job['job_id']}/files/2").status_code == 404
+    assert client.get('/jobs/does-not-exist').status_code == 404
+
+
+def test_job_queue_removes_expired_jobs():
+    """Finished jobs and their files disappear once the TTL has passed"""
+    queue = JobQueue(lambda path, filename, options: ({'filename': filename}, b'output'), workers=2, ttl_seconds=60)
+    job_id = queue.submit([], {})['job_id']
+    assert queue.status(job_id)['status'] == 'completed'
+    job_dir = os.path.join(queue.work_dir, job_id)
+    assert os.path.isdir(job_dir)
+    assert queue.cleanup_expired(now=time.time() + 30) == 0
+    assert queue.cleanup_expired(now=time.time() + 61) == 1
+    assert queue.status(job_id) is None and not os.path.exists(job_dir)
+
+
+def test_job_queue_records_files_whose_output_handling_fails():
+    """Errors after process_file, writing the output or removing the input, still finish the job"""
+    def process_file(input_path, filename, options):
+        if filename == 'gone.jpg':
+            os.remove(input_path)
+            return {'filename': filename}, b'output'
+        # Not bytes, so writing the output fails
+        return {'filename': filename}, 'output'
+
+    queue = JobQueue(process_file, workers=2, ttl_seconds=60)
+    uploads = [FileStorage(io.BytesIO(b'input'), filename) for filename in ('gone.jpg', 'unwritable.jpg')]
+    job_id = queue.submit(uploads, {})['job_id']
+    deadline = time.time() + 30
+    while queue.status(job_id)['status'] != 'completed':
+        assert time.time() < deadline, 'Job did not finish'
+        time.sleep(0.05)
+    status = queue.status(job_id)
+    assert status['completed_files'] == 2 and status['failed_files'] == 1
+    assert queue.output(job_id, 0) is not None and queue.output(job_id, 1) is None
+    assert 'error' in status['results'][1]
+    assert queue.cleanup_expired(now=time.time() + 61) == 1
+
+
+def test_compress_huffman_streams_container():
+    """/compress-huffman streams a .huff container and reports stats in headers"""
+    client = app.test_client()
+    data = sample_upload()
+    response = client.post('/compress-huffman', data={'images': (io.BytesIO(data), 'sample.bmp')})
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.headers['Content-Disposition'] == 'attachment; filename="sample.huff"'
+    container = response.get_data()
+    assert int(response.headers['X-Original-Size']) == len(data)
+    assert int(response.headers['X-Compressed-Size']) == len(container)
+    assert len(container) < len(data)
+
+    response = client.post('/decompress-huffman', data={'image': (io.BytesIO(container), 'sample.huff')})
+    assert response.status_code == 200
+    assert response.get_data() == data
+    assert int(response.headers['X-Original-Size']) == len(data)
+
+
+def test_huffman_endpoints_reject_bad_uploads():
+    """Missing files and corrupt containers get JSON errors"""
+    client = app.test_client()
+    assert client.post('/compress-huffman').status_code == 400
+    # Several files are refused instead of compressing only the first
+    for endpoint in ('/compress-huffman', '/decompress-huffman'):
+        data = {'images': [(io.BytesIO(sample_upload()), 'one.bmp'), (io.BytesIO(sample_upload()), 'two.bmp')]}
+        response = client.post(endpoint, data=data)
+        assert response.status_code == 400
+        assert 'received 2' in response.get_json()['error']
+    response = client.post('/decompress-huffman', data={'image': (io.BytesIO(b'not a container'), 'bad.huff')})
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+    # A few forged header bytes must not make the server decode megabytes of padding
+    lengths = [8] * 256
+    forged = huff_container.encode_header(20000000, 8, lengths) + b'\x00'
+    response = client.post('/decompress-huffman', data={'image': (io.BytesIO(forged), 'forged.huff')})
+    assert response.status_code == 400
+    assert 'cannot be coded' in response.get_json()['error']
+
+    # Valid containers that restore to more than the output cap are refused
+    data = sample_upload()
+    single_block = bytes(huff_container.encode_header(len(data), 8 * len(data), lengths)) + data
+    block_stream = client.post('/compress-huffman', data={'image': (io.BytesIO(data), 'sample.bmp')}).get_data()
+    default_limit = AccessPoint.huffman_compressor.MAX_OUTPUT_SIZE
+    try:
+        AccessPoint.huffman_compressor.MAX_OUTPUT_SIZE = len(data) - 1
+        for container in (single_block, block_stream):
+            response = client.post('/decompress-huffman', data={'image': (io.BytesIO(container), 'big.huff')})
+            assert response.status_code == 413
+    finally:
+        AccessPoint.huffman_compressor.MAX_OUTPUT_SIZE = default_limit
+    response = client.post('/decompress-huffman', data={'image': (io.BytesIO(single_block), 'big.huff')})
+    assert response.get_data() == data
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    passed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test_func.__name__}: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+
+if __name__ == "__main__":
+    main()
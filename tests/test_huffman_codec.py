@@ -0,0 +1,639 @@
+#!/usr/bin/env python3
+"""
+Test the byte-native Huffman codec in compressor/HuffmanImageCompressor
+"""
+
+import io
+import os
+import pickle
+import random
+import struct
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Make the flat compressor modules importable
+compressor_dir = Path(__file__).resolve().parent.parent / "compressor" / "HuffmanImageCompressor"
+sys.path.insert(0, str(compressor_dir))
+
+import batch_compressor
+import benchmark
+import benchmark_suite
+import context_coding
+import huff_container
+import huffman_codec
+import huffman_coding
+import image_compressor
+import numpy_backend
+import predictive_filters
+import shared_codebooks
+
+
+def sample_bytes(size=4000, seed=7):
+    """Skewed byte distribution with a few random bytes mixed in"""
+    rng = random.Random(seed)
+    return bytes(rng.choice(b'aaaaaabbbcd\x00\xff') for _ in range(size)) + bytes(rng.randrange(256) for _ in range(200))
+
+
+def legacy_compressed_bits(data):
+    """Run the original bit-string pipeline without touching the output directory"""
+    bit_string = ''.join(format(byte, '08b') for byte in data)
+    return benchmark.reference_bit_string_compress(bit_string)[0]
+
+
+def test_frequencies_match_byte_counts():
+    """Frequencies are indexed by integer byte value"""
+    data = sample_bytes()
+    frequencies = huffman_codec.count_frequencies(memoryview(data))
+    assert sum(frequencies) == len(data)
+    assert frequencies[ord('a')] == data.count(b'a')
+
+
+def test_compressed_size_matches_legacy():
+    """Byte-native codes are optimal, so the bit count equals the old pipeline's"""
+    data = sample_bytes()
+    packed, bit_length, codes, lengths = huffman_codec.compress_bytes(data)
+    assert bit_length == len(legacy_compressed_bits(data))
+    assert len(packed) == (bit_length + 7) // 8
+
+
+def test_single_symbol_and_empty_input():
+    """A one-symbol input still gets a 1-bit code; empty input compresses to nothing"""
+    packed, bit_length, codes, lengths = huffman_codec.compress_bytes(b'zzzz')
+    assert bit_length == 4
+    assert huffman_codec.compress_bytes(b'')[:2] == (bytearray(), 0)
+
+
+def test_table_decoder_round_trip():
+    """Decode tables resolve every symbol, including codes longer than the root table"""
+    data = sample_bytes()
+    packed, bit_length, codes, lengths = huffman_codec.compress_bytes(data)
+    for root_bits in (2, 4, huffman_codec.DECODE_ROOT_BITS):
+        tables = huffman_codec.build_decode_table(codes, lengths, root_bits)
+        assert huffman_codec.decode(packed, len(data), tables) == data
+
+
+def test_table_decoder_long_codes():
+    """Fibonacci-like frequencies produce codes far longer than the root table"""
+    frequencies = [1, 1]
+    while len(frequencies) < 24:
+        frequencies.append(frequencies[-1] + frequencies[-2])
+    data = b''.join(bytes([symbol]) * frequency for symbol, frequency in enumerate(frequencies))
+    packed, bit_length, codes, lengths = huffman_codec.compress_bytes(data)
+    assert max(lengths) > huffman_codec.DECODE_ROOT_BITS
+    assert huffman_codec.decompress_bytes(packed, len(data), lengths) == data
+
+
+
+def test_multi_symbol_decoder_matches_single_symbol():
+    """Multi-symbol windows, long-code fallbacks and the unaligned tail all decode exactly"""
+    frequencies = [1, 1]
+    while len(frequencies) < 24:
+        frequencies.append(frequencies[-1] + frequencies[-2])
+    rng = random.Random(5)
+    long_codes = bytes(rng.choices(range(24), weights=frequencies, k=5000))
+    for data in (sample_bytes(), long_codes, b'\x00' * 40, b'ab'):
+        codec = huffman_codec.HuffmanCodec.from_data(data)
+        packed, bit_length = codec.encode(data)
+        for window_bits in (12, 13, 16):
+            multi_table = huffman_codec.build_multi_symbol_table(codec.codes, codec.lengths, window_bits)
+            assert huffman_codec.decode_multi_symbol(packed, len(data), codec.decode_tables, multi_table) == data
+        assert codec.decode(packed, len(data), multi_symbol=True) == data
+        assert codec.decode(packed, len(data), multi_symbol=False) == data
+    assert huffman_codec.prefers_multi_symbol(huffman_codec.HuffmanCodec.from_data(long_codes).lengths)
+    assert not huffman_codec.prefers_multi_symbol([8] * 256)
+
+def test_code_lengths_respect_limit():
+    """Skewed inputs that need long codes are clamped to max_code_length and stay decodable"""
+    frequencies = [0] * 256
+    value = 1
+    for symbol in range(40):
+        frequencies[symbol] = value
+        value = value * 3 // 2 + 1
+    for max_code_length in (8, 12, huffman_codec.MAX_CODE_LENGTH):
+        lengths = huffman_codec.build_code_lengths(frequencies, max_code_length)
+        assert max(lengths) == max_code_length
+        assert sum(2 ** -length for length in lengths if length) == 1.0
+
+
+def test_canonical_codes_are_ordered():
+    """Canonical codes are consecutive within a length and sorted by byte value"""
+    lengths = [0] * 256
+    lengths[ord('a')], lengths[ord('b')], lengths[ord('c')], lengths[ord('d')] = 1, 2, 3, 3
+    codes = huffman_codec.assign_canonical_codes(lengths)
+    assert [codes[ord(symbol)] for symbol in 'abcd'] == [0b0, 0b10, 0b110, 0b111]
+
+
+def test_container_round_trip():
+    """A .huff container decodes from its own bytes, for dense, sparse and empty tables"""
+    dense_input = bytes(range(256)) * 20
+    for data in (sample_bytes(), dense_input, b'', b'q'):
+        container = huffman_codec.compress(data)
+        assert container[:4] == huff_container.MAGIC
+        assert huffman_codec.decompress(container) == data
+
+
+def test_container_files_round_trip():
+    """compress_file writes a single file that decompress_file restores byte for byte"""
+    data = sample_bytes()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_path = os.path.join(temp_dir, 'image.bmp')
+        huff_path = os.path.join(temp_dir, 'image.huff')
+        restored_path = os.path.join(temp_dir, 'restored.bmp')
+        with open(input_path, 'wb') as f:
+            f.write(data)
+        original_bits, compressed_bits = huffman_codec.compress_file(input_path, huff_path)
+        assert compressed_bits == os.path.getsize(huff_path) * 8
+        huffman_codec.decompress_file(huff_path, restored_path)
+        with open(restored_path, 'rb') as f:
+            assert f.read() == data
+
+
+def test_container_header_fields():
+    """The header records original length and the valid bits of the last byte"""
+    data = sample_bytes()
+    packed, bit_length, codes, lengths = huffman_codec.compress_bytes(data)
+    header = huff_container.decode_header(huffman_codec.compress(data))
+    assert header['original_length'] == len(data)
+    assert header['lengths'] == lengths
+    assert huff_container.payload_bit_length(len(packed), header['valid_bits']) == bit_length
+
+
+def test_container_rejects_bad_magic():
+    """Files that are not .huff containers raise ValueError"""
+    try:
+        huffman_codec.decompress(b'NOPE' + bytes(40))
+    except ValueError:
+        return
+    raise AssertionError("bad magic number was accepted")
+
+
+def rejects(call):
+    """True if call() raises ValueError"""
+    try:
+        call()
+    except ValueError:
+        return True
+    return False
+
+
+def test_corrupt_payloads_are_rejected():
+    """Truncated or padded payloads and forged lengths raise ValueError instead of decoding padding"""
+    data = sample_bytes(200000)
+    container = huffman_codec.compress(data)
+    header = huff_container.decode_header(container)
+    payload_size = len(container) - header['payload_offset']
+    assert rejects(lambda: huffman_codec.decompress(container[:header['payload_offset'] + payload_size // 2]))
+    assert rejects(lambda: huffman_codec.decompress(container + b'\x00'))
+    # A forged length is refused before its output is allocated
+    forged = bytearray(container)
+    struct.pack_into('>Q', forged, 6, 1 << 40)
+    assert rejects(lambda: huffman_codec.decompress(forged))
+    assert huffman_codec.decompress(container) == data
+    # Lengths that oversubscribe the code space are refused when the table is read
+    oversubscribed = [1] * 200 + [15] * 56
+    assert rejects(lambda: huffman_codec.decompress(
+        huff_container.encode_header(len(data), payload_size * 8, oversubscribed) + container[header['payload_offset']:]))
+    assert rejects(lambda: huff_container.decode_codebook(huff_container.encode_codebook(oversubscribed)))
+    assert rejects(lambda: huffman_codec.HuffmanCodec(oversubscribed))
+
+    rng = random.Random(12)
+    follow = {symbol: rng.sample(range(256), 3) for symbol in range(256)}
+    chained = bytearray([0])
+    for _ in range(20000):
+        chained.append(rng.choice(follow[chained[-1]]))
+    for source, block_type in ((data, huff_container.BLOCK_HUFFMAN), (bytes(chained), huff_container.BLOCK_CONTEXT)):
+        stream = io.BytesIO(huffman_codec.compress(source, block_size=8192, context_model=True))
+        huff_container.read_stream_header(stream)
+        block = huff_container.read_block_header(stream)
+        payload = stream.read(block['payload_length'])
+        assert block['block_type'] == block_type
+        assert huffman_codec.decode_block(payload, block) == source[:block['raw_length']]
+        assert rejects(lambda: huffman_codec.decode_block(payload, dict(block, raw_length=block['raw_length'] + 1)))
+        assert rejects(lambda: huffman_codec.decode_block(payload, dict(block, raw_length=1 << 31)))
+        half = block['payload_length'] // 2
+        assert rejects(lambda: huffman_codec.decode_block(payload[:half], dict(block, payload_length=half)))
+        assert rejects(lambda: huffman_codec.decode_block(payload[:half], block))
+    forged = huff_container.encode_context_block_header(8, 8, [0] * 256, [oversubscribed])
+    assert rejects(lambda: huff_container.read_block_header(io.BytesIO(forged)))
+
+
+def test_codec_is_reentrant_across_threads():
+    """Independent codecs in parallel threads, and one shared codec, give correct round trips"""
+    inputs = [sample_bytes(size=1500, seed=seed) for seed in range(8)]
+
+    def round_trip(data):
+        codec = huffman_codec.HuffmanCodec.from_data(data)
+        packed, bit_length = codec.encode(data)
+        return codec.decode(packed, len(data))
+
+    shared = huffman_codec.HuffmanCodec.from_frequencies([1] * 256)
+
+    def shared_round_trip(data):
+        packed, bit_length = shared.encode(data)
+        return shared.decode(packed, len(data))
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert list(executor.map(round_trip, inputs)) == inputs
+        assert list(executor.map(shared_round_trip, inputs)) == inputs
+
+
+def test_codec_pickles_for_process_pools():
+    """A pickled codec keeps its codebook and rebuilds decode tables on demand"""
+    data = sample_bytes()
+    codec = huffman_codec.HuffmanCodec.from_data(data)
+    packed, bit_length = codec.encode(data)
+    restored = pickle.loads(pickle.dumps(codec))
+    assert restored.lengths == codec.lengths
+    assert restored.decode(packed, len(data)) == data
+
+
+def test_legacy_wrappers_do_not_leak_codes():
+    """huffman_coding.compress replaces the module codebook instead of extending it"""
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.chdir(temp_dir)
+        try:
+            os.makedirs(os.path.join("IO", "Outputs"))
+            first = ''.join(format(byte, '08b') for byte in sample_bytes())
+            huffman_coding.compress(first)
+            second = ''.join(format(byte, '08b') for byte in b'abab')
+            compressed = huffman_coding.compress(second)
+            assert set(huffman_coding.huffman_codes) == {format(ord('a'), '08b'), format(ord('b'), '08b')}
+            assert huffman_coding.decompress(compressed) == second
+        finally:
+            os.chdir(previous_dir)
+
+
+def test_numpy_backend_matches_python():
+    """The NumPy encode path produces the same histogram and bytes as the pure-Python path"""
+    if not numpy_backend.AVAILABLE:
+        return
+    data = sample_bytes()
+    assert huffman_codec.count_frequencies(data, 'numpy') == huffman_codec.count_frequencies(data, 'python')
+    codec = huffman_codec.HuffmanCodec.from_data(data)
+    expected = codec.encode(data, 'python')
+    for chunk_size in (7, 1000, numpy_backend.ENCODE_CHUNK_SIZE):
+        assert numpy_backend.encode(data, codec.codes, codec.lengths, chunk_size) == expected
+
+
+def test_stream_round_trip():
+    """Block streams decode block by block and through the in-memory decompress()"""
+    data = sample_bytes(size=20000)
+    for block_size in (97, 1000, 64 * 1024):
+        compressed = io.BytesIO()
+        original_bytes, written = huffman_codec.compress_stream(io.BytesIO(data), compressed, block_size)
+        assert (original_bytes, written) == (len(data), len(compressed.getvalue()))
+        restored = io.BytesIO()
+        huffman_codec.decompress_stream(io.BytesIO(compressed.getvalue()), restored)
+        assert restored.getvalue() == data
+        assert huffman_codec.decompress(compressed.getvalue()) == data
+
+
+def test_large_files_use_block_stream():
+    """compress_file switches to the block stream above block_size and decompress_file detects it"""
+    data = sample_bytes(size=30000)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_path = os.path.join(temp_dir, 'scan.tiff')
+        huff_path = os.path.join(temp_dir, 'scan.huff')
+        restored_path = os.path.join(temp_dir, 'restored.tiff')
+        with open(input_path, 'wb') as f:
+            f.write(data)
+        huffman_codec.compress_file(input_path, huff_path, block_size=4096)
+        with open(huff_path, 'rb') as f:
+            assert huff_container.peek_version(f.read(5)) == huff_container.STREAM_VERSION
+        assert huffman_codec.decompress_file(huff_path, restored_path) == len(data)
+        with open(restored_path, 'rb') as f:
+            assert f.read() == data
+
+
+def test_parallel_blocks_round_trip():
+    """Blocks coded in a process pool match the serial output and record their offsets in the index"""
+    data = sample_bytes(size=30000)
+    serial = io.BytesIO()
+    huffman_codec.compress_stream(io.BytesIO(data), serial, block_size=4096)
+    parallel = huffman_codec.compress(data, workers=2, block_size=4096)
+    assert parallel == serial.getvalue()
+    assert huffman_codec.decompress(parallel, workers=2) == data
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_path = os.path.join(temp_dir, 'scan.raw')
+        huff_path = os.path.join(temp_dir, 'scan.huff')
+        restored_path = os.path.join(temp_dir, 'restored.raw')
+        with open(input_path, 'wb') as f:
+            f.write(data)
+        huffman_codec.compress_file(input_path, huff_path, block_size=4096, workers=2)
+        with open(huff_path, 'rb') as f:
+            assert f.read() == serial.getvalue()
+            index = huff_container.read_index(f)
+        assert index['total_length'] == len(data)
+        assert [raw_offset for raw_offset, _ in index['entries']] == list(range(0, len(data), 4096))
+        assert huffman_codec.decompress_file(huff_path, restored_path, workers=2) == len(data)
+        with open(restored_path, 'rb') as f:
+            assert f.read() == data
+
+
+def test_batch_pool_matches_serial_totals():
+    """A process-pool batch reports the same per-file results in input order and skips failures"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_paths = []
+        for number in range(4):
+            path = os.path.join(temp_dir, f'image{number}.png')
+            with open(path, 'wb') as f:
+                f.write(sample_bytes(size=2000 + 1000 * number, seed=number))
+            input_paths.append(path)
+        input_paths.insert(2, os.path.join(temp_dir, 'missing.png'))
+
+        serial = batch_compressor.batch_compress_images(input_paths, os.path.join(temp_dir, 'serial'))
+        pooled = batch_compressor.batch_compress_images(input_paths, os.path.join(temp_dir, 'pooled'), workers=2)
+        assert [result['filename'] for result in pooled] == ['image0.png', 'image1.png', 'image2.png', 'image3.png']
+        for serial_result, pooled_result in zip(serial, pooled):
+            assert serial_result['original_size'] == pooled_result['original_size']
+            assert serial_result['compressed_size'] == pooled_result['compressed_size']
+
+
+_compress_single_image = batch_compressor.compress_single_image
+
+
+def compress_or_crash(image_path, *args):
+    """compress_single_image, except that the worker process dies on files named crash*"""
+    if os.path.basename(image_path).startswith('crash'):
+        os._exit(1)
+    return _compress_single_image(image_path, *args)
+
+
+def test_batch_pool_survives_a_crashing_worker():
+    """A worker that dies fails only its own file; the files in flight with it are retried"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_paths = []
+        for name in ('a', 'b', 'crash', 'c', 'd', 'e', 'f', 'g'):
+            path = os.path.join(temp_dir, f'{name}.png')
+            with open(path, 'wb') as f:
+                f.write(sample_bytes(size=3000, seed=len(input_paths)))
+            input_paths.append(path)
+
+        # Pool workers fork after the patch, so they resolve the crashing version
+        batch_compressor.compress_single_image = compress_or_crash
+        try:
+            results = batch_compressor.batch_compress_images(input_paths, os.path.join(temp_dir, 'out'), workers=2)
+        finally:
+            batch_compressor.compress_single_image = _compress_single_image
+        assert [result['filename'] for result in results] == ['a.png', 'b.png', 'c.png', 'd.png', 'e.png', 'f.png', 'g.png']
+
+
+def test_predictive_filters_round_trip():
+    """Every filter type inverts exactly, and pixel containers restore the image through decompress_file"""
+    if not predictive_filters.AVAILABLE:
+        return
+    np = predictive_filters.np
+    rng = np.random.default_rng(3)
+    for shape in ((1, 1, 1), (1, 9, 3), (9, 1, 2), (37, 23, 4)):
+        pixels = rng.integers(0, 256, shape, dtype=np.uint8)
+        filter_types, residuals = predictive_filters.filter_pixels(pixels, chunk_rows=5)
+        assert (predictive_filters.unfilter_pixels(filter_types, residuals) == pixels).all()
+        # Force each filter type on every row and invert it
+        x = pixels.astype(np.int16)
+        b = np.zeros_like(x)
+        b[1:] = x[:-1]
+        a = np.zeros_like(x)
+        a[:, 1:] = x[:, :-1]
+        c = np.zeros_like(x)
+        c[:, 1:] = b[:, :-1]
+        for filter_type in range(5):
+            forced = np.full(shape[0], filter_type, dtype=np.uint8)
+            forced_residuals = ((x - predictive_filters._predict(forced[:, None, None], a, b, c)) & 0xFF).astype(np.uint8)
+            assert (predictive_filters.unfilter_pixels(forced, forced_residuals) == pixels).all()
+
+    rows, columns = np.mgrid[0:60, 0:80]
+    gradient = np.stack([rows * 3, columns * 2, rows + columns], axis=2).astype(np.uint8)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_path = os.path.join(temp_dir, 'scan.bmp')
+        huff_path = os.path.join(temp_dir, 'scan.huff')
+        restored_path = os.path.join(temp_dir, 'restored.png')
+        predictive_filters.Image.frombytes('RGB', (80, 60), gradient.tobytes()).save(input_path)
+        original_bits, compressed_bits = predictive_filters.compress_image_file(input_path, huff_path)
+        assert compressed_bits * 4 < original_bits
+        assert huffman_codec.decompress_file(huff_path, restored_path) == os.path.getsize(restored_path)
+        with predictive_filters.Image.open(restored_path) as restored:
+            assert restored.mode == 'RGB'
+            assert (np.asarray(restored) == gradient).all()
+
+
+def test_predictive_filters_tall_narrow_images():
+    """Unfiltering works in bounded bands, so tall narrow images restore without huge skewed buffers"""
+    if not predictive_filters.AVAILABLE:
+        return
+    np = predictive_filters.np
+    rng = np.random.default_rng(4)
+    # Mixed filter types across several bands, Average/Paeth-only and None/Sub/Up-only bands
+    default_cells = predictive_filters.UNFILTER_BAND_CELLS
+    try:
+        predictive_filters.UNFILTER_BAND_CELLS = 64
+        for types in (rng.integers(0, 5, 90), rng.integers(3, 5, 90), rng.integers(0, 3, 90)):
+            pixels = rng.integers(0, 256, (90, 5, 2), dtype=np.uint8)
+            x = pixels.astype(np.int16)
+            b = np.zeros_like(x)
+            b[1:] = x[:-1]
+            a = np.zeros_like(x)
+            a[:, 1:] = x[:, :-1]
+            c = np.zeros_like(x)
+            c[:, 1:] = b[:, :-1]
+            forced = types.astype(np.uint8)
+            residuals = ((x - predictive_filters._predict(forced[:, None, None], a, b, c)) & 0xFF).astype(np.uint8)
+            assert (predictive_filters.unfilter_pixels(forced, residuals) == pixels).all()
+    finally:
+        predictive_filters.UNFILTER_BAND_CELLS = default_cells
+
+    # A 1x60000 column used to need a 6.7 GiB skewed buffer to decompress
+    column = (np.arange(60000) * 7 % 251).astype(np.uint8).reshape(60000, 1)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_path = os.path.join(temp_dir, 'column.png')
+        huff_path = os.path.join(temp_dir, 'column.huff')
+        restored_path = os.path.join(temp_dir, 'restored.png')
+        predictive_filters.Image.fromarray(column, 'L').save(input_path)
+        predictive_filters.compress_image_file(input_path, huff_path)
+        huffman_codec.decompress_file(huff_path, restored_path)
+        with predictive_filters.Image.open(restored_path) as restored:
+            assert restored.size == (1, 60000)
+            assert (np.asarray(restored) == column).all()
+
+
+def test_context_model_round_trip():
+    """Order-1 blocks are chosen when they are smaller and decode exactly with either encode backend"""
+    rng = random.Random(11)
+    # Each byte strongly predicts the next one
+    follow = {symbol: rng.sample(range(256), 3) for symbol in range(256)}
+    data = bytearray([0])
+    for _ in range(30000):
+        data.append(rng.choice(follow[data[-1]]))
+    data = bytes(data)
+
+    order0 = huffman_codec.compress(data, block_size=8192)
+    for backend in huffman_codec.BACKENDS:
+        order1 = huffman_codec.compress(data, backend=backend, block_size=8192, context_model=True)
+        assert len(order1) < len(order0)
+        assert huffman_codec.decompress(order1) == data
+        assert huffman_codec.decompress(order1, workers=2) == data
+        stream = io.BytesIO(order1)
+        huff_container.read_stream_header(stream)
+        block = huff_container.read_block_header(stream)
+        assert block['block_type'] == huff_container.BLOCK_CONTEXT
+        assert len(block['cluster_lengths']) <= context_coding.MAX_CLUSTERS
+
+    # Data without context structure stays order-0
+    flat = huffman_codec.compress(sample_bytes(), context_model=True)
+    stream = io.BytesIO(flat)
+    huff_container.read_stream_header(stream)
+    assert huff_container.read_block_header(stream)['block_type'] == huff_container.BLOCK_HUFFMAN
+    assert huffman_codec.decompress(flat) == sample_bytes()
+    if numpy_backend.AVAILABLE:
+        assert context_coding.count_pair_frequencies(data, 'numpy') == context_coding.count_pair_frequencies(data, 'python')
+
+
+def test_shared_codebook_round_trip():
+    """Small files use a trained codebook by ID when it wins and fall back to their own table otherwise"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for number in range(5):
+            with open(os.path.join(temp_dir, f'icon{number}.png'), 'wb') as f:
+                f.write(sample_bytes(size=3000, seed=number))
+        # Files above the small-file limit are left out of training
+        with open(os.path.join(temp_dir, 'photo.png'), 'wb') as f:
+            f.write(bytes(range(256)) * 100)
+        small_paths = shared_codebooks.small_image_files(temp_dir)
+        assert sorted(os.path.basename(path) for path in small_paths) == [f'icon{number}.png' for number in range(5)]
+        codec = shared_codebooks.train_codebook(temp_dir)
+        assert all(codec.lengths)
+        assert codec.lengths != shared_codebooks.train_codebook(temp_dir, max_file_size=None).lengths
+        codebook_path = os.path.join(temp_dir, 'icons.hcb')
+        codebook_id = shared_codebooks.save_codebook(codec, codebook_path)
+        loaded = shared_codebooks.load_codebook(codebook_path)
+        assert loaded.lengths == codec.lengths
+
+        similar = sample_bytes(size=3000, seed=99)
+        shared = huffman_codec.compress(similar, codebook=loaded)
+        header = huff_container.decode_header(shared)
+        assert header['flags'] & huff_container.FLAG_SHARED_CODEBOOK
+        assert header['codebook_id'] == codebook_id
+        assert len(shared) < len(huffman_codec.compress(similar))
+        assert huffman_codec.decompress(shared, codebooks=[loaded]) == similar
+        shared_path = os.path.join(temp_dir, 'similar.huff')
+        restored_path = os.path.join(temp_dir, 'similar.out')
+        Path(shared_path).write_bytes(shared)
+        assert image_compressor.huffman_decompress_image(shared_path, restored_path, [loaded]) == len(similar)
+        assert Path(restored_path).read_bytes() == similar
+        assert image_compressor.huffman_decompress_image(shared_path, restored_path) is None
+        try:
+            huffman_codec.decompress(shared)
+            raise AssertionError("decoded without the shared codebook")
+        except ValueError:
+            pass
+
+        different = bytes(range(256)) * 4
+        fallback = huffman_codec.compress(different, codebook=loaded)
+        assert not huff_container.decode_header(fallback)['flags'] & huff_container.FLAG_SHARED_CODEBOOK
+        assert huffman_codec.decompress(fallback) == different
+
+        with open(codebook_path, 'r+b') as f:
+            f.seek(huff_container.CODEBOOK_HEADER.size + 1)
+            f.write(b'\xff')
+        try:
+            shared_codebooks.load_codebook(codebook_path)
+            raise AssertionError("corrupted codebook was accepted")
+        except ValueError:
+            pass
+
+
+def test_read_range_decodes_covering_blocks():
+    """read_range matches slices of the original for indexed, unindexed and single-block files"""
+    data = sample_bytes(size=30000)
+    rng = random.Random(13)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        indexed_path = os.path.join(temp_dir, 'indexed.huff')
+        with open(indexed_path, 'wb') as f:
+            huffman_codec.compress_stream(io.BytesIO(data), f, block_size=4096)
+        with open(indexed_path, 'rb') as f:
+            stream = f.read()
+        # Drop the index footer and its flag to get a plain block stream
+        index_offset = huff_container.INDEX_TRAILER.unpack(stream[-huff_container.INDEX_TRAILER.size:])[1]
+        plain = bytearray(stream[:index_offset])
+        plain[5] &= ~huff_container.FLAG_INDEXED
+        plain_path = os.path.join(temp_dir, 'plain.huff')
+        single_path = os.path.join(temp_dir, 'single.huff')
+        with open(plain_path, 'wb') as f:
+            f.write(plain)
+        with open(single_path, 'wb') as f:
+            f.write(huffman_codec.compress(data))
+
+        ranges = [(0, 0), (0, 4096), (4095, 2), (8192, 1), (29990, 100), (40000, 10)]
+        ranges += [(rng.randrange(len(data)), rng.randrange(12000)) for _ in range(20)]
+        for path in (indexed_path, plain_path, single_path):
+            for start, length in ranges:
+                assert huffman_codec.read_range(path, start, length) == data[start:start + length]
+
+
+def test_benchmark_suite_reports_and_compares():
+    """The suite covers every corpus and backend, and compare flags slowdowns and ratio drops"""
+    suite = benchmark_suite.run_suite(size=16, repeat=1)
+    corpora = {result['corpus'] for result in suite['results']}
+    assert {'flat', 'gradient', 'noise', 'photo'} <= corpora
+    assert len(suite['results']) == len(corpora) * len(huffman_codec.BACKENDS)
+    assert benchmark_suite.build_corpora(16)['photo'] == benchmark_suite.build_corpora(16)['photo']
+    assert benchmark_suite.compare(suite, suite) == []
+
+    slower = {**suite, 'results': [dict(result) for result in suite['results']]}
+    slower['results'][0]['encode_mb_per_s'] *= 0.5
+    slower['results'][1]['ratio'] *= 0.9
+    regressions = benchmark_suite.compare(slower, suite)
+    assert len(regressions) == 2
+    assert 'encode_mb_per_s' in regressions[0] and 'ratio' in regressions[1]
+
+
+def test_incompressible_input_is_stored():
+    """High-entropy data and blocks are stored raw and still round-trip"""
+    rng = random.Random(16)
+    noise = bytes(rng.getrandbits(8) for _ in range(100000))
+    text = b"stored blocks sit next to coded ones " * 2000
+    assert huffman_codec.looks_incompressible(noise)
+    assert not huffman_codec.looks_incompressible(text)
+
+    container = huffman_codec.compress(noise)
+    header = huff_container.decode_header(container)
+    assert header['flags'] & huff_container.FLAG_STORED
+    assert len(container) == huff_container.HEADER.size + len(noise)
+    assert huffman_codec.decompress(container) == noise
+    tiny = bytes(range(40))
+    assert huffman_codec.decompress(huffman_codec.compress(tiny)) == tiny
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, 'mixed.bin')
+        output_path = os.path.join(tmp, 'mixed.huff')
+        Path(input_path).write_bytes(noise[:40000] + text[:40000] + noise[40000:60000])
+        stats = {}
+        huffman_codec.compress_file(input_path, output_path, block_size=20000, stats=stats)
+        assert stats == {'blocks': 5, 'stored_blocks': 3, 'stored_bytes': 60000}
+        original = Path(input_path).read_bytes()
+        decoded_path = os.path.join(tmp, 'mixed.out')
+        huffman_codec.decompress_file(output_path, decoded_path)
+        assert Path(decoded_path).read_bytes() == original
+        assert huffman_codec.read_range(output_path, 39990, 30) == original[39990:40020]
+
+        result = batch_compressor.compress_single_image(input_path, tmp)
+        assert result['stored_blocks'] == 0 and result['blocks'] == 1
+
+
+def main():
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    passed = 0
+    for test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {test_func.__name__}")
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {test_func.__name__}: {e}")
+    print(f"\nTest Results: {passed}/{len(tests)} tests passed")
+
+
+if __name__ == "__main__":
+    main()